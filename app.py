@@ -10,8 +10,9 @@ from flask import Flask
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入配置
-from backend.config import DB_CONFIG, DATASHARE_DB_CONFIG, DATASHARE_DB_BIND, JWT_SECRET_KEY, UPLOAD_FOLDER, MAX_CONTENT_LENGTH, DEBUG, SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES
-from backend.extensions import cors, jwt, db, datashare_db
+from backend.config import DB_CONFIG, DATASHARE_DB_CONFIG, DATASHARE_DB_BIND, JWT_SECRET_KEY, UPLOAD_FOLDER, MAX_CONTENT_LENGTH, DEBUG, SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, SOCKETIO_MESSAGE_QUEUE, SOCKETIO_CORS_ORIGINS
+from backend.extensions import cors, jwt, db, datashare_db, socketio
+from backend.utils import db_pool
 
 # 创建Flask应用
 app = Flask(__name__)
@@ -29,7 +30,11 @@ app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{DB_CONFIG['user']}:{D
 # 数据共享数据库配置
 datashare_uri = f"mysql+pymysql://{DATASHARE_DB_CONFIG['user']}:{DATASHARE_DB_CONFIG['password']}@{DATASHARE_DB_CONFIG['host']}:{DATASHARE_DB_CONFIG['port']}/{DATASHARE_DB_CONFIG['database']}"
 app.config['SQLALCHEMY_BINDS'] = {
-    DATASHARE_DB_BIND: datashare_uri
+    # 连接池在每个worker进程中只创建一次，参数见backend/config.py
+    DATASHARE_DB_BIND: {
+        'url': datashare_uri,
+        **db_pool.get_datashare_engine_options()
+    }
 }
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -48,13 +53,34 @@ logging.basicConfig(
 )
 
 # 初始化扩展
-cors.init_app(app, origins="*", supports_credentials=True, expose_headers=["Authorization"])
+cors.init_app(app, origins="*", supports_credentials=True, expose_headers=["Authorization", "X-Export-Rows", "X-Export-Sheets", "X-Export-Rows-Per-Second"])
 jwt.init_app(app)  # 使用extensions.py中的jwt实例
 db.init_app(app)
+db_pool.init_app(app)  # 连接池指标统计
+# 未配置SOCKETIO_CORS_ORIGINS时传入None，只接受与应用同源的连接
+socketio_origins = None
+if SOCKETIO_CORS_ORIGINS == '*':
+    socketio_origins = '*'
+elif SOCKETIO_CORS_ORIGINS:
+    socketio_origins = [origin.strip() for origin in SOCKETIO_CORS_ORIGINS.split(',') if origin.strip()]
+socketio.init_app(
+    app,
+    cors_allowed_origins=socketio_origins,
+    message_queue=SOCKETIO_MESSAGE_QUEUE or None
+)
+
+# 请求开始时检查其他worker进程发布的缓存失效通知（表结构目录、表格权限等）
+from backend.utils.cache_sync import cache_sync
+
+@app.before_request
+def sync_process_caches():
+    cache_sync.check()
 
 # 添加JWT令牌验证逻辑，防止同一账号多处同时登录
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
 from backend.models.user import User
+from backend.utils.auth import load_auth_context
+from backend.utils.token_cache import token_cache
 
 @jwt.token_verification_loader
 def verify_token_identifier(headers, payload):
@@ -75,13 +101,22 @@ def verify_token_identifier(headers, payload):
     if not token_identifier or not user_id:
         return False
     
-    # 查询用户
-    user = User.query.get(int(user_id))
-    if not user:
+    user_id = int(user_id)
+    
+    # 缓存的令牌标识符与令牌一致时直接通过；不一致或未命中时查询数据库，
+    # 其他worker刚登录签发的新令牌不会因为本进程缓存的旧标识符被拒绝
+    cached_identifier, cache_version = token_cache.get(user_id)
+    if cached_identifier is not None and cached_identifier == token_identifier:
+        return True
+    
+    # 查询用户，保存到当前请求中供路由复用（见backend/utils/auth.py的get_auth_context）
+    context = load_auth_context(user_id)
+    if not context:
         return False
+    token_cache.set(user_id, context.user.jwt_token_identifier, cache_version)
     
     # 验证令牌标识符是否匹配
-    return user.jwt_token_identifier == token_identifier
+    return context.user.jwt_token_identifier == token_identifier
 
 # 确保上传目录存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -97,11 +132,18 @@ app.register_blueprint(files_bp)
 app.register_blueprint(users_bp)
 app.register_blueprint(data_bp)
 
+# 注册Socket.IO事件处理
+import backend.sockets.events
+
 # 创建数据库表
 try:
     with app.app_context():
         db.create_all()
         
+        # 为旧版本创建的表格补建索引
+        from backend.utils.schema_upgrade import upgrade_system_schema
+        upgrade_system_schema()
+        
         # 创建默认管理员用户（如果不存在）
         from backend.models.user import User
         from backend.utils.auth import hash_password
@@ -127,4 +169,4 @@ except Exception as e:
     traceback.print_exc()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=DEBUG)
\ No newline at end of file
+    socketio.run(app, host='0.0.0.0', port=5001, debug=DEBUG, allow_unsafe_werkzeug=True)
@@ -37,7 +37,83 @@ JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', '3600'))  #
 # 设置为backend目录下的uploads文件夹
 UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads'))
 MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', '100')) * 1024 * 1024  # 100MB
+FILE_HASH_CHUNK_SIZE = int(os.getenv('FILE_HASH_CHUNK_SIZE', str(1024 * 1024)))  # 上传文件边写入边计算SHA-256时每次读取的字节数
 
 # Flask配置
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-flask-secret-key')
+
+# 数据共享数据库连接池配置（每个worker进程创建一次，长期复用）
+DATASHARE_POOL_SIZE = int(os.getenv('DATASHARE_POOL_SIZE', '10'))  # 常驻连接数
+DATASHARE_POOL_MAX_OVERFLOW = int(os.getenv('DATASHARE_POOL_MAX_OVERFLOW', '20'))  # 允许临时超出的连接数
+DATASHARE_POOL_TIMEOUT = int(os.getenv('DATASHARE_POOL_TIMEOUT', '30'))  # 获取连接的最长等待时间，单位：秒
+DATASHARE_POOL_RECYCLE = int(os.getenv('DATASHARE_POOL_RECYCLE', '1800'))  # 连接回收时间，需小于MySQL的wait_timeout，单位：秒
+DATASHARE_POOL_PRE_PING = os.getenv('DATASHARE_POOL_PRE_PING', 'True').lower() == 'true'  # 取出连接前检测连接是否可用
+
+# 表结构目录缓存有效期（兜底处理在系统外执行的DDL），单位：秒
+SCHEMA_CATALOG_TTL = int(os.getenv('SCHEMA_CATALOG_TTL', '300'))
+SCHEMA_CATALOG_MISS_TTL = float(os.getenv('SCHEMA_CATALOG_MISS_TTL', '2'))  # 目录中没有的表格重新查询后，确认不存在的结果保留的时间，单位：秒
+
+# 跨worker进程的缓存失效：两次读取cache_versions表的最小间隔，也是其他worker看到失效通知的最大延迟，
+# 0表示每个请求都读取（每个请求多一次系统库查询），单位：秒
+CACHE_SYNC_INTERVAL = float(os.getenv('CACHE_SYNC_INTERVAL', '5'))
+
+# 表格总记录数缓存配置
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv('COUNT_CACHE_MAX_ENTRIES', '1024'))  # 最多缓存的表格数
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', '60'))  # 缓存有效期，单位：秒（行数据变化时通过cache_sync通知所有worker失效）
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv('COUNT_ESTIMATE_THRESHOLD', '0'))  # 估算行数达到该值时使用估算值代替COUNT(*)，0表示不启用
+
+# 全文搜索配置
+SEARCH_NGRAM_TOKEN_SIZE = int(os.getenv('SEARCH_NGRAM_TOKEN_SIZE', '2'))  # 需与MySQL的ngram_token_size一致，更短的关键词回退到LIKE搜索；建立索引时关闭InnoDB停用词，否则含a、i等停用词的分词会被丢弃
+SEARCH_INDEX_AUTO_CREATE = os.getenv('SEARCH_INDEX_AUTO_CREATE', 'True').lower() == 'true'  # 导入表格后自动创建全文搜索索引
+
+# 全局搜索配置
+GLOBAL_SEARCH_MAX_WORKERS = int(os.getenv('GLOBAL_SEARCH_MAX_WORKERS', '8'))  # 并发搜索的线程数（每个worker），应不超过连接池可用连接数
+GLOBAL_SEARCH_TIMEOUT = float(os.getenv('GLOBAL_SEARCH_TIMEOUT', '5'))  # 单次全局搜索的截止时间，超时的表格返回部分结果，单位：秒
+
+# 导出配置
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '5000'))  # 流式导出时每批从数据库读取的行数
+
+# 后台任务配置
+JOB_STATE_DIR = os.getenv('JOB_STATE_DIR', os.path.join(os.path.dirname(__file__), 'jobs'))  # 任务状态保存目录，多个worker需共享该目录
+JOB_RETENTION = int(os.getenv('JOB_RETENTION', '86400'))  # 任务状态保留时间，单位：秒
+JOB_HEARTBEAT_INTERVAL = int(os.getenv('JOB_HEARTBEAT_INTERVAL', '15'))  # 执行中的任务写入心跳时间的间隔，单位：秒
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '120'))  # 未完成的任务超过该时间没有心跳时视为所在进程已退出，标记为失败，单位：秒
+
+# 导出文件缓存配置
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'exports'))  # 导出文件保存目录
+EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', '2048')) * 1024 * 1024  # 导出文件总大小上限，超出时删除最久未使用的文件，默认2GB
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', '2'))  # 同时执行的导出任务数（每个worker）
+
+# 导入配置
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '10000'))  # 分块读取导入文件时每块的行数
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))  # 每条批量INSERT语句插入的行数
+IMPORT_ENGINE = os.getenv('IMPORT_ENGINE', 'auto')  # 导入方式：auto（优先使用LOAD DATA LOCAL INFILE，服务端不允许时回退到批量INSERT）、load_data、insert
+DATASHARE_LOCAL_INFILE = os.getenv('DATASHARE_LOCAL_INFILE', 'True').lower() == 'true'  # 导入时使用单独的连接（不进入连接池）开启LOAD DATA LOCAL INFILE，连接池中的连接始终不开启（MySQL服务端也需开启local_infile）
+IMPORT_INFER_TYPES = os.getenv('IMPORT_INFER_TYPES', 'True').lower() == 'true'  # 导入前扫描数据推断列类型，关闭时所有列使用VARCHAR(255)
+IMPORT_VARCHAR_MAX_LENGTH = int(os.getenv('IMPORT_VARCHAR_MAX_LENGTH', '1024'))  # 推断类型时VARCHAR的最大长度，更长的文本使用TEXT
+IMPORT_JOB_WORKERS = int(os.getenv('IMPORT_JOB_WORKERS', '2'))  # 同时执行的导入任务数（每个worker）
+
+# 二级索引配置
+INDEX_PREFIX_LENGTH = int(os.getenv('INDEX_PREFIX_LENGTH', '64'))  # TEXT/BLOB列建索引时默认的前缀长度
+INDEX_ADVISOR_MIN_REQUESTS = int(os.getenv('INDEX_ADVISOR_MIN_REQUESTS', '5'))  # 排序/筛选列被使用的次数达到该值才给出建索引建议
+
+# 变更通知推送配置（Socket.IO）
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')  # 多个worker进程时需配置消息队列（如redis://localhost:6379/0）在进程间转发事件，为空表示单进程
+SOCKETIO_CORS_ORIGINS = os.getenv('SOCKETIO_CORS_ORIGINS', '')  # 允许建立WebSocket连接的来源，多个用逗号分隔；为空表示只允许与应用同源的页面，*表示允许任意来源
+
+# 批量修改数据行配置
+ROW_BATCH_MAX_ROWS = int(os.getenv('ROW_BATCH_MAX_ROWS', '10000'))  # 单次批量修改（插入+更新+删除）的最大行数，每条多行语句的行数同IMPORT_BATCH_SIZE
+
+# 令牌标识符缓存配置（校验JWT时不必每次查询用户表）
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', '30'))  # 缓存有效期，0表示不缓存，单位：秒（未配置Redis时登出只立即失效本worker，其他worker中已登出的令牌最多继续有效该时间）
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', '10000'))  # 进程内缓存的最大用户数
+TOKEN_CACHE_REDIS_URL = os.getenv('TOKEN_CACHE_REDIS_URL', '')  # Redis地址（如redis://localhost:6379/1），配置后各worker共享缓存，需安装redis包
+
+# 表格权限缓存配置
+PERMISSION_CACHE_TTL = int(os.getenv('PERMISSION_CACHE_TTL', '30'))  # 用户表格权限缓存有效期，0表示不缓存，单位：秒（修改权限时通过cache_sync通知所有worker失效）
+PERMISSION_CACHE_MAX_USERS = int(os.getenv('PERMISSION_CACHE_MAX_USERS', '10000'))  # 最多缓存权限的用户数
+
+# 文件列表分页配置
+FILE_LIST_PAGE_SIZE = int(os.getenv('FILE_LIST_PAGE_SIZE', '50'))  # 文件列表默认每页条数
+FILE_LIST_MAX_PAGE_SIZE = int(os.getenv('FILE_LIST_MAX_PAGE_SIZE', '500'))  # 文件列表每页最大条数
@@ -6,11 +6,15 @@
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
+from flask_socketio import SocketIO
 
 # 创建扩展实例
 cors = CORS()
 jwt = JWTManager()
 
+# 变更通知推送（backend/sockets）
+socketio = SocketIO()
+
 # 主数据库连接（系统库）
 db = SQLAlchemy()
 
@@ -3,5 +3,6 @@
 """
 
 from .user import User
-from .file import File
+from .file import File, FileBlob
 from .data_share import TableMetadata, TableAccess
+from .cache_version import CacheVersion
@@ -0,0 +1,18 @@
+"""
+缓存版本模型
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime
+from ..extensions import db
+
+class CacheVersion(db.Model):
+    """进程内缓存的版本号，修改数据后递增，各worker进程据此失效自己的缓存"""
+    __tablename__ = 'cache_versions'
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<CacheVersion {self.name} ({self.version})>"
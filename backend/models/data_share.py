@@ -3,7 +3,7 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
 from ..extensions import db
 
 class TableMetadata(db.Model):
@@ -20,9 +20,14 @@ class TableMetadata(db.Model):
     def __repr__(self):
         return f"<TableMetadata {self.table_name} ({self.display_name})>"
 
+# table_access表(user_id, table_name)唯一键的名称
+TABLE_ACCESS_UNIQUE_KEY = 'uq_table_access_user_table'
+
 class TableAccess(db.Model):
     """用户数据表访问权限模型"""
     __tablename__ = 'table_access'
+    # 每个用户对每个表格只有一条权限记录，批量设置权限时按该唯一键upsert
+    __table_args__ = (UniqueConstraint('user_id', 'table_name', name=TABLE_ACCESS_UNIQUE_KEY),)
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     table_name = Column(String(100), nullable=False)
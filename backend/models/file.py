@@ -3,12 +3,37 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from ..extensions import db
 
+# files表引用文件内容的外键名称
+FILE_BLOB_FOREIGN_KEY = 'fk_files_blob'
+
+# 文件列表分页查询使用的索引 {索引名称: 索引列}
+FILE_LIST_INDEXES = {
+    'ix_files_user_created': ['user_id', 'created_at'],  # 我的文件
+    'ix_files_shared_created': ['is_shared', 'created_at'],  # 共享文件
+    'ix_files_created': ['created_at']  # 所有文件（管理员）
+}
+
+class FileBlob(db.Model):
+    """文件内容模型，相同内容（按SHA-256）只保存一份，由引用它的文件记录计数"""
+    __tablename__ = 'file_blobs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    storage_path = Column(String(255), nullable=False)  # 相对于UPLOAD_FOLDER的路径（旧文件可能为绝对路径）
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)  # 引用该内容的文件记录数，为0时删除
+    created_at = Column(DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<FileBlob {self.sha256} ({self.ref_count} refs)>"
+
 class File(db.Model):
     """文件表模型"""
     __tablename__ = 'files'
+    __table_args__ = tuple(Index(name, *columns) for name, columns in FILE_LIST_INDEXES.items())
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     filename = Column(String(255), nullable=False)
@@ -16,6 +41,9 @@ class File(db.Model):
     size = Column(Integer, nullable=False)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     is_shared = Column(Boolean, default=False, nullable=False)
+    # 文件内容，为空表示去重存储之前上传、尚未登记内容的旧文件
+    blob_id = Column(Integer, ForeignKey('file_blobs.id', name=FILE_BLOB_FOREIGN_KEY), nullable=True)
+    blob = db.relationship('FileBlob')
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
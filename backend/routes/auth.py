@@ -3,10 +3,11 @@
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import jwt_required
 from ..extensions import db
 from ..models.user import User
-from ..utils.auth import hash_password, verify_password, create_jwt_token
+from ..utils.auth import hash_password, verify_password, create_jwt_token, get_auth_context
+from ..utils.token_cache import token_cache
 
 # 创建蓝图
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -85,6 +86,8 @@ def login():
         user.status = 'online'
         user.jwt_token_identifier = token_identifier
         db.session.commit()
+        # 旧令牌立即失效
+        token_cache.invalidate(user.id)
         
         return jsonify({
             'access_token': access_token,
@@ -112,15 +115,13 @@ def logout():
     {"message": "登出成功"}
     """
     try:
-        # 获取当前用户ID
-        current_user_id = int(get_jwt_identity())  # 将字符串转换为整数
-        
         # 更新用户状态为离线，并清除令牌标识符
-        user = User.query.get(current_user_id)
+        user = get_auth_context().user
         if user:
             user.status = 'offline'
             user.jwt_token_identifier = None
             db.session.commit()
+            token_cache.invalidate(user.id)
         
         return jsonify({'message': '登出成功'}), 200
         
@@ -137,11 +138,8 @@ def get_current_user():
     {"user": {"id": 1, "username": "test", "role": "user"}}
     """
     try:
-        # 获取当前用户ID
-        current_user_id = int(get_jwt_identity())  # 将字符串转换为整数
-        
         # 查询用户信息
-        user = User.query.get(current_user_id)
+        user = get_auth_context().user
         if not user:
             return jsonify({'error': '用户不存在'}), 404
         
@@ -2,25 +2,76 @@
 数据共享模块路由
 """
 
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from io import BytesIO
+from datetime import datetime
+from urllib.parse import quote
 import os
+import json
+import tempfile
 from ..extensions import db
 from ..models.user import User
 from ..models.data_share import TableMetadata, TableAccess
 from ..utils.data_utils import (
-    get_table_data, get_table_columns, export_table_data, 
-    check_table_exists, get_all_tables, import_table_from_file,
+    get_table_data, get_table_data_by_cursor, get_table_columns, ROW_FORMATS, iter_table_csv, export_table_excel,
+    check_table_exists, get_all_tables,
     create_table_from_sql, insert_table_row, update_table_row,
-    delete_table_row, delete_table, global_search
+    delete_table_row, batch_mutate_rows, delete_table, global_search, iter_global_search
+)
+from ..utils.auth import check_table_access, get_auth_context
+from ..utils.permissions import permission_matrix, bulk_set_table_access
+from ..utils.db_pool import get_pool_stats
+from ..utils.filters import parse_filters
+from ..utils.table_indexes import list_indexes, create_index, drop_index, suggest_indexes, column_usage
+from ..utils.jobs import serialize_job
+from ..utils.import_jobs import import_jobs, submit_import_job
+from ..utils.export_jobs import (
+    EXPORT_FORMATS, export_jobs, submit_export_job, find_cached_export,
+    get_artifact_path, touch_artifact
+)
+from ..utils.search_index import (
+    get_search_index_columns, get_searchable_columns,
+    create_search_index, drop_search_index
 )
-from ..utils.auth import check_table_access
 
 # 创建蓝图
 bp = Blueprint('data', __name__, url_prefix='/api/data')
 
 
+def _attachment_disposition(filename):
+    """
+    构建文件下载的Content-Disposition响应头，非ASCII文件名按RFC 5987编码
+    
+    Args:
+        filename: 下载文件名
+    
+    返回：
+        str: 响应头的值
+    """
+    try:
+        filename.encode('ascii')
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(filename)}"
+
+
+def _stream_search_events(events):
+    """
+    以NDJSON格式流式返回全局搜索事件，每个表格搜索完成后立即输出一行
+    
+    Args:
+        events: iter_global_search产出的事件迭代器
+    
+    返回：
+        流式响应
+    """
+    def generate():
+        for event in events:
+            yield current_app.json.dumps(event) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @bp.route('/admin/search', methods=['GET'], strict_slashes=False)
 @jwt_required()
 def admin_global_search():
@@ -29,16 +80,16 @@ def admin_global_search():
     
     参数：
     search: 搜索关键词
+    stream: 为true时以NDJSON格式逐个返回已完成的表格结果，最后一行为{"type": "done", ...}
     
     返回：
-    {"message": "搜索成功", "results": [{"table_name": "users", "display_name": "用户表", "rows": [{"id": 1, "matched_data": {"username": "admin"}}]}]}
+    {"message": "搜索成功", "results": [{"table_name": "users", "display_name": "用户表", "rows": [{"id": 1, "matched_data": {"username": "admin"}}]}], "partial": false, "timed_out_tables": []}
     """
     try:
         print("=== 管理员全局搜索请求开始 ===")
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             print("无权限访问该接口")
             return jsonify({'error': '没有权限访问该接口'}), 403
         
@@ -46,13 +97,17 @@ def admin_global_search():
         search_query = request.args.get('search', '')
         print(f"搜索关键词: {search_query}")
         
+        # 流式返回各表格的搜索结果
+        if request.args.get('stream', 'false').lower() == 'true':
+            return _stream_search_events(iter_global_search(search_query))
+        
         # 执行全局搜索（搜索所有表格）
-        results = global_search(search_query)
-        print(f"搜索结果数量: {len(results)}")
+        search_result = global_search(search_query)
+        print(f"搜索结果数量: {len(search_result['results'])}, 部分结果: {search_result['partial']}")
         
         return jsonify({
             'message': '搜索成功',
-            'results': results
+            **search_result
         }), 200
     except Exception as e:
         import traceback
@@ -73,37 +128,50 @@ def user_global_search():
     
     参数：
     search: 搜索关键词
+    stream: 为true时以NDJSON格式逐个返回已完成的表格结果，最后一行为{"type": "done", ...}
     
     返回：
-    {"message": "搜索成功", "results": [{"table_name": "users", "display_name": "用户表", "rows": [{"id": 1, "matched_data": {"username": "admin"}}]}]}
+    {"message": "搜索成功", "results": [{"table_name": "users", "display_name": "用户表", "rows": [{"id": 1, "matched_data": {"username": "admin"}}]}], "partial": false, "timed_out_tables": []}
     """
     try:
         print("=== 用户全局搜索请求开始 ===")
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
         # 获取搜索关键词
         search_query = request.args.get('search', '')
         print(f"搜索关键词: {search_query}")
         
         # 获取用户可访问的表格列表
-        if user.role == 'admin':
+        if auth.is_admin:
             # 管理员可以访问所有表格
             user_tables = get_all_tables()
         else:
             # 普通用户只能访问其有查看权限的表格
-            table_accesses = TableAccess.query.filter_by(user_id=current_user_id, can_view=True).all()
-            user_tables = [access.table_name for access in table_accesses]
+            user_tables = auth.accessible_tables('view')
         
         print(f"用户可访问的表格数量: {len(user_tables)}")
         
+        # 没有可访问的表格时直接返回空结果（空列表会被当作搜索所有表格）
+        if not user_tables:
+            return jsonify({
+                'message': '搜索成功',
+                'results': [],
+                'partial': False,
+                'timed_out_tables': [],
+                'failed_tables': []
+            }), 200
+        
+        # 流式返回各表格的搜索结果
+        if request.args.get('stream', 'false').lower() == 'true':
+            return _stream_search_events(iter_global_search(search_query, tables_to_search=user_tables))
+        
         # 执行全局搜索（仅搜索用户可访问的表格）
-        results = global_search(search_query, tables_to_search=user_tables)
-        print(f"搜索结果数量: {len(results)}")
+        search_result = global_search(search_query, tables_to_search=user_tables)
+        print(f"搜索结果数量: {len(search_result['results'])}, 部分结果: {search_result['partial']}")
         
         return jsonify({
             'message': '搜索成功',
-            'results': results
+            **search_result
         }), 200
     except Exception as e:
         import traceback
@@ -124,16 +192,14 @@ def get_accessible_tables():
     {"message": "获取表格列表成功", "tables": [{"id": 1, "table_name": "users", "display_name": "用户表", "description": "系统用户信息"}]}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role == 'admin':
+        if auth.is_admin:
             # 管理员可以访问所有活跃的表格
             tables = TableMetadata.query.filter_by(is_active=True).all()
         else:
             # 普通用户只能访问被授权的表格
-            table_accesses = TableAccess.query.filter_by(user_id=current_user_id, can_view=True).all()
-            table_names = [access.table_name for access in table_accesses]
+            table_names = auth.accessible_tables('view')
             tables = TableMetadata.query.filter(TableMetadata.table_name.in_(table_names) & TableMetadata.is_active==True).all()
         
         # 转换为响应格式
@@ -179,18 +245,12 @@ def get_table_metadata(table_name):
             return jsonify({'error': '表格不存在'}), 404
         
         # 检查用户权限
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
+        user = auth.user
         print(f"Debug: Current user: {user.username}, role: {user.role}")
         
-        if user.role != 'admin':
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name,
-                can_view=True
-            ).first()
-            if not table_access:
-                return jsonify({'error': '没有访问该表格的权限'}), 403
+        if not auth.can(table_name, 'view'):
+            return jsonify({'error': '没有访问该表格的权限'}), 403
         
         # 获取表格元数据
         table_metadata = TableMetadata.query.filter_by(table_name=table_name).first()
@@ -213,16 +273,7 @@ def get_table_metadata(table_name):
         print(f"Debug: Got columns: {columns}")
         
         # 获取用户对该表格的编辑权限
-        can_edit = False
-        if user.role == 'admin':
-            can_edit = True
-        else:
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name,
-                can_edit=True
-            ).first()
-            can_edit = bool(table_access)
+        can_edit = auth.can(table_name, 'edit')
         
         return jsonify({
             'message': '获取表格元数据成功',
@@ -258,9 +309,20 @@ def get_table_data_endpoint(table_name):
     per_page: 每页条数，默认为10
     sort_by: 排序字段，默认为None
     sort_order: 排序方向，默认为'asc'，可选值为'asc'或'desc'
+    pagination: 分页方式，默认为'offset'（页码分页），大表格可使用'cursor'（游标分页）
+    cursor: 游标分页时上一次返回的next_cursor或prev_cursor，传入时自动使用游标分页
+    search: 搜索关键词
+    filters: 结构化筛选条件（JSON），如[{"column": "age", "op": "gte", "value": 18}, {"column": "city", "op": "in", "value": ["北京", "上海"]}]，
+             支持eq/ne/gt/gte/lt/lte/in/not_in/between/prefix/is_null/not_null，可用{"and": [...]}、{"or": [...]}组合
+    columns: 要返回的列，逗号分隔，默认返回所有列
+    format: 返回格式，默认为'records'（每行一个字典），'columnar'时data为{"columns": [...], "rows": [[...], ...]}
+    dictionary: columnar格式下是否对重复的字符串做字典编码，默认为false，
+                为true时data中增加dictionaries: {列名: [值, ...]}，rows中对应位置为值的下标
     
     返回：
     {"message": "获取表格数据成功", "data": [{"id": 1, "username": "admin"}], "pagination": {"page": 1, "per_page": 10, "total": 1, "pages": 1}}
+    游标分页返回：
+    {"message": "获取表格数据成功", "data": [...], "pagination": {"mode": "cursor", "per_page": 10, "next_cursor": "...", "prev_cursor": null, "has_next": true, "has_prev": false}}
     """
     try:
         print(f"Debug: get_table_data_endpoint called with table_name: '{table_name}'")
@@ -278,29 +340,51 @@ def get_table_data_endpoint(table_name):
         sort_by = request.args.get('sort_by')
         sort_order = request.args.get('sort_order', 'asc')
         search_query = request.args.get('search')
-        print(f"Debug: Query params - page: {page}, per_page: {per_page}, sort_by: {sort_by}, sort_order: {sort_order}, search: {search_query}")
+        cursor = request.args.get('cursor')
+        pagination_mode = request.args.get('pagination', 'cursor' if cursor else 'offset')
+        print(f"Debug: Query params - page: {page}, per_page: {per_page}, sort_by: {sort_by}, sort_order: {sort_order}, search: {search_query}, pagination: {pagination_mode}")
+        
+        if pagination_mode not in ['offset', 'cursor']:
+            return jsonify({'error': '不支持的分页方式'}), 400
+        
+        # 列投影和返回格式
+        columns = request.args.get('columns')
+        columns = list(dict.fromkeys(col.strip() for col in columns.split(',') if col.strip())) if columns else None
+        row_format = request.args.get('format', 'records')
+        if row_format not in ROW_FORMATS:
+            return jsonify({'error': '不支持的返回格式'}), 400
+        dictionary_encode = request.args.get('dictionary', 'false').lower() == 'true'
         
         # 检查用户权限
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
+        user = auth.user
         print(f"Debug: Current user: {user.username}, role: {user.role}")
         
-        if user.role != 'admin':
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name,
-                can_view=True
-            ).first()
-            if not table_access:
-                return jsonify({'error': '没有访问该表格的权限'}), 403
+        if not auth.can(table_name, 'view'):
+            return jsonify({'error': '没有访问该表格的权限'}), 403
         
         # 获取表格数据
         print(f"Debug: Calling get_table_data with table_name: '{table_name}'")
-        result = get_table_data(table_name, page, per_page, sort_by, sort_order, search_query=search_query)
-        print(f"Debug: Got table data result: {result}")
+        try:
+            filters = parse_filters(request.args.get('filters'))
+            options = {
+                'columns': columns,
+                'search_query': search_query,
+                'filters': filters,
+                'row_format': row_format,
+                'dictionary_encode': dictionary_encode
+            }
+            if pagination_mode == 'cursor':
+                result = get_table_data_by_cursor(table_name, per_page, sort_by, sort_order, cursor, **options)
+            else:
+                result = get_table_data(table_name, page, per_page, sort_by, sort_order, **options)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        print(f"Debug: Got table data result: {result['pagination']}")
         
         return jsonify({
             'message': '获取表格数据成功',
+            'format': row_format,
             'data': result['data'],
             'pagination': result['pagination']
         }), 200
@@ -336,29 +420,158 @@ def export_table_data_endpoint(table_name):
         if export_format not in ['csv', 'excel']:
             return jsonify({'error': '不支持的导出格式'}), 400
         
+        # 检查用户权限
+        auth = get_auth_context()
+        
+        if not auth.can(table_name, 'export'):
+            return jsonify({'error': '没有导出该表格的权限'}), 403
+        
+        # 表格数据未变化时直接返回缓存的导出文件
+        cached_path = find_cached_export(table_name, export_format)
+        if cached_path is not None:
+            extension, mimetype = EXPORT_FORMATS[export_format]
+            filename = f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+            return send_file(cached_path, mimetype=mimetype, as_attachment=True, download_name=filename)
+        
+        # CSV流式导出，边读边写，不在内存中保存整张表格
+        if export_format == 'csv':
+            filename = f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            response = Response(
+                stream_with_context(iter_table_csv(table_name)),
+                content_type='text/csv; charset=utf-8'
+            )
+            response.headers['Content-Disposition'] = _attachment_disposition(filename)
+            return response
+        
+        # Excel使用只写模式流式写入临时文件，响应结束后删除临时文件
+        filename = f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        fd, temp_path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            stats = export_table_excel(table_name, temp_path)
+            response = send_file(
+                temp_path,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name=filename
+            )
+        except Exception:
+            os.remove(temp_path)
+            raise
+        response.call_on_close(lambda: os.path.exists(temp_path) and os.remove(temp_path))
+        response.headers['X-Export-Rows'] = str(stats['rows'])
+        response.headers['X-Export-Sheets'] = str(stats['sheets'])
+        response.headers['X-Export-Rows-Per-Second'] = str(stats['rows_per_second'])
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/tables/<string:table_name>/export-jobs', methods=['POST'], strict_slashes=False)
+@jwt_required()
+def create_export_job(table_name):
+    """
+    提交后台导出任务
+    
+    请求体：
+    {
+        "format": "csv"  // 导出格式，可选值为'csv'或'excel'
+    }
+    
+    返回：
+    任务状态，表格数据未变化且已有缓存文件时任务直接为completed状态
+    """
+    try:
+        if not check_table_exists(table_name):
+            return jsonify({'error': '表格不存在'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        export_format = data.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': '不支持的导出格式'}), 400
+        
         # 检查用户权限
         current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name,
-                can_export=True
-            ).first()
-            if not table_access:
-                return jsonify({'error': '没有导出该表格的权限'}), 403
-        
-        # 导出表格数据
-        filename, content, content_type = export_table_data(table_name, export_format)
-        
-        # 返回文件下载响应
-        return send_file(
-            BytesIO(content.encode('utf-8') if isinstance(content, str) else content),
-            mimetype=content_type,
-            as_attachment=True,
-            download_name=filename
-        )
+        if not auth.can(table_name, 'export'):
+            return jsonify({'error': '没有导出该表格的权限'}), 403
+        
+        job = submit_export_job(table_name, export_format, current_user_id)
+        status_code = 200 if job['status'] == 'completed' else 202
+        return jsonify({
+            'message': '导出任务已提交',
+            'job': serialize_job(job)
+        }), status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _get_own_export_job(job_id):
+    """
+    获取当前用户的导出任务，管理员可以查看所有任务
+    
+    返回：
+        (任务状态, 错误响应)
+    """
+    job = export_jobs.get(job_id)
+    if job is None:
+        return None, (jsonify({'error': '导出任务不存在'}), 404)
+    
+    current_user_id = int(get_jwt_identity())
+    if job['owner_id'] != current_user_id:
+        auth = get_auth_context()
+        if not auth.is_admin:
+            return None, (jsonify({'error': '导出任务不存在'}), 404)
+    return job, None
+
+
+@bp.route('/export-jobs/<string:job_id>', methods=['GET'])
+@jwt_required()
+def get_export_job(job_id):
+    """
+    查询导出任务状态
+    
+    返回：
+    {
+        "job": {"id": "...", "status": "pending|running|completed|failed", "progress": {...}, "result": {...}, "error": null, ...}
+    }
+    """
+    try:
+        job, error_response = _get_own_export_job(job_id)
+        if error_response:
+            return error_response
+        return jsonify({'job': serialize_job(job)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/export-jobs/<string:job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export_job(job_id):
+    """
+    下载导出任务生成的文件
+    
+    返回：
+    文件下载响应
+    """
+    try:
+        job, error_response = _get_own_export_job(job_id)
+        if error_response:
+            return error_response
+        
+        if job['status'] != 'completed':
+            return jsonify({'error': '导出任务尚未完成', 'status': job['status']}), 409
+        
+        path = get_artifact_path(job['result']['artifact'])
+        if path is None:
+            return jsonify({'error': '导出文件已过期，请重新导出'}), 410
+        touch_artifact(path)
+        
+        table_name = job['params']['table_name']
+        extension, mimetype = EXPORT_FORMATS[job['params']['format']]
+        filename = f"{table_name}_{datetime.fromisoformat(job['finished_at']).strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -407,10 +620,9 @@ def admin_get_database_tables():
     {"message": "获取数据库表格列表成功", "tables": ["users", "files", "table_metadata"]}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 获取数据库中所有表
@@ -424,6 +636,30 @@ def admin_get_database_tables():
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/admin/pool-stats', methods=['GET'], strict_slashes=False)
+@jwt_required()
+def admin_get_pool_stats():
+    """
+    管理员获取数据库连接池指标（当前worker进程）
+    
+    返回：
+    {"message": "获取连接池指标成功", "pid": 1234, "pools": [{"name": "datashare", "checkouts": 10, "wait_avg_ms": 0.1, "checkedout": 1}]}
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        return jsonify({
+            'message': '获取连接池指标成功',
+            'pid': os.getpid(),
+            'pools': get_pool_stats()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/admin/tables', methods=['GET'], strict_slashes=False)
 @jwt_required()
 def admin_get_all_tables():
@@ -434,10 +670,9 @@ def admin_get_all_tables():
     {"message": "获取所有表格列表成功", "tables": [{"id": 1, "table_name": "users", "display_name": "用户表", "description": "系统用户信息"}]}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 获取所有表格元数据
@@ -477,10 +712,9 @@ def admin_create_table_metadata():
     {"message": "创建表格元数据成功", "table": {"id": 1, "table_name": "users", "display_name": "用户表"}}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         data = request.get_json()
@@ -545,10 +779,9 @@ def admin_update_table_metadata(table_name):
     {"message": "更新表格元数据成功", "table": {"id": 1, "table_name": "users", "display_name": "用户表"}}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 查找表格元数据
@@ -591,10 +824,9 @@ def admin_get_table_access():
     {"message": "获取用户表格访问权限列表成功", "access_list": [{"id": 1, "user_id": 1, "username": "admin", "table_name": "users", "can_view": true, "can_edit": true, "can_export": true}]}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 获取所有用户表格访问权限
@@ -643,12 +875,14 @@ def admin_set_table_access():
     
     返回：
     {"message": "设置用户表格访问权限成功", "success_count": 4, "access_list": [...]}
+    批量设置时还返回跳过的用户和表格：
+    {"skipped_users": [{"user_id": 3, "reason": "..."}], "skipped_tables": [{"table_name": "x", "reason": "..."}]}
+    全部被跳过时返回400
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         data = request.get_json()
@@ -671,59 +905,48 @@ def admin_set_table_access():
             if not user_ids or not table_names:
                 return jsonify({'error': '缺少用户ID列表或表格名称列表'}), 400
             
-            # 遍历所有用户和表格的组合
-            for user_id in user_ids:
-                for table_name in table_names:
-                    try:
-                        # 检查用户是否存在
-                        target_user = User.query.get(user_id)
-                        if not target_user:
-                            continue
-                        
-                        # 跳过管理员用户，防止管理员权限被意外修改
-                        if target_user.role == 'admin':
-                            print(f"跳过管理员用户 {user_id} 的权限设置")
-                            continue
-                        
-                        # 检查表格是否存在
-                        if not check_table_exists(table_name):
-                            continue
-                        
-                        # 查找或创建访问权限
-                        table_access = TableAccess.query.filter_by(user_id=user_id, table_name=table_name).first()
-                        
-                        if table_access:
-                            # 更新现有权限
-                            table_access.can_view = can_view
-                            table_access.can_edit = can_edit
-                            table_access.can_export = can_export
-                        else:
-                            # 创建新权限
-                            table_access = TableAccess(
-                                user_id=user_id,
-                                table_name=table_name,
-                                can_view=can_view,
-                                can_edit=can_edit,
-                                can_export=can_export
-                            )
-                            db.session.add(table_access)
-                        
-                        # 收集成功的权限记录
-                        access_list.append({
-                            'id': table_access.id,
-                            'user_id': table_access.user_id,
-                            'username': target_user.username,
-                            'table_name': table_access.table_name,
-                            'can_view': table_access.can_view,
-                            'can_edit': table_access.can_edit,
-                            'can_export': table_access.can_export,
-                            'created_at': table_access.created_at.isoformat(),
-                            'updated_at': table_access.updated_at.isoformat()
-                        })
-                        success_count += 1
-                    except Exception as e:
-                        print(f"设置用户 {user_id} 对表格 {table_name} 的权限失败: {str(e)}")
-                        continue
+            # 预先查询用户和表格，按唯一键批量upsert
+            result = bulk_set_table_access(user_ids, table_names, can_view, can_edit, can_export)
+            skipped_users = result['skipped_users']
+            skipped_tables = result['skipped_tables']
+            for table_access in result['records']:
+                # 收集成功的权限记录
+                access_list.append({
+                    'id': table_access.id,
+                    'user_id': table_access.user_id,
+                    'username': table_access.user.username,
+                    'table_name': table_access.table_name,
+                    'can_view': table_access.can_view,
+                    'can_edit': table_access.can_edit,
+                    'can_export': table_access.can_export,
+                    'created_at': table_access.created_at.isoformat(),
+                    'updated_at': table_access.updated_at.isoformat()
+                })
+            success_count = len(access_list)
+            
+            # 在提示中列出跳过的用户和表格
+            skipped_message = ''
+            if skipped_users:
+                details = '、'.join(f"{item['user_id']}: {item['reason']}" for item in skipped_users)
+                skipped_message += f'，跳过 {len(skipped_users)} 个用户（{details}）'
+            if skipped_tables:
+                details = '、'.join(f"{item['table_name']}: {item['reason']}" for item in skipped_tables)
+                skipped_message += f'，跳过 {len(skipped_tables)} 个表格（{details}）'
+            if not success_count:
+                return jsonify({
+                    'error': f'没有可设置的权限记录{skipped_message}',
+                    'skipped_users': skipped_users,
+                    'skipped_tables': skipped_tables
+                }), 400
+            
+            # bulk_set_table_access已提交并失效了相关用户的权限缓存
+            return jsonify({
+                'message': f'成功设置 {success_count} 条权限记录{skipped_message}',
+                'success_count': success_count,
+                'access_list': access_list,
+                'skipped_users': skipped_users,
+                'skipped_tables': skipped_tables
+            }), 201
         else:
             # 单个设置权限
             user_id = data.get('user_id')
@@ -780,6 +1003,9 @@ def admin_set_table_access():
         
         db.session.commit()
         
+        # 失效相关用户的权限缓存
+        permission_matrix.invalidate_users({access['user_id'] for access in access_list})
+        
         return jsonify({
             'message': f'成功设置 {success_count} 条权限记录',
             'success_count': success_count,
@@ -807,10 +1033,9 @@ def admin_delete_table_access(access_id):
     {"message": "删除用户表格访问权限成功"}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 查找并删除权限
@@ -819,8 +1044,10 @@ def admin_delete_table_access(access_id):
         if not table_access:
             return jsonify({'error': '权限不存在'}), 404
         
+        user_id = table_access.user_id
         db.session.delete(table_access)
         db.session.commit()
+        permission_matrix.invalidate(user_id)
         
         return jsonify({
             'message': '删除用户表格访问权限成功'
@@ -842,17 +1069,22 @@ def admin_import_table():
     请求体：
     - 方式1（文件导入）：
       {"type": "file", "table_name": "users", "file": <file>}
+      可选字段：
+      column_types: 按列指定类型的JSON，如{"price": "DECIMAL(10,2)"}，覆盖自动推断的类型
+      infer_types: 是否自动推断列类型，默认为true，false时所有列使用VARCHAR(255)
     - 方式2（SQL创建）：
       {"type": "sql", "sql_statement": "CREATE TABLE users (...)"}
     
     返回：
-    {"message": "表格导入成功", "table_name": "users"}
+    - 文件导入：{"message": "导入任务已提交", "table_name": "users", "job": {...}}，
+      通过GET /api/data/admin/import-jobs/<job_id>查询导入进度和结果
+    - SQL创建：{"message": "表格导入成功", "table_name": "users"}
     """
     try:
         current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 获取导入类型
@@ -876,40 +1108,40 @@ def admin_import_table():
             if not table_name:
                 return jsonify({'error': '缺少表格名称'}), 400
             
-            # 保存文件到临时目录
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            file_path = os.path.join(upload_folder, file.filename)
-            file.save(file_path)
+            # 按列指定的类型，JSON格式：{"列名": "DECIMAL(10,2)"}
+            column_types = request.form.get('column_types')
+            if column_types:
+                try:
+                    column_types = json.loads(column_types)
+                except ValueError:
+                    return jsonify({'error': 'column_types不是有效的JSON'}), 400
+            infer_types = request.form.get('infer_types', 'true').lower() != 'false'
             
+            extension = os.path.splitext(file.filename)[1].lower()
+            if extension not in ('.csv', '.xlsx', '.xls'):
+                return jsonify({'error': '不支持的文件格式'}), 400
+            
+            # 保存为唯一的临时文件（避免同名文件并发导入时互相覆盖），任务结束后删除
+            upload_folder = current_app.config['UPLOAD_FOLDER']
+            fd, file_path = tempfile.mkstemp(suffix=extension, prefix='import_', dir=upload_folder)
+            os.close(fd)
             try:
-                # 导入表格
-                result = import_table_from_file(file_path, table_name)
-                
-                if result['success']:
-                    # 创建或更新表格元数据
-                    table_metadata = TableMetadata.query.filter_by(table_name=table_name).first()
-                    if not table_metadata:
-                        table_metadata = TableMetadata(
-                            table_name=table_name,
-                            display_name=table_name.replace('_', ' ').title(),
-                            description=f"从文件导入的表格: {file.filename}",
-                            is_active=True
-                        )
-                        db.session.add(table_metadata)
-                        db.session.commit()
-                    
-                    return jsonify({
-                        'message': result['message'],
-                        'table_name': table_name,
-                        'rows_imported': result['rows_imported'],
-                        'columns': result['columns']
-                    }), 201
-                else:
-                    return jsonify({'error': result['message']}), 400
-            finally:
-                # 删除临时文件
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                file.save(file_path)
+            except Exception:
+                os.remove(file_path)
+                raise
+            
+            # 提交后台导入任务，立即返回任务ID
+            job = submit_import_job(
+                file_path, file.filename, table_name, current_user_id,
+                column_types=column_types or None,
+                infer_types=infer_types
+            )
+            return jsonify({
+                'message': '导入任务已提交',
+                'table_name': table_name,
+                'job': serialize_job(job)
+            }), 202
         
         elif import_type == 'sql':
             # SQL语句创建方式
@@ -947,6 +1179,37 @@ def admin_import_table():
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/admin/import-jobs/<string:job_id>', methods=['GET'])
+@jwt_required()
+def get_import_job(job_id):
+    """
+    查询导入任务状态
+    
+    返回：
+    {
+        "job": {
+            "id": "...",
+            "status": "pending|running|completed|failed",
+            "progress": {"stage": "insert", "rows_processed": 10000, "elapsed": 1.2, "rows_per_second": 8333.3},
+            "result": {"table_name": "users", "rows_imported": 10000, ...},
+            "error": null
+        }
+    }
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        job = import_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': '导入任务不存在'}), 404
+        return jsonify({'job': serialize_job(job)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/admin/tables/<string:table_name>/rows', methods=['POST'], strict_slashes=False)
 @jwt_required()
 def admin_insert_table_row(table_name):
@@ -963,18 +1226,11 @@ def admin_insert_table_row(table_name):
     {"message": "数据行插入成功", "inserted_id": 1}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
         # 检查用户权限：管理员或拥有编辑权限
-        if user.role != 'admin':
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name,
-                can_edit=True
-            ).first()
-            if not table_access:
-                return jsonify({'error': '没有权限访问该接口'}), 403
+        if not auth.can(table_name, 'edit'):
+            return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 获取请求数据
         data = request.get_json()
@@ -1019,18 +1275,11 @@ def admin_update_table_row(table_name, row_id):
     {"message": "数据行更新成功", "updated_rows": 1}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
         # 检查用户权限：管理员或拥有编辑权限
-        if user.role != 'admin':
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name,
-                can_edit=True
-            ).first()
-            if not table_access:
-                return jsonify({'error': '没有权限访问该接口'}), 403
+        if not auth.can(table_name, 'edit'):
+            return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 获取请求数据
         data = request.get_json()
@@ -1075,18 +1324,11 @@ def admin_delete_table_row(table_name, row_id):
     {"message": "数据行删除成功", "deleted_rows": 1}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
         # 检查用户权限：管理员或拥有编辑权限
-        if user.role != 'admin':
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name,
-                can_edit=True
-            ).first()
-            if not table_access:
-                return jsonify({'error': '没有权限访问该接口'}), 403
+        if not auth.can(table_name, 'edit'):
+            return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 检查表格是否存在
         if not check_table_exists(table_name):
@@ -1109,6 +1351,73 @@ def admin_delete_table_row(table_name, row_id):
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/admin/tables/<string:table_name>/rows/batch', methods=['POST'], strict_slashes=False)
+@jwt_required()
+def admin_batch_table_rows(table_name):
+    """
+    批量插入、更新和删除表格数据行（管理员或拥有编辑权限的用户）
+    
+    所有修改在一个事务中执行，任何一行失败时整体回滚；数据按表结构校验，校验失败时不做任何修改。
+    
+    参数：
+    table_name: 表格名称
+    
+    请求体：
+    {
+        "primary_key": "id",
+        "insert": [{"column1": "value1"}],
+        "update": [{"id": 1, "data": {"column1": "new_value1"}}],
+        "delete": [2, 3]
+    }
+    primary_key可选，默认为表格的单列主键
+    
+    返回：
+    {"message": "批量修改成功", "primary_key": "id",
+     "inserted": [{"index": 0, "id": 11}],
+     "updated": [{"index": 0, "id": 1, "status": "updated"}],
+     "deleted": [{"index": 0, "id": 2, "status": "deleted"}, {"index": 1, "id": 3, "status": "not_found"}]}
+    校验失败时返回400：{"error": "1行数据校验失败", "errors": [{"op": "insert", "index": 0, "message": "列不存在: xxx"}]}
+    """
+    try:
+        auth = get_auth_context()
+        
+        # 检查用户权限：管理员或拥有编辑权限
+        if not auth.can(table_name, 'edit'):
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        # 获取请求数据
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': '缺少请求数据'}), 400
+        
+        # 检查表格是否存在
+        if not check_table_exists(table_name):
+            return jsonify({'error': '表格不存在'}), 404
+        
+        result = batch_mutate_rows(
+            table_name,
+            inserts=data.get('insert'),
+            updates=data.get('update'),
+            deletes=data.get('delete'),
+            primary_key=data.get('primary_key')
+        )
+        
+        if result['success']:
+            return jsonify({
+                'message': result['message'],
+                'primary_key': result['primary_key'],
+                'inserted': result['inserted'],
+                'updated': result['updated'],
+                'deleted': result['deleted']
+            }), 200
+        else:
+            response = {'error': result['message']}
+            if 'errors' in result:
+                response['errors'] = result['errors']
+            return jsonify(response), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/admin/tables/<string:table_name>', methods=['DELETE'], strict_slashes=False)
 @jwt_required()
 def admin_delete_table(table_name):
@@ -1122,10 +1431,9 @@ def admin_delete_table(table_name):
     {"message": "表格删除成功"}
     """
     try:
-        current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        auth = get_auth_context()
         
-        if user.role != 'admin':
+        if not auth.is_admin:
             return jsonify({'error': '没有权限访问该接口'}), 403
         
         # 直接执行删除操作，不进行存在性检查，因为 DROP TABLE IF EXISTS 会处理表格不存在的情况
@@ -1146,8 +1454,232 @@ def admin_delete_table(table_name):
         for access in table_accesses:
             db.session.delete(access)
         db.session.commit()
+        permission_matrix.invalidate()
         
         # 返回成功消息
         return jsonify({'message': f'表格{table_name}删除成功'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/admin/tables/<string:table_name>/search-index', methods=['GET'], strict_slashes=False)
+@jwt_required()
+def admin_get_search_index(table_name):
+    """
+    管理员查看表格的全文搜索索引
+    
+    参数：
+    table_name: 表格名称
+    
+    返回：
+    {"message": "获取全文搜索索引成功", "exists": true, "columns": ["name", "address"], "searchable_columns": ["name", "address"]}
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        if not check_table_exists(table_name):
+            return jsonify({'error': '表格不存在'}), 404
+        
+        index_columns = get_search_index_columns(table_name)
+        
+        return jsonify({
+            'message': '获取全文搜索索引成功',
+            'exists': index_columns is not None,
+            'columns': index_columns or [],
+            'searchable_columns': get_searchable_columns(table_name)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/admin/tables/<string:table_name>/search-index', methods=['POST'], strict_slashes=False)
+@jwt_required()
+def admin_create_search_index(table_name):
+    """
+    管理员为表格创建（或重建）全文搜索索引
+    
+    参数：
+    table_name: 表格名称
+    
+    返回：
+    {"message": "表格users全文搜索索引创建成功", "columns": ["name", "address"]}
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        if not check_table_exists(table_name):
+            return jsonify({'error': '表格不存在'}), 404
+        
+        result = create_search_index(table_name)
+        
+        if result['success']:
+            return jsonify({
+                'message': result['message'],
+                'columns': result['columns']
+            }), 201
+        else:
+            return jsonify({'error': result['message']}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/admin/tables/<string:table_name>/search-index', methods=['DELETE'], strict_slashes=False)
+@jwt_required()
+def admin_drop_search_index(table_name):
+    """
+    管理员删除表格的全文搜索索引，删除后搜索回退到LIKE模糊匹配
+    
+    参数：
+    table_name: 表格名称
+    
+    返回：
+    {"message": "表格users全文搜索索引删除成功"}
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        if not check_table_exists(table_name):
+            return jsonify({'error': '表格不存在'}), 404
+        
+        result = drop_search_index(table_name)
+        
+        if result['success']:
+            return jsonify({'message': result['message']}), 200
+        else:
+            return jsonify({'error': result['message']}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/admin/tables/<string:table_name>/indexes', methods=['GET'], strict_slashes=False)
+@jwt_required()
+def admin_get_table_indexes(table_name):
+    """
+    管理员查看表格的索引和建索引建议
+    
+    参数：
+    table_name: 表格名称
+    min_requests: 排序/筛选列被使用的次数达到该值才给出建议，默认为INDEX_ADVISOR_MIN_REQUESTS配置
+    
+    返回：
+    {
+        "message": "获取索引列表成功",
+        "indexes": [{"name": "idx_age", "columns": [{"name": "age", "length": null}], "unique": false, "type": "BTREE", "primary": false, "search_index": false}],
+        "suggestions": [{"columns": [{"name": "city", "length": null}, {"name": "age", "length": null}], "reason": "filter_and_sort", "requests": 42}],
+        "usage": {"sort": {"age": 30}, "filter": {"city": 12}, "combined": [...]}
+    }
+    使用次数统计保存在各worker进程内存中，只反映处理本次请求的worker
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        indexes = list_indexes(table_name)
+        if indexes is None:
+            return jsonify({'error': '表格不存在'}), 404
+        
+        min_requests = request.args.get('min_requests', type=int)
+        suggestions = suggest_indexes(table_name) if min_requests is None else suggest_indexes(table_name, min_requests)
+        
+        return jsonify({
+            'message': '获取索引列表成功',
+            'indexes': indexes,
+            'suggestions': suggestions,
+            'usage': column_usage.get(table_name)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/admin/tables/<string:table_name>/indexes', methods=['POST'], strict_slashes=False)
+@jwt_required()
+def admin_create_table_index(table_name):
+    """
+    管理员为表格创建二级索引或联合索引，MySQL支持时以在线DDL方式执行
+    
+    参数：
+    table_name: 表格名称
+    
+    请求体：
+    {
+        "columns": ["city", {"name": "remark", "length": 32}],  // 索引列，TEXT列未指定前缀长度时使用INDEX_PREFIX_LENGTH
+        "name": "idx_city_remark",  // 可选，默认按列名生成
+        "unique": false  // 可选
+    }
+    
+    返回：
+    {"message": "表格users索引idx_city_remark创建成功", "index": {...}, "online": true}
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        if not check_table_exists(table_name):
+            return jsonify({'error': '表格不存在'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        result = create_index(
+            table_name,
+            data.get('columns'),
+            index_name=data.get('name'),
+            unique=bool(data.get('unique', False))
+        )
+        
+        if result['success']:
+            return jsonify({
+                'message': result['message'],
+                'index': result['index'],
+                'online': result['online']
+            }), 201
+        else:
+            return jsonify({'error': result['message']}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/admin/tables/<string:table_name>/indexes/<string:index_name>', methods=['DELETE'], strict_slashes=False)
+@jwt_required()
+def admin_drop_table_index(table_name, index_name):
+    """
+    管理员删除表格的二级索引
+    
+    参数：
+    table_name: 表格名称
+    index_name: 索引名称
+    
+    返回：
+    {"message": "表格users索引idx_city删除成功", "online": true}
+    """
+    try:
+        auth = get_auth_context()
+        
+        if not auth.is_admin:
+            return jsonify({'error': '没有权限访问该接口'}), 403
+        
+        if not check_table_exists(table_name):
+            return jsonify({'error': '表格不存在'}), 404
+        
+        result = drop_index(table_name, index_name)
+        
+        if result['success']:
+            return jsonify({
+                'message': result['message'],
+                'online': result['online']
+            }), 200
+        else:
+            return jsonify({'error': result['message']}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
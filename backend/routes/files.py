@@ -6,9 +6,13 @@ from flask import Blueprint, request, jsonify, send_from_directory
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from ..extensions import db
 from ..models.file import File
-from ..models.user import User
-from ..utils.file import save_file, delete_file, allowed_file
-from ..config import UPLOAD_FOLDER
+from ..utils.file import (
+    delete_file, allowed_file, list_files, count_files, serialize_file,
+    store_upload, register_legacy_file, acquire_blob, release_blobs, remove_released_blobs
+)
+from ..utils.auth import get_auth_context
+from ..config import UPLOAD_FOLDER, FILE_LIST_PAGE_SIZE
+from ..sockets.notifications import emit_file_change, file_event_info
 
 # 创建蓝图
 bp = Blueprint('files', __name__, url_prefix='/api/files')
@@ -45,40 +49,33 @@ def upload_file():
                 continue
             
             if allowed_file(file.filename):
-                # 保存文件
-                filename, filepath = save_file(file)
-                # 获取文件大小 - 将相对路径转换为绝对路径
-                absolute_filepath = os.path.join(UPLOAD_FOLDER, filepath)
-                file_size = os.path.getsize(absolute_filepath)
+                # 保存文件内容，相同内容只保存一份
+                blob = store_upload(file)
                 
                 # 创建文件记录
                 new_file = File(
-                    filename=filename,
-                    filepath=filepath,
-                    size=file_size,
+                    filename=file.filename,
+                    filepath=blob.storage_path,
+                    size=blob.size,
                     user_id=current_user_id,
-                    is_shared=is_shared
+                    is_shared=is_shared,
+                    blob_id=blob.id
                 )
                 
                 new_files.append(new_file)
                 db.session.add(new_file)
                 uploaded_files_data.append({
-                    'filename': filename,
-                    'size': file_size
+                    'filename': file.filename,
+                    'size': blob.size
                 })
         
         db.session.commit()
         
+        for new_file in new_files:
+            emit_file_change('upload', file_event_info(new_file))
+        
         # 构建响应数据，此时可以获取到数据库生成的ID和时间
-        uploaded_files = []
-        for i, new_file in enumerate(new_files):
-            uploaded_files.append({
-                'id': new_file.id,
-                'filename': new_file.filename,
-                'size': new_file.size,
-                'is_shared': new_file.is_shared,
-                'created_at': new_file.created_at.isoformat()
-            })
+        uploaded_files = [serialize_file(new_file) for new_file in new_files]
         
         return jsonify({
             'message': '文件上传成功',
@@ -92,51 +89,68 @@ def upload_file():
 @jwt_required()
 def get_files():
     """
-    获取文件列表
+    获取文件列表（游标分页）
     
     查询参数：
     - shared: 是否只获取共享文件（可选）
     - all: 是否获取所有用户的文件（仅管理员可用）
+    - sort_by: 排序字段，created_at（默认）、filename或size
+    - sort_order: 排序方向，asc或desc（默认）
+    - limit: 每页条数，默认50，最大500
+    - cursor: 上一页返回的next_cursor
+    - search: 文件名包含的关键词（可选）
+    - prefix: 文件名前缀（可选）
     
     返回：
-    {"message": "获取文件列表成功", "files": [{"id": 1, "filename": "test.txt", "size": 1024}]}
+    {"message": "获取文件列表成功", "files": [{"id": 1, "filename": "test.txt", "size": 1024}], "next_cursor": "xxx", "has_more": true, "total": 120}
+    total为符合条件的文件总数，只在第一页（不带cursor）返回
     """
     try:
         # 获取当前用户ID和角色
         current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        user = get_auth_context().user
         
         # 获取查询参数
         shared_param = request.args.get('shared')
         all_param = request.args.get('all')
         
-        # 查询文件列表
+        # 按范围筛选文件
         if shared_param and shared_param.lower() == 'true':
             # 获取共享文件（所有用户的共享文件）
-            files = File.query.filter(File.is_shared == True).all()
+            query = File.query.filter(File.is_shared == True)
         elif all_param and all_param.lower() == 'true' and user.role == 'admin':
             # 管理员获取所有用户的文件
-            files = File.query.all()
+            query = File.query
         else:
             # 获取当前用户的文件
-            files = File.query.filter(File.user_id == current_user_id).all()
-        
-        # 转换为响应格式
-        file_list = []
-        for file in files:
-            file_list.append({
-                'id': file.id,
-                'filename': file.filename,
-                'size': file.size,
-                'is_shared': file.is_shared,
-                'created_at': file.created_at.isoformat(),
-                'uploader': file.user.username
-            })
-        
-        return jsonify({
+            query = File.query.filter(File.user_id == current_user_id)
+        
+        search = request.args.get('search', '').strip()
+        prefix = request.args.get('prefix', '')
+        cursor = request.args.get('cursor')
+        try:
+            files, next_cursor = list_files(
+                query,
+                sort_by=request.args.get('sort_by', 'created_at'),
+                sort_order=request.args.get('sort_order', 'desc').lower(),
+                limit=request.args.get('limit', FILE_LIST_PAGE_SIZE, type=int),
+                cursor=cursor,
+                search=search,
+                prefix=prefix
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        response = {
             'message': '获取文件列表成功',
-            'files': file_list
-        }), 200
+            'files': [serialize_file(file) for file in files],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        # 总数只在第一页统计，翻页时不重复统计
+        if not cursor:
+            response['total'] = count_files(query, search, prefix)
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -197,7 +211,7 @@ def delete_file_route(file_id):
     try:
         # 获取当前用户ID和角色
         current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        user = get_auth_context().user
         
         # 查询文件
         file = File.query.get(file_id)
@@ -208,21 +222,22 @@ def delete_file_route(file_id):
         if user.role != 'admin' and file.user_id != current_user_id:
             return jsonify({'error': '没有权限删除该文件'}), 403
         
-        # 删除文件 - 处理绝对路径和相对路径
-        if os.path.isabs(file.filepath):
-            # 旧文件：使用绝对路径
-            absolute_filepath = file.filepath
-        else:
-            # 新文件：使用相对路径，结合UPLOAD_FOLDER
-            absolute_filepath = os.path.join(UPLOAD_FOLDER, file.filepath)
-        
-        if os.path.exists(absolute_filepath):
-            os.remove(absolute_filepath)
+        # 释放对文件内容的引用，没有其他文件引用时删除内容记录
+        released = release_blobs([file.blob_id])
+        legacy_path = file.filepath if file.blob_id is None else None
         
-        # 删除数据库记录
+        # 删除数据库记录（提交前记录文件信息用于推送）
+        file_info = file_event_info(file)
         db.session.delete(file)
         db.session.commit()
         
+        # 提交成功后再删除磁盘文件，事务回滚时文件仍然可用
+        remove_released_blobs(released)
+        if legacy_path:
+            # 去重存储之前上传的旧文件（相对路径或绝对路径）
+            delete_file(legacy_path)
+        emit_file_change('delete', file_info)
+        
         return jsonify({'message': '文件删除成功'}), 200
         
     except Exception as e:
@@ -265,46 +280,36 @@ def copy_shared_file(file_id):
         if not os.path.exists(original_absolute_filepath):
             return jsonify({'error': '原始文件不存在'}), 404
         
-        # 生成新的文件名和路径
-        import shutil
-        import uuid
-        
-        # 生成唯一文件名
-        file_ext = os.path.splitext(file.filename)[1]
-        new_unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-        new_absolute_filepath = os.path.join(UPLOAD_FOLDER, new_unique_filename)
-        
-        # 复制文件内容
-        shutil.copy2(original_absolute_filepath, new_absolute_filepath)
-        
-        # 获取文件大小
-        file_size = os.path.getsize(new_absolute_filepath)
+        # 不复制文件内容，新文件记录引用原文件的内容
+        redundant_path = None
+        if file.blob_id is None:
+            # 去重存储之前上传的旧文件先登记内容
+            blob, redundant_path = register_legacy_file(file)
+        else:
+            blob = file.blob
+        acquire_blob(blob.id)
         
         # 创建新的文件记录，属于当前用户且非共享
         new_file = File(
             filename=file.filename,  # 使用原始文件名
-            filepath=new_unique_filename,  # 使用新的文件路径
-            size=file_size,
+            filepath=blob.storage_path,
+            size=blob.size,
             user_id=current_user_id,
-            is_shared=False  # 非共享文件
+            is_shared=False,  # 非共享文件
+            blob_id=blob.id
         )
         
         # 保存到数据库
         db.session.add(new_file)
         db.session.commit()
-        
-        # 构建响应数据
-        response_file = {
-            'id': new_file.id,
-            'filename': new_file.filename,
-            'size': new_file.size,
-            'is_shared': new_file.is_shared,
-            'created_at': new_file.created_at.isoformat()
-        }
+        if redundant_path:
+            # 旧文件的内容与已有内容相同，改为引用已有内容后删除旧文件
+            delete_file(redundant_path)
+        emit_file_change('copy', file_event_info(new_file))
         
         return jsonify({
             'message': '文件复制成功',
-            'file': response_file
+            'file': serialize_file(new_file)
         }), 201
         
     except Exception as e:
@@ -325,7 +330,7 @@ def share_file(file_id):
     try:
         # 获取当前用户ID和角色
         current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        user = get_auth_context().user
         
         # 查询文件
         file = File.query.get(file_id)
@@ -338,8 +343,10 @@ def share_file(file_id):
         
         # 更新分享状态
         data = request.get_json()
+        previous_shared = file.is_shared
         file.is_shared = data.get('is_shared', False)
         db.session.commit()
+        emit_file_change('share', file_event_info(file), previous_shared)
         
         return jsonify({
             'message': '文件分享状态更新成功',
@@ -364,7 +371,7 @@ def rename_file(file_id):
     try:
         # 获取当前用户ID和角色
         current_user_id = int(get_jwt_identity())
-        user = User.query.get(current_user_id)
+        user = get_auth_context().user
         
         # 查询文件
         file = File.query.get(file_id)
@@ -385,6 +392,7 @@ def rename_file(file_id):
         # 更新文件名
         file.filename = new_filename
         db.session.commit()
+        emit_file_change('rename', file_event_info(file))
         
         return jsonify({
             'message': '文件重命名成功',
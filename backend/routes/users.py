@@ -3,10 +3,13 @@
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import jwt_required
 from backend.extensions import db
 from backend.models.user import User
-from backend.utils.auth import hash_password
+from backend.utils.auth import hash_password, get_auth_context
+from backend.utils.token_cache import token_cache
+from backend.utils.permissions import permission_matrix
+from backend.utils.file import release_blobs, remove_released_blobs
 
 # 创建蓝图
 bp = Blueprint('users', __name__, url_prefix='/api/users')
@@ -22,8 +25,7 @@ def get_users():
     """
     try:
         # 检查当前用户是否为管理员
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
+        current_user = get_auth_context().user
         
         if current_user.role != 'admin':
             return jsonify({'error': '只有管理员可以查看用户列表'}), 403
@@ -64,8 +66,7 @@ def create_user():
     """
     try:
         # 检查当前用户是否为管理员
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
+        current_user = get_auth_context().user
         
         if current_user.role != 'admin':
             return jsonify({'error': '只有管理员可以创建用户'}), 403
@@ -117,8 +118,7 @@ def get_user(user_id):
     """
     try:
         # 检查当前用户是否为管理员
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
+        current_user = get_auth_context().user
         
         if current_user.role != 'admin' and current_user.id != user_id:
             return jsonify({'error': '只有管理员或本人可以查看用户信息'}), 403
@@ -157,8 +157,7 @@ def update_user(user_id):
     """
     try:
         # 检查当前用户是否为管理员
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
+        current_user = get_auth_context().user
         
         if current_user.role != 'admin' and current_user.id != user_id:
             return jsonify({'error': '只有管理员或本人可以更新用户信息'}), 403
@@ -184,6 +183,7 @@ def update_user(user_id):
             user.password_hash = hash_password(data['password'])
         
         db.session.commit()
+        token_cache.invalidate(user.id)
         
         return jsonify({
             'message': '更新用户信息成功',
@@ -209,8 +209,7 @@ def delete_user(user_id):
     """
     try:
         # 检查当前用户是否为管理员
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
+        current_user = get_auth_context().user
         
         if current_user.role != 'admin':
             return jsonify({'error': '只有管理员可以删除用户'}), 403
@@ -225,9 +224,15 @@ def delete_user(user_id):
         if not user:
             return jsonify({'error': '用户不存在'}), 404
         
-        # 删除用户
+        # 释放用户文件对文件内容的引用（文件记录随用户级联删除）
+        released = release_blobs([file.blob_id for file in user.files])
+        
+        # 删除用户，提交成功后再删除不再被引用的内容文件
         db.session.delete(user)
         db.session.commit()
+        remove_released_blobs(released)
+        token_cache.invalidate(user_id)
+        permission_matrix.invalidate(user_id)
         
         return jsonify({'message': '删除用户成功'}), 200
         
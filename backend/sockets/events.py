@@ -0,0 +1,106 @@
+"""
+Socket.IO事件处理
+
+客户端连接时在auth中携带JWT令牌：io(url, {auth: {token: 'xxx'}})，
+令牌无效或已在其他地方登录时拒绝连接。连接成功后自动加入自己的用户房间和共享文件房间，
+表格的变更事件需要通过subscribe_table订阅；订阅后权限被收回时不再收到该表格的事件。
+"""
+
+from flask import request
+from flask_jwt_extended import decode_token
+from flask_socketio import join_room, leave_room
+from ..extensions import socketio
+from ..models.user import User
+from ..utils.permissions import permission_matrix
+from ..utils.schema_catalog import schema_catalog
+from .notifications import table_room, user_room, SHARED_FILES_ROOM
+
+# 已连接的客户端 {sid: 用户ID}（每个worker进程一份）
+connected_users = {}
+
+
+def _authenticate(token):
+    """
+    校验JWT令牌
+
+    Args:
+        token: JWT访问令牌
+
+    Returns:
+        User: 令牌对应的用户，无效时返回None
+    """
+    if not token:
+        return None
+    try:
+        payload = decode_token(token)
+    except Exception:
+        return None
+
+    token_identifier = payload.get('token_identifier')
+    user_id = payload.get('sub')
+    if not token_identifier or not user_id:
+        return None
+
+    user = User.query.get(int(user_id))
+    # 与HTTP接口一致：令牌标识符不一致说明账号已在其他地方登录
+    if not user or user.jwt_token_identifier != token_identifier:
+        return None
+    return user
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    """建立连接，校验令牌并加入用户房间和共享文件房间"""
+    token = (auth or {}).get('token') if isinstance(auth, dict) else None
+    user = _authenticate(token or request.args.get('token'))
+    if user is None:
+        return False
+
+    connected_users[request.sid] = user.id
+    join_room(user_room(user.id))
+    join_room(SHARED_FILES_ROOM)
+
+
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    """断开连接"""
+    connected_users.pop(request.sid, None)
+
+
+@socketio.on('subscribe_table')
+def handle_subscribe_table(data):
+    """
+    订阅表格的变更事件
+
+    消息格式：{"table_name": "users"}
+
+    返回（客户端的回调参数）：
+    {"success": true, "table_name": "users"}
+    """
+    table_name = (data or {}).get('table_name') if isinstance(data, dict) else None
+    user = User.query.get(connected_users.get(request.sid, 0))
+    if user is None:
+        return {'success': False, 'message': '未登录'}
+    if not table_name or not schema_catalog.table_exists(table_name):
+        return {'success': False, 'message': '表格不存在'}
+
+    # 检查查看权限
+    if user.role != 'admin' and not permission_matrix.has_permission(user.id, table_name, 'view'):
+        return {'success': False, 'message': '没有访问该表格的权限'}
+
+    join_room(table_room(table_name, user.id))
+    return {'success': True, 'table_name': table_name}
+
+
+@socketio.on('unsubscribe_table')
+def handle_unsubscribe_table(data):
+    """
+    取消订阅表格的变更事件
+
+    消息格式：{"table_name": "users"}
+    """
+    table_name = (data or {}).get('table_name') if isinstance(data, dict) else None
+    user_id = connected_users.get(request.sid)
+    if table_name and user_id:
+        leave_room(table_room(table_name, user_id))
+    return {'success': True, 'table_name': table_name}
@@ -0,0 +1,147 @@
+"""
+变更通知推送
+
+数据行增删改、表格重新导入/删除、文件上传/删除/分享等操作提交成功后，
+通过Socket.IO把变更事件推送给订阅的客户端，客户端据此增量更新，不必重新查询整页数据。
+
+房间划分：
+- table:<表格名称>:user:<用户ID>：该用户订阅该表格的连接。推送时按数据库中当前的查看权限
+  确定接收的用户，权限被收回后即使连接仍在房间中也不再收到该表格的行数据
+- user:<用户ID>：用户自己的所有连接，接收自己文件的变更
+- files:shared：所有已登录的连接，接收共享文件的变更
+
+推送失败只打印日志，不影响业务操作的结果。
+"""
+
+import base64
+from decimal import Decimal
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import select, union
+from ..extensions import socketio, db
+from ..models.user import User
+from ..models.data_share import TableAccess
+
+# 表格变更事件
+TABLE_CHANGE_EVENT = 'table_change'
+# 文件变更事件
+FILE_CHANGE_EVENT = 'file_change'
+
+# 共享文件房间
+SHARED_FILES_ROOM = 'files:shared'
+
+
+def table_room(table_name, user_id):
+    """用户订阅表格的房间名称"""
+    return f'table:{table_name}:user:{user_id}'
+
+
+def user_room(user_id):
+    """用户的房间名称"""
+    return f'user:{user_id}'
+
+
+def _json_safe(value):
+    """把数据库返回的值转换为可JSON序列化的值"""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return value
+
+
+def _emit(event, payload, rooms):
+    """向房间推送事件，Socket.IO未初始化时（如命令行脚本中）直接跳过"""
+    if socketio.server is None:
+        return
+    try:
+        socketio.emit(event, _json_safe(payload), to=list(rooms))
+    except Exception as e:
+        print(f"推送{event}事件失败: {str(e)}")
+
+
+def table_viewer_rooms(table_name):
+    """
+    当前有权查看表格的用户（管理员和拥有查看权限的用户）的订阅房间
+
+    每次推送前直接查询数据库，不使用权限缓存，权限被收回后立即停止推送；
+    同一操作推送多个事件时可先调用一次，把结果传给emit_table_change
+    """
+    if socketio.server is None:
+        return []
+    try:
+        user_ids = db.session.execute(union(
+            select(User.id).where(User.role == 'admin'),
+            select(TableAccess.user_id).where(
+                TableAccess.table_name == table_name,
+                TableAccess.can_view.is_(True)
+            )
+        )).scalars().all()
+    except Exception as e:
+        print(f"查询表格{table_name}的订阅用户失败: {str(e)}")
+        return []
+    return [table_room(table_name, user_id) for user_id in user_ids]
+
+
+def emit_table_change(table_name, action, primary_key=None, id_value=None, row=None, rooms=None):
+    """
+    推送表格变更事件，只发送给当前有权查看该表格的订阅者
+
+    Args:
+        table_name: 表格名称
+        action: insert、update、delete，或reload（表格被重新导入/删除，客户端需重新加载）
+        primary_key: 主键列名
+        id_value: 变更行的主键值
+        row: insert时为插入的数据，update时为修改的列
+        rooms: table_viewer_rooms()的结果，为None时重新查询
+    """
+    payload = {
+        'table_name': table_name,
+        'action': action,
+        'primary_key': primary_key,
+        'id': id_value,
+        'row': row
+    }
+    if rooms is None:
+        rooms = table_viewer_rooms(table_name)
+    if rooms:
+        _emit(TABLE_CHANGE_EVENT, payload, rooms)
+
+
+def file_event_info(file):
+    """
+    文件变更事件中的文件信息
+
+    删除文件时需在提交删除之前调用，提交后模型实例的属性不能再读取
+    """
+    return {
+        'id': file.id,
+        'filename': file.filename,
+        'size': file.size,
+        'user_id': file.user_id,
+        'is_shared': file.is_shared,
+        'created_at': file.created_at,
+        'updated_at': file.updated_at
+    }
+
+
+def emit_file_change(action, file_info, previous_shared=False):
+    """
+    推送文件变更事件，发送给文件所有者；共享文件（或刚取消共享的文件）同时发送给所有用户
+
+    Args:
+        action: upload、delete、rename、share、copy
+        file_info: file_event_info()返回的文件信息
+        previous_shared: 变更前是否为共享文件
+    """
+    rooms = [user_room(file_info['user_id'])]
+    if file_info['is_shared'] or previous_shared:
+        rooms.append(SHARED_FILES_ROOM)
+    _emit(FILE_CHANGE_EVENT, {'action': action, 'file': file_info}, rooms)
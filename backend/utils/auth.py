@@ -5,12 +5,12 @@
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, get_jwt_identity
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, g
 from datetime import timedelta
 from ..config import JWT_ACCESS_TOKEN_EXPIRES
 from ..models.user import User
-from ..models.data_share import TableAccess
 from ..extensions import db
+from .permissions import permission_matrix, permission_bit
 
 def hash_password(password):
     """
@@ -63,6 +63,84 @@ def create_jwt_token(user_id):
     return access_token, token_identifier
 
 
+class AuthContext:
+    """
+    当前请求的用户身份和表格权限
+
+    用户在首次使用时加载一次，表格权限来自权限矩阵缓存，整个请求内复用
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.id
+        self.role = user.role
+        self._permissions = None
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def permissions(self):
+        """{表格名称: 权限位掩码}，管理员为空字典（管理员拥有所有权限）"""
+        if self._permissions is None:
+            self._permissions = {} if self.is_admin else permission_matrix.get_user_permissions(self.user_id)
+        return self._permissions
+
+    def has_access(self, table_name):
+        """是否有该表格的权限记录"""
+        return self.is_admin or table_name in self.permissions
+
+    def can(self, table_name, permission='view'):
+        """
+        检查是否拥有表格的某项权限，管理员拥有所有权限
+
+        Args:
+            table_name: 表格名称
+            permission: 'view'、'edit'或'export'
+        """
+        if self.is_admin:
+            return True
+        return bool(self.permissions.get(table_name, 0) & permission_bit(permission))
+
+    def accessible_tables(self, permission='view'):
+        """获取拥有某项权限的表格名称列表（不含管理员的全部表格）"""
+        if self.is_admin:
+            return []
+        return permission_matrix.tables_with(self.user_id, permission)
+
+
+def load_auth_context(user_id):
+    """
+    加载用户并保存到当前请求中
+
+    Args:
+        user_id: 用户ID
+
+    Returns:
+        AuthContext: 用户不存在时返回None
+    """
+    user = db.session.get(User, user_id)
+    context = AuthContext(user) if user else None
+    g.auth_context = context
+    return context
+
+
+def get_auth_context():
+    """
+    获取当前请求的身份和权限上下文，需在jwt_required()之后调用
+
+    令牌校验时已加载的上下文直接复用，否则按令牌中的用户ID加载一次
+
+    Returns:
+        AuthContext: 用户不存在时返回None
+    """
+    context = g.get('auth_context')
+    if context is None:
+        context = load_auth_context(int(get_jwt_identity()))
+    return context
+
+
 def check_table_access(table_name, required_permission='view'):
     """
     检查用户对表格的访问权限
@@ -77,29 +155,22 @@ def check_table_access(table_name, required_permission='view'):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # 获取当前用户ID
-            current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            auth = get_auth_context()
             
             # 管理员直接通过
-            if user.role == 'admin':
+            if auth.is_admin:
                 return func(*args, **kwargs)
             
             # 检查用户权限
-            table_access = TableAccess.query.filter_by(
-                user_id=current_user_id,
-                table_name=table_name
-            ).first()
-            
-            if not table_access:
+            if not auth.has_access(table_name):
                 return jsonify({'error': '没有访问该表格的权限'}), 403
             
             # 检查具体权限
-            if required_permission == 'view' and not table_access.can_view:
+            if required_permission == 'view' and not auth.can(table_name, 'view'):
                 return jsonify({'error': '没有查看该表格的权限'}), 403
-            elif required_permission == 'edit' and not table_access.can_edit:
+            elif required_permission == 'edit' and not auth.can(table_name, 'edit'):
                 return jsonify({'error': '没有编辑该表格的权限'}), 403
-            elif required_permission == 'export' and not table_access.can_export:
+            elif required_permission == 'export' and not auth.can(table_name, 'export'):
                 return jsonify({'error': '没有导出该表格的权限'}), 403
             
             return func(*args, **kwargs)
@@ -0,0 +1,84 @@
+"""
+进程内缓存工具
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUTTLCache:
+    """
+    线程安全的LRU + TTL缓存
+
+    超过最大条目数时淘汰最久未使用的条目，条目过期后在访问时被移除。
+    """
+
+    def __init__(self, maxsize, ttl):
+        """
+        Args:
+            maxsize: 最大条目数
+            ttl: 默认有效期，单位：秒
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        获取缓存值
+
+        Args:
+            key: 缓存键
+            default: 未命中或已过期时返回的默认值
+
+        Returns:
+            缓存值
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 有效期，默认为None（使用缓存的默认有效期）
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """删除缓存值"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+_MISSING = object()
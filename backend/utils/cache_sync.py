@@ -0,0 +1,91 @@
+"""
+跨worker进程的缓存失效
+
+表结构目录、表格权限等缓存在每个worker进程中各有一份，进程内失效只影响当前进程。
+system库的cache_versions表为每个缓存保存一个版本号：修改数据的进程在失效本进程缓存的同时递增版本号，
+每个进程在请求开始时读取所有版本号（一条查询，两次读取至少间隔CACHE_SYNC_INTERVAL秒），
+发现变化时清空本进程的对应缓存；其他进程最多延迟CACHE_SYNC_INTERVAL秒看到失效。
+"""
+
+import time
+import threading
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from ..extensions import db
+from ..config import CACHE_SYNC_INTERVAL
+from ..models.cache_version import CacheVersion
+
+
+class CacheSync:
+    """缓存版本号的发布和检查（每个worker进程一份）"""
+
+    def __init__(self, interval):
+        """
+        Args:
+            interval: 两次检查之间的最小间隔，单位：秒，0表示每个请求都检查
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._listeners = {}
+        self._seen = {}
+        self._checked_at = None
+
+    def register(self, name, listener):
+        """
+        注册缓存，其他进程递增版本号后调用listener()清空本进程的缓存
+
+        Args:
+            name: 缓存名称
+            listener: 无参数的清空函数
+        """
+        with self._lock:
+            self._listeners.setdefault(name, []).append(listener)
+
+    def bump(self, name):
+        """
+        递增缓存的版本号，通知其他进程失效（在单独的事务中提交，不影响当前会话）
+
+        Args:
+            name: 缓存名称
+        """
+        stmt = mysql_insert(CacheVersion.__table__).values(name=name, version=1, updated_at=datetime.now())
+        stmt = stmt.on_duplicate_key_update(
+            version=CacheVersion.__table__.c.version + 1,
+            updated_at=stmt.inserted.updated_at
+        )
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(stmt)
+        except Exception as e:
+            print(f"发布缓存{name}的失效通知失败: {str(e)}")
+
+    def check(self):
+        """读取版本号，清空版本号发生变化的缓存"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._listeners:
+                return
+            if self.interval > 0 and self._checked_at is not None and now - self._checked_at < self.interval:
+                return
+            self._checked_at = now
+
+        try:
+            rows = db.session.execute(select(CacheVersion.name, CacheVersion.version)).all()
+        except Exception as e:
+            print(f"读取缓存版本号失败: {str(e)}")
+            return
+
+        listeners = []
+        with self._lock:
+            for name, version in rows:
+                # 进程启动后第一次读到的版本号也按变化处理，启动前可能已有缓存被填充
+                if self._seen.get(name, 0) != version:
+                    self._seen[name] = version
+                    listeners.extend(self._listeners.get(name, ()))
+        for listener in listeners:
+            listener()
+
+
+# 缓存失效通知
+cache_sync = CacheSync(CACHE_SYNC_INTERVAL)
@@ -0,0 +1,156 @@
+"""
+按表结构校验要写入的列值
+
+批量修改数据行前逐行检查值是否符合列的类型和NOT NULL约束，
+把不能写入的行作为校验错误返回，避免其中一行出错导致整个事务回滚。
+只检查常见类型（整数、定点数、浮点数、日期时间、定长/变长字符串），其他类型的值交给数据库处理。
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+from datetime import date, datetime
+from .search_index import _base_type
+from .schema_inference import DATE_PATTERN, DATETIME_PATTERN
+
+# 整数类型的位数
+INTEGER_TYPE_BITS = {
+    'tinyint': 8, 'smallint': 16, 'mediumint': 24, 'int': 32, 'integer': 32, 'bigint': 64
+}
+# 整数字符串（MySQL允许前导零）
+INTEGER_VALUE_PATTERN = re.compile(r'^\s*[+-]?\d+\s*$')
+# 列类型中的长度/精度参数，如varchar(255)、decimal(10,2)
+TYPE_ARGUMENTS_PATTERN = re.compile(r'\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)')
+# DECIMAL未指定精度时的默认值
+DEFAULT_DECIMAL_PRECISION = 10
+# 数字类型
+NUMERIC_TYPES = tuple(INTEGER_TYPE_BITS) + ('decimal', 'numeric', 'float', 'double', 'real')
+
+
+def _column_type(column):
+    column_type = column['type']
+    if isinstance(column_type, bytes):
+        column_type = column_type.decode('utf-8')
+    return column_type.lower()
+
+
+def _type_arguments(column_type):
+    """获取列类型的参数，如decimal(10,2) -> (10, 2)，没有参数时返回(None, None)"""
+    match = TYPE_ARGUMENTS_PATTERN.search(column_type)
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2)) if match.group(2) else None
+
+
+def _is_valid_temporal(value, with_time):
+    """检查日期（with_time时也可以是日期时间）字符串是否有效"""
+    if isinstance(value, datetime):
+        return with_time
+    if isinstance(value, date):
+        return True
+    text_value = str(value).strip()
+    match = DATE_PATTERN.match(text_value)
+    if match:
+        year, month, day = match.groups()
+        hour = minute = second = 0
+    else:
+        match = DATETIME_PATTERN.match(text_value) if with_time else None
+        if not match:
+            return False
+        year, month, day, hour, minute, second, _ = match.groups()
+    try:
+        date(int(year), int(month), int(day))
+    except ValueError:
+        return False
+    return int(hour) < 24 and int(minute) < 60 and int(second or 0) < 60
+
+
+def is_auto_filled(column):
+    """列的值可以由数据库生成（自增列、有默认值的列、生成列），插入时可以省略"""
+    extra = (column.get('extra') or '').lower()
+    return (
+        column['null'] != 'NO'
+        or column.get('default') is not None
+        or 'auto_increment' in extra
+        or 'generated' in extra
+    )
+
+
+def check_column_value(column, value):
+    """
+    检查值是否可以写入列
+
+    Args:
+        column: 列信息（格式与DESCRIBE一致）
+        value: 要写入的值（JSON解析得到）
+
+    Returns:
+        str: 不能写入的原因，可以写入时返回None
+    """
+    name = column['name']
+    if value is None:
+        if column['null'] == 'NO' and 'auto_increment' not in (column.get('extra') or '').lower():
+            return f'列{name}不能为空'
+        return None
+
+    column_type = _column_type(column)
+    base_type = _base_type(column)
+    if isinstance(value, (dict, list)):
+        return None if base_type == 'json' else f'列{name}的值不能是对象或数组'
+
+    if base_type in INTEGER_TYPE_BITS:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, str) and INTEGER_VALUE_PATTERN.match(value):
+            value = int(value)
+        if not isinstance(value, int):
+            return f'列{name}需要整数: {value}'
+        bits = INTEGER_TYPE_BITS[base_type]
+        if 'unsigned' in column_type:
+            low, high = 0, 2 ** bits - 1
+        else:
+            low, high = -2 ** (bits - 1), 2 ** (bits - 1) - 1
+        if not low <= value <= high:
+            return f'列{name}的值超出范围: {value}'
+    elif base_type in ('decimal', 'numeric'):
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            return f'列{name}需要数字: {value}'
+        if not number.is_finite():
+            return f'列{name}需要数字: {value}'
+        precision, scale = _type_arguments(column_type)
+        precision = precision or DEFAULT_DECIMAL_PRECISION
+        # 小数位超出时数据库会四舍五入，整数位超出时报错
+        int_digits = number.adjusted() + 1 if number and abs(number) >= 1 else 0
+        if int_digits > precision - (scale or 0):
+            return f'列{name}的值超出范围: {value}'
+    elif base_type in ('float', 'double', 'real'):
+        try:
+            float(str(value).strip())
+        except ValueError:
+            return f'列{name}需要数字: {value}'
+    elif base_type == 'date':
+        if not _is_valid_temporal(value, with_time=False):
+            return f'列{name}需要日期（如2024-01-31）: {value}'
+    elif base_type in ('datetime', 'timestamp'):
+        if not _is_valid_temporal(value, with_time=True):
+            return f'列{name}需要日期时间（如2024-01-31 08:00:00）: {value}'
+    elif base_type in ('char', 'varchar'):
+        length, _ = _type_arguments(column_type)
+        if length is not None and len(str(value)) > length:
+            return f'列{name}的值超过最大长度{length}'
+    return None
+
+
+def comparable_value(column, value):
+    """
+    把值转换为可比较的形式，用于判断同一批数据中的主键值是否重复
+
+    数字列按数值比较（1、"1"和"1.0"相同），其他列按字符串比较
+    """
+    if _base_type(column) in NUMERIC_TYPES:
+        try:
+            return Decimal(str(value).strip())
+        except InvalidOperation:
+            pass
+    return str(value)
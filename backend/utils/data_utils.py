@@ -3,19 +3,123 @@
 """
 
 import os
+import re
 import csv
-from io import StringIO, BytesIO
+import json
+import time
+import base64
+import tempfile
+from datetime import datetime, date, time as dt_time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from io import StringIO
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 from flask import current_app
+from functools import wraps
 from sqlalchemy import text, desc
+from sqlalchemy.exc import DBAPIError
 from ..extensions import db
-from ..config import DATASHARE_DB_CONFIG, DATASHARE_DB_BIND
+from ..config import (
+    DATASHARE_DB_CONFIG, DATASHARE_DB_BIND,
+    COUNT_CACHE_MAX_ENTRIES, COUNT_CACHE_TTL, COUNT_ESTIMATE_THRESHOLD,
+    SEARCH_INDEX_AUTO_CREATE, GLOBAL_SEARCH_MAX_WORKERS, GLOBAL_SEARCH_TIMEOUT,
+    EXPORT_CHUNK_SIZE, IMPORT_CHUNK_SIZE, IMPORT_BATCH_SIZE, IMPORT_ENGINE, IMPORT_INFER_TYPES,
+    ROW_BATCH_MAX_ROWS
+)
 from ..models.data_share import TableMetadata
+from .db_pool import connect, get_import_engine
+from .schema_catalog import schema_catalog
+from .cache_sync import cache_sync
+from .cache import LRUTTLCache
+from .search_index import (
+    build_fulltext_condition, create_search_index, get_search_index_columns,
+    may_match_column, is_missing_fulltext_error
+)
+from .schema_inference import infer_schema, default_schema, apply_column_overrides
+from .table_indexes import record_column_usage, column_usage
+from .filters import compile_filters
+from .column_values import check_column_value, comparable_value, is_auto_filled
+from ..sockets.notifications import emit_table_change, table_viewer_rooms
 
 # 数据共享数据库配置常量
 DATASHARE_DB_NAME = DATASHARE_DB_CONFIG['database']
 
 
+def get_engine(database=DATASHARE_DB_NAME):
+    """
+    获取数据库引擎，引擎及其连接池在每个worker进程中只创建一次
+    
+    Args:
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+        
+    Returns:
+        Engine: SQLAlchemy引擎
+    """
+    if database == DATASHARE_DB_NAME:
+        # 使用datashare数据库连接
+        return db.engines[DATASHARE_DB_BIND]
+    # 使用主数据库连接
+    return db.engine
+
+
+def invalidate_table_schema(table_name=None, database=DATASHARE_DB_NAME):
+    """
+    表结构发生变化后失效表结构目录缓存
+    
+    Args:
+        table_name: 表格名称，默认为None（整体失效）
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+    """
+    if database == DATASHARE_DB_NAME:
+        schema_catalog.invalidate(table_name)
+
+
+def _describe_table(connection, table_name):
+    """
+    执行DESCRIBE查询获取列信息
+    
+    Args:
+        connection: 数据库连接
+        table_name: 表格名称
+        
+    Returns:
+        list: 列信息列表
+    """
+    # 获取列信息 - 使用正确的引号处理表名
+    result = connection.execute(text(f"DESCRIBE `{table_name}`"))
+    
+    # 转换为字典列表
+    column_info = []
+    for column in result.fetchall():
+        column_info.append({
+            'name': column[0],
+            'type': column[1],
+            'null': column[2],
+            'key': column[3],
+            'default': column[4],
+            'extra': column[5]
+        })
+    return column_info
+
+
+def _get_columns(connection, table_name, database):
+    """
+    获取表格列信息，数据共享库使用表结构目录缓存，其他库执行DESCRIBE
+    
+    Returns:
+        list: 列信息列表，表格不存在时为空列表
+    """
+    if database == DATASHARE_DB_NAME:
+        return schema_catalog.get_columns(table_name) or []
+    return _describe_table(connection, table_name)
+
+
+def _get_column_names(connection, table_name, database):
+    """获取表格列名列表，表格不存在时为空列表"""
+    return [column['name'] for column in _get_columns(connection, table_name, database)]
+
+
 def check_table_exists(table_name, database=DATASHARE_DB_NAME):
     """
     检查表格是否存在
@@ -33,151 +137,476 @@ def check_table_exists(table_name, database=DATASHARE_DB_NAME):
         table_name = table_name.strip("'\"")
     
     if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-        inspector = db.inspect(engine)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
-        inspector = db.inspect(engine)
+        # 数据共享库直接查询表结构目录缓存
+        return schema_catalog.table_exists(table_name)
+    
+    engine = get_engine(database)
+    inspector = db.inspect(engine)
+    
+    # 使用inspector.get_table_names()获取所有表格名称，然后进行精确匹配
+    # 注意：不能调用engine.dispose()，否则会销毁整个连接池
+    tables = inspector.get_table_names()
+    return table_name in tables
+
+
+# 全局搜索线程池，各表格的搜索并发执行，每个任务从连接池单独获取连接
+_search_executor = ThreadPoolExecutor(max_workers=GLOBAL_SEARCH_MAX_WORKERS, thread_name_prefix='global-search')
+
+
+def _search_table(engine, table_name, query, params, deadline, fallback=None):
+    """
+    在线程池中执行单个表格的搜索
+    
+    任务可能在线程池中排队，开始执行时才按剩余时间设置MAX_EXECUTION_TIME提示，
+    让MySQL在截止时间终止慢查询、及时归还连接；已经没有剩余时间时不再查询。
+    
+    Args:
+        engine: 数据库引擎
+        table_name: 表格名称
+        query: 查询语句中SELECT之后的部分
+        params: 查询参数
+        deadline: 整个搜索的截止时间（time.monotonic()）
+        fallback: 全文索引已被删除时改用的LIKE搜索 (SELECT之后的部分, 参数)，不使用全文索引时为None
     
+    Returns:
+        tuple: (列名列表, 数据行列表)，已到截止时间未查询时返回None
+    """
+    def with_time_limit(body):
+        max_execution_ms = int((deadline - time.monotonic()) * 1000)
+        if max_execution_ms <= 0:
+            return None
+        return text(f"SELECT /*+ MAX_EXECUTION_TIME({max_execution_ms}) */ {body}")
+
+    connection = connect(engine)
     try:
-        # 使用inspector.get_table_names()获取所有表格名称，然后进行精确匹配
-        tables = inspector.get_table_names()
-        return table_name in tables
+        # 从连接池获取连接也可能等待，取得连接后再计算剩余时间
+        statement = with_time_limit(query)
+        if statement is None:
+            return None
+        try:
+            result = connection.execute(statement, params)
+        except DBAPIError as e:
+            if fallback is None or not is_missing_fulltext_error(e):
+                raise
+            connection.rollback()
+            schema_catalog.invalidate(table_name, broadcast=False)
+            statement = with_time_limit(fallback[0])
+            if statement is None:
+                return None
+            result = connection.execute(statement, fallback[1])
+        return list(result.keys()), result.fetchall()
     finally:
-        engine.dispose()
+        connection.close()
 
 
-def global_search(search_query, database=DATASHARE_DB_NAME, tables_to_search=None):
+def iter_global_search(search_query, database=DATASHARE_DB_NAME, tables_to_search=None, timeout=GLOBAL_SEARCH_TIMEOUT):
     """
-    全局搜索指定表格内容
+    并发搜索指定表格内容，按完成顺序逐个产出各表格的结果
+    
+    所有表格共用一个截止时间，超时未完成的表格被标记为超时，结果为部分结果。
     
     Args:
         search_query: 搜索关键词
         database: 数据库名称，默认为DATASHARE_DB_NAME
         tables_to_search: 要搜索的表格列表，默认为None（搜索所有表格）
+        timeout: 整个搜索的截止时间，单位：秒
         
-    Returns:
-        list: 搜索结果列表，包含匹配的表格和数据
+    Yields:
+        dict: {"type": "result", ...} 为单个表格的匹配结果；
+              最后产出 {"type": "done", "partial": bool, "timed_out_tables": [...], "failed_tables": [...]}
     """
     if not search_query:
-        return []
+        yield {'type': 'done', 'partial': False, 'timed_out_tables': [], 'failed_tables': []}
+        return
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
+    deadline = time.monotonic() + timeout
+    engine = get_engine(database)
+    
+    # 获取要搜索的表格
+    if tables_to_search:
+        all_tables = tables_to_search
     else:
-        # 使用主数据库连接
-        engine = db.engine
-    connection = engine.connect()
+        all_tables = get_all_tables(database=database)
     
-    results = []
+    # 一次性获取所有表格元数据，减少数据库连接开销
+    try:
+        main_engine = db.engine
+        main_connection = connect(main_engine)
+        metadata_query = text("SELECT table_name, display_name, description FROM table_metadata")
+        metadata_results = main_connection.execute(metadata_query)
+        all_metadata = {row.table_name: {'display_name': row.display_name, 'description': row.description} for row in metadata_results}
+        main_connection.close()
+    except Exception as e:
+        print(f"获取表格元数据失败: {str(e)}")
+        all_metadata = {}
     
+    # 在当前线程中准备各表格的查询语句（列信息来自表结构目录缓存），再分发到线程池
+    futures = {}
+    failed_tables = []
+    connection = connect(engine)
     try:
-        # 获取要搜索的表格
-        if tables_to_search:
-            all_tables = tables_to_search
-        else:
-            all_tables = get_all_tables(database=database)
-        
-        # 一次性获取所有表格元数据，减少数据库连接开销
-        try:
-            main_engine = db.engine
-            main_connection = main_engine.connect()
-            metadata_query = text("SELECT table_name, display_name, description FROM table_metadata")
-            metadata_results = main_connection.execute(metadata_query)
-            all_metadata = {row.table_name: {'display_name': row.display_name, 'description': row.description} for row in metadata_results}
-            main_connection.close()
-        except Exception as e:
-            print(f"获取表格元数据失败: {str(e)}")
-            all_metadata = {}
-        
         for table_name in all_tables:
             try:
                 # 跳过系统表（以_或table_metadata开头的表）
                 if table_name.startswith('_') or table_name == 'table_metadata':
                     continue
                 
-                # 获取表格元数据
-                table_meta = all_metadata.get(table_name, {})
-                display_name = table_meta.get('display_name', table_name)
-                description = table_meta.get('description', '')
+                # 构建搜索条件：有全文搜索索引时文本列走索引，其余非主键列进行LIKE搜索
+                params = {}
+                where_clauses = _build_search_where(connection, table_name, database, search_query, params)
                 
-                # 检查表格是否有数据列
-                columns_result = connection.execute(text(f"DESCRIBE `{table_name}`"))
-                table_columns = []
-                for col in columns_result.fetchall():
-                    if len(col) >= 1:
-                        table_columns.append(col[0])
-                
-                # 跳过没有数据列的表格
-                if len(table_columns) < 1:  # 至少有一个列
+                # 跳过不存在或没有可搜索列的表格
+                if not where_clauses:
                     continue
                 
-                # 构建搜索条件，使用简化的参数名，提高性能
-                search_conditions = []
-                
-                # 只搜索非id列，提高性能
-                non_id_columns = [col for col in table_columns if col.lower() != 'id']
-                if not non_id_columns:
-                    continue
-                
-                # 使用统一的参数名，避免复杂的参数映射
-                search_pattern = f"%{search_query}%"
-                params = {"search_pattern": search_pattern}
-                
-                for col in non_id_columns:
-                    # 为每列构建搜索条件
-                    search_conditions.append(f"`{col}` LIKE :search_pattern")
-                
                 # 构建查询语句，只查询前5条匹配结果，同时选择所有列
-                query = f"SELECT * FROM `{table_name}` WHERE ({' OR '.join(search_conditions)}) LIMIT 5"
+                # SELECT及MAX_EXECUTION_TIME提示在开始执行时按剩余时间补上
+                query_template = f"* FROM `{table_name}` WHERE {{}} LIMIT 5"
+                query = query_template.format(' AND '.join(where_clauses))
                 
-                # 执行查询
-                result = connection.execute(text(query), params)
-                rows = result.fetchall()
+                # 使用了全文索引时准备LIKE搜索，索引已被其他进程删除时改用
+                fallback = None
+                if 'search_phrase' in params:
+                    fallback_params = {}
+                    fallback_clauses = _build_search_where(connection, table_name, database, search_query, fallback_params, use_fulltext=False)
+                    fallback = (query_template.format(' AND '.join(fallback_clauses)), fallback_params)
                 
-                if rows:
-                    # 转换为响应格式，直接使用查询结果，不再重复检查匹配
-                    matched_rows = []
-                    columns = result.keys()
-                    for row in rows:
-                        row_dict = dict(zip(columns, row))
-                        # 提取所有值，用于显示
-                        matched_rows.append({
-                            'id': row_dict.get('id', None),
-                            'all_data': row_dict,  # 保留完整数据，便于点击跳转
-                            'matched_columns': list(row_dict.keys())  # 标记所有列
-                        })
-                    
-                    # 添加到结果列表
-                    results.append({
-                        'table_name': table_name,
-                        'display_name': display_name,
-                        'description': description,
-                        'rows': matched_rows
-                    })
+                future = _search_executor.submit(_search_table, engine, table_name, query, params, deadline, fallback)
+                futures[future] = table_name
             except Exception as e:
                 # 跳过无法搜索的表格
                 print(f"搜索表格 {table_name} 时出错: {str(e)}")
-                continue
+                failed_tables.append(table_name)
     finally:
         connection.close()
     
-    return results
+    pending = set(futures)
+    # 开始执行时已到截止时间、没有查询的表格
+    skipped_tables = []
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+            pending.discard(future)
+            table_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # 跳过无法搜索的表格
+                print(f"搜索表格 {table_name} 时出错: {str(e)}")
+                failed_tables.append(table_name)
+                continue
+            if result is None:
+                skipped_tables.append(table_name)
+                continue
+            columns, rows = result
+            
+            if rows:
+                # 获取表格元数据
+                table_meta = all_metadata.get(table_name, {})
+                
+                # 转换为响应格式，直接使用查询结果，不再重复检查匹配
+                matched_rows = []
+                for row in rows:
+                    row_dict = dict(zip(columns, row))
+                    # 提取所有值，用于显示
+                    matched_rows.append({
+                        'id': row_dict.get('id', None),
+                        'all_data': row_dict,  # 保留完整数据，便于点击跳转
+                        'matched_columns': list(row_dict.keys())  # 标记所有列
+                    })
+                
+                yield {
+                    'type': 'result',
+                    'table_name': table_name,
+                    'display_name': table_meta.get('display_name', table_name),
+                    'description': table_meta.get('description', ''),
+                    'rows': matched_rows
+                }
+    except FuturesTimeoutError:
+        pass
+    finally:
+        # 取消尚未开始执行的搜索任务
+        for future in pending:
+            future.cancel()
+    
+    timed_out_tables = skipped_tables + [futures[future] for future in pending]
+    yield {
+        'type': 'done',
+        'partial': bool(timed_out_tables),
+        'timed_out_tables': timed_out_tables,
+        'failed_tables': failed_tables
+    }
+
+
+def global_search(search_query, database=DATASHARE_DB_NAME, tables_to_search=None, timeout=GLOBAL_SEARCH_TIMEOUT):
+    """
+    全局搜索指定表格内容
+    
+    Args:
+        search_query: 搜索关键词
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+        tables_to_search: 要搜索的表格列表，默认为None（搜索所有表格）
+        timeout: 整个搜索的截止时间，单位：秒
+        
+    Returns:
+        dict: {"results": 搜索结果列表（按表格顺序）, "partial": 是否有表格超时, "timed_out_tables": [...], "failed_tables": [...]}
+    """
+    results = []
+    summary = {}
+    for event in iter_global_search(search_query, database, tables_to_search, timeout):
+        if event['type'] == 'result':
+            results.append({key: value for key, value in event.items() if key != 'type'})
+        else:
+            summary = event
+    
+    # 并发搜索的完成顺序不固定，按表格顺序返回
+    table_order = {table_name: i for i, table_name in enumerate(tables_to_search or get_all_tables(database=database))}
+    results.sort(key=lambda item: table_order.get(item['table_name'], len(table_order)))
+    
+    return {
+        'results': results,
+        'partial': summary.get('partial', False),
+        'timed_out_tables': summary.get('timed_out_tables', []),
+        'failed_tables': summary.get('failed_tables', [])
+    }
+
+
+# 表格真实总记录数缓存（LRU + TTL），行数据变化时写穿失效，并通过cache_sync通知其他worker进程清空
+table_count_cache = LRUTTLCache(COUNT_CACHE_MAX_ENTRIES, COUNT_CACHE_TTL)
+# cache_sync中的缓存名称
+COUNT_CACHE_NAME = 'table_counts'
+cache_sync.register(COUNT_CACHE_NAME, table_count_cache.clear)
+
+
+def invalidate_table_count(table_name, database=DATASHARE_DB_NAME):
+    """
+    行数据变化后失效表格总记录数缓存
+    
+    Args:
+        table_name: 表格名称
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+    """
+    table_count_cache.delete(f"{database}.{table_name}")
+    cache_sync.bump(COUNT_CACHE_NAME)
+
+
+def get_table_real_total(connection, table_name, database=DATASHARE_DB_NAME):
+    """
+    获取表格总记录数，优先使用缓存
+    
+    开启COUNT_ESTIMATE_THRESHOLD后，information_schema中估算行数不低于该阈值的大表
+    直接使用估算值，避免代价很高的COUNT(*)全表扫描。
+    
+    Args:
+        connection: 数据库连接
+        table_name: 表格名称
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+        
+    Returns:
+        tuple: (总记录数, 是否为估算值)
+    """
+    cache_key = f"{database}.{table_name}"
+    cached = table_count_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    if COUNT_ESTIMATE_THRESHOLD > 0:
+        estimate_result = connection.execute(
+            text("SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name"),
+            {'schema': database, 'table_name': table_name}
+        ).fetchone()
+        if estimate_result and estimate_result[0] is not None and estimate_result[0] >= COUNT_ESTIMATE_THRESHOLD:
+            total = (int(estimate_result[0]), True)
+            table_count_cache.set(cache_key, total)
+            return total
+    
+    # 执行COUNT(*)查询获取真实总记录数
+    real_total_result = connection.execute(text(f"SELECT COUNT(*) as real_total FROM `{table_name}`"))
+    total = (real_total_result.fetchone()[0], False)
+    table_count_cache.set(cache_key, total)
+    return total
+
+
+def _build_search_where(connection, table_name, database, search_query, params, use_fulltext=True):
+    """
+    构建搜索条件
+    
+    表格建有全文搜索索引时，索引中的文本列使用MATCH ... AGAINST，
+    其余非主键列（数字、日期等）仍进行LIKE模糊匹配，与MATCH条件用OR连接；
+    没有全文搜索索引时对所有非主键列进行LIKE模糊匹配。
+    
+    Args:
+        connection: 数据库连接
+        table_name: 表格名称
+        database: 数据库名称
+        search_query: 搜索关键词
+        params: 查询参数字典，搜索参数会写入其中
+        use_fulltext: 是否使用全文搜索索引
+        
+    Returns:
+        list: WHERE子句列表
+    """
+    if not search_query:
+        return []
+    
+    try:
+        # 获取表格所有列，数据共享库使用表结构目录缓存
+        table_columns = _get_columns(connection, table_name, database)
+    except Exception as e:
+        # 搜索过程中出现错误，不影响基本数据查询，跳过搜索条件
+        return []
+    
+    # 排除主键列，而不仅仅是名为'id'的列
+    like_columns = [col for col in table_columns if col['key'] != 'PRI']
+    search_conditions = []
+    
+    if use_fulltext and database == DATASHARE_DB_NAME:
+        # 优先使用全文搜索索引
+        fulltext_condition = build_fulltext_condition(table_name, search_query, params)
+        if fulltext_condition:
+            search_conditions.append(fulltext_condition)
+            index_columns = set(get_search_index_columns(table_name) or [])
+            # 不在索引中的列只在关键词可能出现在其值中时才用LIKE匹配，避免仅为这些列扫描全表
+            like_columns = [
+                col for col in like_columns
+                if col['name'] not in index_columns and may_match_column(col, search_query)
+            ]
+    
+    if like_columns:
+        # 使用统一的参数名，避免列名包含特殊字符导致的问题
+        params['search_query'] = f"%{search_query}%"
+        search_conditions.extend(f"`{col['name']}` LIKE :search_query" for col in like_columns)
+    
+    if not search_conditions:
+        return []
+    return [f"({' OR '.join(search_conditions)})"]
+
+
+def _with_fulltext_fallback(func):
+    """
+    表结构目录中的全文索引已被其他进程删除时（MySQL错误1191），
+    失效该表格的目录缓存并改用LIKE搜索重试一次
+    """
+    @wraps(func)
+    def wrapper(table_name, *args, **kwargs):
+        try:
+            return func(table_name, *args, **kwargs)
+        except DBAPIError as e:
+            if not is_missing_fulltext_error(e) or kwargs.get('use_fulltext') is False:
+                raise
+            print(f"表格{table_name}的全文搜索索引已不存在，改用LIKE搜索: {str(e.orig)}")
+            schema_catalog.invalidate(table_name.split('.')[-1].strip("'\""), broadcast=False)
+            kwargs['use_fulltext'] = False
+            return func(table_name, *args, **kwargs)
+    return wrapper
+
+
+def _validate_sort_by(connection, table_name, database, sort_by):
+    """
+    校验排序字段是否为表格中的列，防止拼接到ORDER BY中的非法列名
+    
+    Raises:
+        ValueError: 排序字段不存在
+    """
+    if sort_by and sort_by not in _get_column_names(connection, table_name, database):
+        raise ValueError(f"排序字段不存在: {sort_by}")
+
+
+def _validate_columns(connection, table_name, database, columns):
+    """
+    校验要返回的列，防止拼接到SELECT中的非法列名
+    
+    Raises:
+        ValueError: 列不存在
+    """
+    if not columns:
+        return
+    valid_columns = set(_get_column_names(connection, table_name, database))
+    unknown = [col for col in columns if col not in valid_columns]
+    if unknown:
+        raise ValueError(f"列不存在: {', '.join(unknown)}")
+
 
+# 表格数据的返回格式
+ROW_FORMATS = ('records', 'columnar')
+
+
+def format_rows(columns, rows, row_format='records', dictionary_encode=False):
+    """
+    按返回格式转换查询结果
+    
+    - records：每行一个{列名: 值}字典（默认）
+    - columnar：{"columns": [列名, ...], "rows": [[值, ...], ...]}，列名只出现一次；
+      dictionary_encode为True时，重复较多的字符串列改为保存在dictionaries中，
+      rows中对应位置为值在字典中的下标（NULL仍为null）
+    
+    Args:
+        columns: 列名列表
+        rows: 行列表（每行为元组或Row）
+        row_format: 返回格式，'records'或'columnar'
+        dictionary_encode: columnar格式下是否对重复的字符串做字典编码
+        
+    Returns:
+        list或dict: 转换后的数据
+    """
+    columns = list(columns)
+    if row_format != 'columnar':
+        return [dict(zip(columns, row)) for row in rows]
+    
+    rows = [list(row) for row in rows]
+    data = {'columns': columns, 'rows': rows}
+    if not dictionary_encode or not rows:
+        return data
+    
+    dictionaries = {}
+    for index, column in enumerate(columns):
+        values = [row[index] for row in rows]
+        non_null = [value for value in values if value is not None]
+        if not non_null or not all(isinstance(value, str) for value in non_null):
+            continue
+        # 不同值不超过非空值的一半时才编码，否则编码后反而更大
+        distinct = list(dict.fromkeys(non_null))
+        if len(distinct) * 2 > len(non_null):
+            continue
+        positions = {value: position for position, value in enumerate(distinct)}
+        for row in rows:
+            if row[index] is not None:
+                row[index] = positions[row[index]]
+        dictionaries[column] = distinct
+    data['dictionaries'] = dictionaries
+    return data
 
-# 全局缓存，存储表格列信息，避免重复查询
-table_columns_cache = {}
 
-# 全局缓存，存储表格真实总记录数，定期更新
-table_real_total_cache = {}
+def _build_filter_where(connection, table_name, database, filters, params):
+    """
+    构建结构化筛选条件
+    
+    Args:
+        connection: 数据库连接
+        table_name: 表格名称
+        database: 数据库名称
+        filters: 筛选条件，格式见filters模块
+        params: 查询参数字典，筛选参数会写入其中
+        
+    Returns:
+        (WHERE子句列表, 筛选使用的列)
+        
+    Raises:
+        ValueError: 筛选条件无效
+    """
+    if not filters:
+        return [], []
+    clause, filter_columns = compile_filters(filters, _get_column_names(connection, table_name, database), params)
+    return ([clause] if clause else []), filter_columns
 
 
-def get_table_data(table_name, page=1, per_page=10, sort_by=None, sort_order='asc', database=DATASHARE_DB_NAME, columns=None, search_query=None):
+@_with_fulltext_fallback
+def get_table_data(table_name, page=1, per_page=10, sort_by=None, sort_order='asc', database=DATASHARE_DB_NAME, columns=None, search_query=None, filters=None,
+                   row_format='records', dictionary_encode=False, use_fulltext=True):
     """
-    获取表格数据，支持分页、排序和搜索
+    获取表格数据，支持分页、排序、搜索和结构化筛选
+    
+    使用LIMIT/OFFSET分页，越靠后的页面越慢，适合小表格；
+    大表格请使用get_table_data_by_cursor进行游标分页。
     
     Args:
         table_name: 表格名称
@@ -188,38 +617,35 @@ def get_table_data(table_name, page=1, per_page=10, sort_by=None, sort_order='as
         database: 数据库名称，默认为DATASHARE_DB_NAME
         columns: 要返回的列列表，默认为None（返回所有列）
         search_query: 搜索关键词，默认为None
+        filters: 结构化筛选条件，默认为None，格式见filters模块
+        row_format: 返回格式，默认为'records'，可选'columnar'，见format_rows
+        dictionary_encode: columnar格式下是否对重复的字符串做字典编码
+        use_fulltext: 是否使用全文搜索索引，全文索引已被删除时自动改为False重试
         
     Returns:
-        dict: 包含数据和分页信息的字典
+        dict: 包含数据和分页信息的字典；有搜索或筛选条件且不是第一页时不统计命中数，
+              filtered_total和pages为None
     """
     # 清理表名，移除可能的数据库名前缀
     if '.' in table_name:
         table_name = table_name.split('.')[-1]
         table_name = table_name.strip("'\"")
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
-    connection = engine.connect()
+    engine = get_engine(database)
+    connection = connect(engine)
     
     try:
-        # 构建缓存键
-        cache_key = f"{database}.{table_name}"
+        _validate_sort_by(connection, table_name, database, sort_by)
+        _validate_columns(connection, table_name, database, columns)
+        
+        # 结构化筛选条件
+        params = {}
+        filter_clauses, filter_columns = _build_filter_where(connection, table_name, database, filters, params)
+        if database == DATASHARE_DB_NAME:
+            record_column_usage(table_name, sort_by=sort_by, filter_columns=filter_columns)
         
         # 获取真实的表格总记录数（不考虑搜索条件），使用缓存优化
-        real_total = 0
-        if cache_key in table_real_total_cache:
-            # 使用缓存的真实总记录数
-            real_total = table_real_total_cache[cache_key]
-        else:
-            # 执行COUNT(*)查询获取真实总记录数
-            real_total_result = connection.execute(text(f"SELECT COUNT(*) as real_total FROM `{table_name}`"))
-            real_total = real_total_result.fetchone()[0]
-            # 更新缓存
-            table_real_total_cache[cache_key] = real_total
+        real_total, real_total_estimated = get_table_real_total(connection, table_name, database)
         
         # 确定要查询的列
         if columns:
@@ -231,59 +657,23 @@ def get_table_data(table_name, page=1, per_page=10, sort_by=None, sort_order='as
         query = f"SELECT {selected_columns} FROM `{table_name}`"
         
         # 添加搜索条件
-        where_clauses = []
-        params = {}
-        
-        if search_query:
-            try:
-                # 获取表格所有列，使用缓存优化
-                table_columns = []
-                if cache_key in table_columns_cache:
-                    # 使用缓存的列信息
-                    table_columns = table_columns_cache[cache_key]
-                else:
-                    # 执行DESCRIBE查询获取列信息
-                    columns_result = connection.execute(text(f"DESCRIBE `{table_name}`"))
-                    table_columns = [col for col in columns_result.fetchall()]
-                    # 更新缓存
-                    table_columns_cache[cache_key] = table_columns
-                
-                # 构建模糊搜索条件，排除主键列
-                search_conditions = []
-                # 使用统一的参数名，避免列名包含特殊字符导致的问题
-                param_name = "search_query"
-                params[param_name] = f"%{search_query}%"
-                
-                for col in table_columns:
-                    # 确保元组有足够的元素，避免IndexError
-                    if len(col) >= 4:
-                        col_name = col[0]
-                        col_key = col[3]  # 获取列的键类型（PRI表示主键）
-                        # 排除主键列，而不仅仅是名为'id'的列
-                        if col_key != 'PRI':
-                            search_conditions.append(f"`{col_name}` LIKE :{param_name}")
-                
-                if search_conditions:
-                    where_clauses.append(f"({' OR '.join(search_conditions)})")
-            except Exception as e:
-                # 搜索过程中出现错误，不影响基本数据查询，跳过搜索条件
-                pass
+        where_clauses = filter_clauses + _build_search_where(connection, table_name, database, search_query, params, use_fulltext)
         
         # 添加WHERE子句
         where_clauses_str = ""
         if where_clauses:
             where_clauses_str = f" WHERE {' AND '.join(where_clauses)}"
         
-        # 获取搜索命中的记录数，只有在需要时才执行
-        filtered_total = 0
-        if page == 1:  # 只在第一页时获取总数，减少查询次数
+        # 获取搜索命中的记录数，只在第一页统计；其他页不统计时返回None，客户端沿用第一页的总数
+        filtered_total = None
+        if not where_clauses:
+            # 没有筛选条件时，命中数即为总记录数
+            filtered_total = real_total
+        elif page == 1:  # 只在第一页时获取总数，减少查询次数
             # 构建COUNT查询，直接使用WHERE条件
             count_query = f"SELECT COUNT(*) as filtered_total FROM `{table_name}`{where_clauses_str}"
             count_result = connection.execute(text(count_query), params)
             filtered_total = count_result.fetchone()[0]
-        else:
-            # 非第一页时，使用估算值或从请求参数中获取，这里暂时使用per_page作为默认值
-            filtered_total = per_page
         
         # 添加WHERE子句到主查询
         if where_clauses_str:
@@ -302,17 +692,8 @@ def get_table_data(table_name, page=1, per_page=10, sort_by=None, sort_order='as
         result = connection.execute(text(query), params)
         rows = result.fetchall()
         
-        # 获取列名
-        columns = result.keys()
-        
-        # 转换为字典列表
-        data = [dict(zip(columns, row)) for row in rows]
-        
-        # 如果是非第一页且filtered_total不准确，使用实际返回的行数估算
-        if page != 1 and len(data) > 0:
-            # 估算总记录数，假设每页都有per_page条记录
-            estimated_total = (page - 1) * per_page + len(data)
-            filtered_total = estimated_total
+        # 按返回格式转换数据
+        data = format_rows(result.keys(), rows, row_format, dictionary_encode)
         
         return {
             'data': data,
@@ -320,119 +701,445 @@ def get_table_data(table_name, page=1, per_page=10, sort_by=None, sort_order='as
                 'page': page,
                 'per_page': per_page,
                 'real_total': real_total,
+                'real_total_estimated': real_total_estimated,
                 'filtered_total': filtered_total,
-                'pages': (filtered_total + per_page - 1) // per_page
+                'pages': (filtered_total + per_page - 1) // per_page if filtered_total is not None else None
+            }
+        }
+    finally:
+        connection.close()
+
+
+def encode_cursor(values, direction, sort_by, sort_order):
+    """
+    编码分页游标
+    
+    Args:
+        values: 游标位置的键值列表，[排序列的值, 主键值] 或 [主键值]
+        direction: 翻页方向，'next'或'prev'
+        sort_by: 排序字段
+        sort_order: 排序方向
+        
+    Returns:
+        str: 不透明的游标字符串
+    """
+    payload = json.dumps({'k': values, 'd': direction, 's': sort_by, 'o': sort_order}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解码分页游标
+    
+    Args:
+        cursor: 游标字符串
+        
+    Returns:
+        dict: 游标内容
+        
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    
+    if not isinstance(payload, dict) or not isinstance(payload.get('k'), list) or payload.get('d') not in ('next', 'prev'):
+        raise ValueError("无效的分页游标")
+    return payload
+
+
+def _build_seek_clause(sort_col, pk, ascending, values, params):
+    """
+    构建游标定位条件，取排序位置在游标之后的记录
+    
+    MySQL升序时NULL排在最前，降序时NULL排在最后，这里按同样的规则处理排序列中的NULL。
+    
+    Args:
+        sort_col: 排序列，为None时只按主键排序
+        pk: 主键列
+        ascending: 扫描方向是否为升序
+        values: 游标位置的键值列表
+        params: 查询参数字典，游标参数会写入其中
+        
+    Returns:
+        str: WHERE子句
+    """
+    op = '>' if ascending else '<'
+    
+    if sort_col is None:
+        params['cursor_pk'] = values[0]
+        return f"`{pk}` {op} :cursor_pk"
+    
+    sort_value, pk_value = values
+    params['cursor_pk'] = pk_value
+    
+    if sort_value is None:
+        if ascending:
+            # NULL之后：同为NULL且主键更大，或非NULL
+            return f"((`{sort_col}` IS NULL AND `{pk}` > :cursor_pk) OR `{sort_col}` IS NOT NULL)"
+        # 降序时NULL在最后，只剩主键更小的NULL
+        return f"(`{sort_col}` IS NULL AND `{pk}` < :cursor_pk)"
+    
+    params['cursor_sort'] = sort_value
+    clause = f"(`{sort_col}` {op} :cursor_sort OR (`{sort_col}` = :cursor_sort AND `{pk}` {op} :cursor_pk)"
+    if not ascending:
+        clause += f" OR `{sort_col}` IS NULL"
+    return clause + ")"
+
+
+@_with_fulltext_fallback
+def get_table_data_by_cursor(table_name, per_page=10, sort_by=None, sort_order='asc', cursor=None, database=DATASHARE_DB_NAME, columns=None, search_query=None, filters=None,
+                             row_format='records', dictionary_encode=False, use_fulltext=True):
+    """
+    使用游标（keyset）分页获取表格数据
+    
+    按主键（或排序列 + 主键）定位，每一页的查询代价与第一页相同。
+    
+    Args:
+        table_name: 表格名称
+        per_page: 每页条数，默认为10
+        sort_by: 排序字段，默认为None（按主键排序）
+        sort_order: 排序方向，默认为'asc'，可选值为'asc'或'desc'
+        cursor: 上一次返回的next_cursor或prev_cursor，默认为None（第一页）
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+        columns: 要返回的列列表，默认为None（返回所有列）
+        search_query: 搜索关键词，默认为None
+        filters: 结构化筛选条件，默认为None，格式见filters模块
+        row_format: 返回格式，默认为'records'，可选'columnar'，见format_rows
+        dictionary_encode: columnar格式下是否对重复的字符串做字典编码
+        use_fulltext: 是否使用全文搜索索引，全文索引已被删除时自动改为False重试
+        
+    Returns:
+        dict: 包含数据和分页信息的字典
+        
+    Raises:
+        ValueError: 参数无效，或表格没有单列主键
+    """
+    # 清理表名，移除可能的数据库名前缀
+    if '.' in table_name:
+        table_name = table_name.split('.')[-1]
+        table_name = table_name.strip("'\"")
+    
+    per_page = max(1, per_page)
+    sort_order = 'desc' if sort_order and sort_order.lower() == 'desc' else 'asc'
+    
+    engine = get_engine(database)
+    connection = connect(engine)
+    
+    try:
+        _validate_sort_by(connection, table_name, database, sort_by)
+        _validate_columns(connection, table_name, database, columns)
+        
+        # 结构化筛选条件
+        params = {}
+        filter_clauses, filter_columns = _build_filter_where(connection, table_name, database, filters, params)
+        if database == DATASHARE_DB_NAME:
+            record_column_usage(table_name, sort_by=sort_by, filter_columns=filter_columns)
+        
+        # 游标分页依赖单列主键作为唯一的定位键
+        primary_keys = [col['name'] for col in _get_columns(connection, table_name, database) if col['key'] == 'PRI']
+        if len(primary_keys) != 1:
+            raise ValueError("该表格没有单列主键，不支持游标分页")
+        pk = primary_keys[0]
+        sort_col = sort_by if sort_by and sort_by != pk else None
+        
+        # 解析游标
+        direction = 'next'
+        cursor_values = None
+        if cursor:
+            payload = decode_cursor(cursor)
+            if payload.get('s') != sort_by or payload.get('o') != sort_order:
+                raise ValueError("分页游标与当前排序条件不匹配")
+            cursor_values = payload['k']
+            if len(cursor_values) != (2 if sort_col else 1):
+                raise ValueError("无效的分页游标")
+            direction = payload['d']
+        
+        # 获取真实的表格总记录数（不考虑搜索条件），使用缓存优化
+        real_total, real_total_estimated = get_table_real_total(connection, table_name, database)
+        
+        # 确定要查询的列，游标需要主键和排序列的值
+        key_columns = [sort_col, pk] if sort_col else [pk]
+        if columns:
+            query_columns = list(columns) + [col for col in key_columns if col not in columns]
+            selected_columns = ', '.join([f'`{col}`' for col in query_columns])
+        else:
+            selected_columns = '*'
+        
+        # 添加搜索条件
+        where_clauses = filter_clauses + _build_search_where(connection, table_name, database, search_query, params, use_fulltext)
+        
+        # 第一页时统计命中数
+        filtered_total = None
+        if cursor_values is None:
+            if where_clauses:
+                count_query = f"SELECT COUNT(*) as filtered_total FROM `{table_name}` WHERE {' AND '.join(where_clauses)}"
+                filtered_total = connection.execute(text(count_query), params).fetchone()[0]
+            else:
+                filtered_total = real_total
+        
+        # 向前翻页时反向扫描，取到数据后再恢复顺序
+        ascending = sort_order == 'asc'
+        scan_ascending = ascending if direction == 'next' else not ascending
+        if cursor_values is not None:
+            where_clauses.append(_build_seek_clause(sort_col, pk, scan_ascending, cursor_values, params))
+        
+        query = f"SELECT {selected_columns} FROM `{table_name}`"
+        if where_clauses:
+            query += f" WHERE {' AND '.join(where_clauses)}"
+        order_dir = 'ASC' if scan_ascending else 'DESC'
+        query += ' ORDER BY ' + ', '.join([f"`{col}` {order_dir}" for col in key_columns])
+        # 多取一条，用于判断是否还有更多数据
+        query += f" LIMIT {per_page + 1}"
+        
+        result = connection.execute(text(query), params)
+        rows = result.fetchall()
+        result_columns = list(result.keys())
+        
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == 'prev':
+            rows.reverse()
+        
+        if direction == 'next':
+            has_next = has_more
+            has_prev = cursor_values is not None
+        else:
+            has_next = True
+            has_prev = has_more
+        
+        next_cursor = None
+        prev_cursor = None
+        if rows:
+            key_indexes = [result_columns.index(col) for col in key_columns]
+            if has_next:
+                next_cursor = encode_cursor([rows[-1][i] for i in key_indexes], 'next', sort_by, sort_order)
+            if has_prev:
+                prev_cursor = encode_cursor([rows[0][i] for i in key_indexes], 'prev', sort_by, sort_order)
+        
+        # 去掉只为生成游标而额外查询的列
+        if columns and len(result_columns) > len(columns):
+            output_indexes = [result_columns.index(col) for col in columns]
+            rows = [tuple(row[i] for i in output_indexes) for row in rows]
+            result_columns = list(columns)
+        
+        return {
+            'data': format_rows(result_columns, rows, row_format, dictionary_encode),
+            'pagination': {
+                'mode': 'cursor',
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor,
+                'has_next': has_next,
+                'has_prev': has_prev,
+                'real_total': real_total,
+                'real_total_estimated': real_total_estimated,
+                'filtered_total': filtered_total
             }
         }
     finally:
         connection.close()
 
 
-def get_table_columns(table_name, database=DATASHARE_DB_NAME):
+def get_table_columns(table_name, database=DATASHARE_DB_NAME):
+    """
+    获取表格列信息
+    
+    Args:
+        table_name: 表格名称
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+        
+    Returns:
+        list: 列信息列表
+    """
+    # 清理表名，移除可能的数据库名前缀
+    # 处理格式如：datashare.table_name 或 'datashare.'table_name 的情况
+    if '.' in table_name:
+        # 只保留最后一个点后面的部分作为表名
+        table_name = table_name.split('.')[-1]
+        # 移除可能的引号
+        table_name = table_name.strip("'\"")
+    
+    if database == DATASHARE_DB_NAME:
+        # 数据共享库直接查询表结构目录缓存
+        return schema_catalog.get_columns(table_name) or []
+    
+    engine = get_engine(database)
+    connection = connect(engine)
+    
+    try:
+        return _describe_table(connection, table_name)
+    finally:
+        connection.close()
+
+
+def _open_export_result(connection, table_name, chunk_size):
     """
-    获取表格列信息
+    使用服务端游标（pymysql SSCursor）执行全表查询，结果逐批从MySQL读取，不会一次性加载到内存
     
     Args:
+        connection: 数据库连接
         table_name: 表格名称
-        database: 数据库名称，默认为DATASHARE_DB_NAME
+        chunk_size: 每批读取的行数
         
     Returns:
-        list: 列信息列表
+        CursorResult: 流式查询结果
+    """
+    return connection.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+        text(f"SELECT * FROM `{table_name}`")
+    )
+
+
+def _close_export_connection(connection, result, completed):
+    """
+    关闭导出使用的连接
+    
+    导出中途被中断（例如客户端断开）时，服务端游标里还有未读取的数据，
+    关闭游标会把剩余数据全部读完，这里直接作废该连接，由连接池重新建立。
+    """
+    if not completed:
+        connection.invalidate()
+    elif result is not None:
+        result.close()
+    connection.close()
+
+
+def iter_table_csv(table_name, database=DATASHARE_DB_NAME, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    流式导出表格数据为CSV，逐批读取、逐批输出，内存占用与表格大小无关
+    
+    Args:
+        table_name: 表格名称
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+        chunk_size: 每批读取的行数
+        
+    Yields:
+        bytes: UTF-8编码（带BOM，便于Excel识别）的CSV内容片段
     """
     # 清理表名，移除可能的数据库名前缀
-    # 处理格式如：datashare.table_name 或 'datashare.'table_name 的情况
     if '.' in table_name:
-        # 只保留最后一个点后面的部分作为表名
         table_name = table_name.split('.')[-1]
-        # 移除可能的引号
         table_name = table_name.strip("'\"")
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
-    connection = engine.connect()
+    engine = get_engine(database)
+    connection = connect(engine)
+    result = None
+    completed = False
     
     try:
-        # 获取列信息 - 使用正确的引号处理表名
-        result = connection.execute(text(f"DESCRIBE `{table_name}`"))
-        columns = result.fetchall()
-        
-        # 转换为字典列表
-        column_info = []
-        for column in columns:
-            column_info.append({
-                'name': column[0],
-                'type': column[1],
-                'null': column[2],
-                'key': column[3],
-                'default': column[4],
-                'extra': column[5]
-            })
-        
-        return column_info
+        result = _open_export_result(connection, table_name, chunk_size)
+        
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        
+        # 写入BOM和表头
+        buffer.write('\ufeff')
+        writer.writerow(list(result.keys()))
+        
+        for rows in result.partitions(chunk_size):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+        
+        # 表格为空时仍需输出表头
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+        completed = True
     finally:
-        connection.close()
+        _close_export_connection(connection, result, completed)
+
+
+# Excel单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
 
+def _excel_sheet_name(table_name, index):
+    """
+    生成合法的工作表名称：去掉Excel不允许的字符，长度不超过31个字符，
+    第2个及以后的工作表追加序号
+    """
+    name = re.sub(r'[\[\]:*?/\\]', '_', table_name) or 'Sheet'
+    suffix = f"_{index}" if index > 1 else ''
+    return name[:31 - len(suffix)] + suffix
+
+
+def _excel_cell_value(value):
+    """去掉字符串中Excel不允许的控制字符"""
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    return value
 
-def export_table_data(table_name, format='csv', database=DATASHARE_DB_NAME):
+
+def export_table_excel(table_name, output_path, database=DATASHARE_DB_NAME, chunk_size=EXPORT_CHUNK_SIZE):
     """
-    导出表格数据
+    流式导出表格数据为Excel文件
+    
+    使用服务端游标逐批读取，openpyxl只写模式逐行写入磁盘，内存占用与表格大小无关；
+    超过单个工作表的行数上限时自动拆分到新的工作表。
     
     Args:
         table_name: 表格名称
-        format: 导出格式，默认为'csv'，可选值为'csv'或'excel'
+        output_path: 输出文件路径
         database: 数据库名称，默认为DATASHARE_DB_NAME
+        chunk_size: 每批读取的行数
         
     Returns:
-        tuple: (文件名, 文件内容, Content-Type)
+        dict: 导出统计 {"rows": 行数, "sheets": 工作表数, "elapsed": 耗时（秒）, "rows_per_second": 吞吐量}
     """
     # 清理表名，移除可能的数据库名前缀
     if '.' in table_name:
         table_name = table_name.split('.')[-1]
         table_name = table_name.strip("'\"")
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
-    connection = engine.connect()
+    start = time.perf_counter()
+    engine = get_engine(database)
+    connection = connect(engine)
+    result = None
+    completed = False
     
     try:
-        # 获取所有数据
-        query = f"SELECT * FROM `{table_name}`"
-        result = connection.execute(text(query))
-        rows = result.fetchall()
-        columns = result.keys()
-        
-        # 转换为DataFrame
-        df = pd.DataFrame(rows, columns=columns)
-        
-        if format == 'csv':
-            # 导出为CSV
-            output = StringIO()
-            df.to_csv(output, index=False, encoding='utf-8-sig')
-            content = output.getvalue()
-            filename = f"{table_name}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            content_type = 'text/csv; charset=utf-8'
-        elif format == 'excel':
-            # 导出为Excel
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name=table_name)
-            content = output.getvalue()
-            filename = f"{table_name}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        else:
-            raise ValueError(f"Unsupported export format: {format}")
-        
-        return filename, content, content_type
+        result = _open_export_result(connection, table_name, chunk_size)
+        header = list(result.keys())
+        
+        workbook = Workbook(write_only=True)
+        sheet_count = 1
+        sheet = workbook.create_sheet(_excel_sheet_name(table_name, sheet_count))
+        sheet.append(header)
+        sheet_rows = 1
+        total_rows = 0
+        
+        for rows in result.partitions(chunk_size):
+            for row in rows:
+                if sheet_rows >= EXCEL_MAX_ROWS:
+                    # 当前工作表已满，拆分到新的工作表
+                    sheet_count += 1
+                    sheet = workbook.create_sheet(_excel_sheet_name(table_name, sheet_count))
+                    sheet.append(header)
+                    sheet_rows = 1
+                sheet.append([_excel_cell_value(value) for value in row])
+                sheet_rows += 1
+                total_rows += 1
+        
+        completed = True
     finally:
-        connection.close()
+        _close_export_connection(connection, result, completed)
+    
+    workbook.save(output_path)
+    
+    elapsed = time.perf_counter() - start
+    rows_per_second = round(total_rows / elapsed, 1) if elapsed > 0 else 0.0
+    print(f"导出表格 {table_name} 到Excel: {total_rows} 行, {sheet_count} 个工作表, 耗时 {elapsed:.2f} 秒, {rows_per_second} 行/秒")
+    
+    return {
+        'rows': total_rows,
+        'sheets': sheet_count,
+        'elapsed': round(elapsed, 3),
+        'rows_per_second': rows_per_second
+    }
 
 
 def get_all_tables(database=DATASHARE_DB_NAME):
@@ -446,20 +1153,15 @@ def get_all_tables(database=DATASHARE_DB_NAME):
         list: 表格名称列表
     """
     if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-        inspector = db.inspect(engine)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
-        inspector = db.inspect(engine)
+        # 数据共享库直接查询表结构目录缓存
+        return schema_catalog.get_table_names()
     
-    try:
-        # 获取所有表格
-        tables = inspector.get_table_names()
-        return tables
-    finally:
-        engine.dispose()
+    engine = get_engine(database)
+    inspector = db.inspect(engine)
+    
+    # 获取所有表格
+    tables = inspector.get_table_names()
+    return tables
 
 
 def execute_sql_query(query, params=None, database=DATASHARE_DB_NAME):
@@ -474,14 +1176,9 @@ def execute_sql_query(query, params=None, database=DATASHARE_DB_NAME):
     Returns:
         list: 查询结果列表
     """
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
+    engine = get_engine(database)
     
-    connection = engine.connect()
+    connection = connect(engine)
     
     try:
         result = connection.execute(text(query), params or {})
@@ -490,111 +1187,459 @@ def execute_sql_query(query, params=None, database=DATASHARE_DB_NAME):
         connection.close()
 
 
-def import_table_from_file(file_path, table_name, database=DATASHARE_DB_NAME):
+def _normalize_headers(headers):
+    """
+    规范化表头：空列名按pandas的规则命名为Unnamed: i，重复列名追加.1、.2等后缀
+    
+    Args:
+        headers: 原始表头
+        
+    Returns:
+        list: 列名列表
+    """
+    columns = []
+    seen = {}
+    for i, header in enumerate(headers):
+        name = str(header).strip() if header is not None else ''
+        if name == '':
+            name = f'Unnamed: {i}'
+        if name in seen:
+            seen[name] += 1
+            deduped = f'{name}.{seen[name]}'
+            while deduped in seen:
+                seen[name] += 1
+                deduped = f'{name}.{seen[name]}'
+            name = deduped
+        seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _iter_csv_chunks(file_path, chunk_size):
+    """
+    分块读取CSV文件，所有值按字符串读取，空值和NA等标记转为None
+    
+    Yields:
+        (列名列表, 行元组列表)
+    """
+    columns = None
+    reader = pd.read_csv(file_path, dtype=str, chunksize=chunk_size, encoding='utf-8-sig')
+    with reader:
+        for chunk in reader:
+            columns = [str(col) for col in chunk.columns]
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            yield columns, list(chunk.itertuples(index=False, name=None))
+    
+    # 只有表头的文件不会产生数据块
+    if columns is None:
+        header = pd.read_csv(file_path, dtype=str, nrows=0, encoding='utf-8-sig')
+        yield [str(col) for col in header.columns], []
+
+
+def _iter_xlsx_chunks(file_path, chunk_size):
+    """
+    使用openpyxl只读模式分块读取xlsx文件的第一个工作表
+    
+    Yields:
+        (列名列表, 行元组列表)
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows_iter = sheet.iter_rows(values_only=True)
+        
+        columns = None
+        for header in rows_iter:
+            # 跳过表头之前的空行
+            if any(value is not None and value != '' for value in header):
+                # 去掉表头末尾的空列
+                header = list(header)
+                while header and (header[-1] is None or header[-1] == ''):
+                    header.pop()
+                columns = _normalize_headers(header)
+                break
+        if columns is None:
+            raise ValueError('文件中没有数据')
+        
+        width = len(columns)
+        rows = []
+        for row in rows_iter:
+            values = [None if value == '' else value for value in row[:width]]
+            if all(value is None for value in values):
+                continue
+            values.extend([None] * (width - len(values)))
+            rows.append(tuple(values))
+            if len(rows) >= chunk_size:
+                yield columns, rows
+                rows = []
+        yield columns, rows
+    finally:
+        workbook.close()
+
+
+def _iter_xls_chunks(file_path, chunk_size):
+    """
+    读取xls文件（旧格式不支持流式读取，文件最多65536行，整体读取后分块返回）
+    
+    Yields:
+        (列名列表, 行元组列表)
+    """
+    df = pd.read_excel(file_path, dtype=object)
+    columns = [str(col) for col in df.columns]
+    df = df.where(df.notna(), None)
+    rows = [tuple(None if value == '' else value for value in row) for row in df.itertuples(index=False, name=None)]
+    del df
+    for start in range(0, len(rows), chunk_size):
+        yield columns, rows[start:start + chunk_size]
+    if not rows:
+        yield columns, []
+
+
+def iter_file_chunks(file_path, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    按文件格式分块读取导入文件
+    
+    Args:
+        file_path: 文件路径
+        chunk_size: 每块的行数
+        
+    Yields:
+        (列名列表, 行元组列表)，第一块的行列表可能为空（只有表头）
+        
+    Raises:
+        ValueError: 不支持的文件格式
+    """
+    lower_path = file_path.lower()
+    if lower_path.endswith('.csv'):
+        return _iter_csv_chunks(file_path, chunk_size)
+    if lower_path.endswith('.xlsx'):
+        return _iter_xlsx_chunks(file_path, chunk_size)
+    if lower_path.endswith('.xls'):
+        return _iter_xls_chunks(file_path, chunk_size)
+    raise ValueError('不支持的文件格式')
+
+
+def _report_progress(progress, stage, rows_processed, start):
+    """调用导入进度回调"""
+    if progress is None:
+        return
+    elapsed = time.perf_counter() - start
+    progress(
+        stage=stage,
+        rows_processed=rows_processed,
+        elapsed=round(elapsed, 3),
+        rows_per_second=round(rows_processed / elapsed, 1) if elapsed > 0 else 0.0
+    )
+
+
+def _insert_chunks(connection, table_name, columns, rows, chunks, progress, start):
+    """
+    使用批量INSERT导入数据，每批IMPORT_BATCH_SIZE行（pymysql会把executemany改写为多行INSERT）
+    
+    Args:
+        connection: 数据库连接（由调用方提交事务）
+        table_name: 表格名称
+        columns: 列名列表
+        rows: 第一块数据
+        chunks: 剩余数据块的迭代器
+        progress: 进度回调
+        start: 导入开始时间
+        
+    Returns:
+        int: 导入的行数
+    """
+    # 构建INSERT语句，使用安全的参数名（param_0, param_1, ...）
+    column_list = ', '.join([f'`{col}`' for col in columns])
+    safe_param_names = [f'param_{i}' for i in range(len(columns))]
+    values = ', '.join([f':{param}' for param in safe_param_names])
+    insert_sql = text(f"INSERT INTO `{table_name}` ({column_list}) VALUES ({values})")
+    print(f"执行SQL: {insert_sql}")
+    
+    rows_imported = 0
+    while True:
+        for batch_start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            batch = rows[batch_start:batch_start + IMPORT_BATCH_SIZE]
+            connection.execute(insert_sql, [dict(zip(safe_param_names, row)) for row in batch])
+            rows_imported += len(batch)
+            _report_progress(progress, 'insert', rows_imported, start)
+        
+        next_chunk = next(chunks, None)
+        if next_chunk is None:
+            break
+        rows = next_chunk[1]
+    return rows_imported
+
+
+# LOAD DATA文件中需要转义的字符
+_LOAD_DATA_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def _load_data_value(value):
+    """把单元格的值转换为LOAD DATA文件中的字段，NULL写为\\N"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float) and value.is_integer():
+        # Excel中的整数读出来是浮点数，去掉多余的.0
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (date, dt_time)):
+        return value.isoformat()
+    return str(value).translate(_LOAD_DATA_ESCAPES)
+
+
+def _write_load_data_file(rows, chunks, progress, start):
+    """
+    把数据规范化写入临时文件（制表符分隔、反斜杠转义、UTF-8），供LOAD DATA读取
+    
+    Returns:
+        (临时文件路径, 行数)
+    """
+    fd, temp_path = tempfile.mkstemp(suffix='.tsv', prefix='import_')
+    row_count = 0
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            while True:
+                f.writelines('\t'.join([_load_data_value(value) for value in row]) + '\n' for row in rows)
+                row_count += len(rows)
+                _report_progress(progress, 'normalize', row_count, start)
+                
+                next_chunk = next(chunks, None)
+                if next_chunk is None:
+                    break
+                rows = next_chunk[1]
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, row_count
+
+
+def _load_data_chunks(connection, table_name, columns, rows, chunks, progress, start, relax_checks=False):
+    """
+    使用LOAD DATA LOCAL INFILE导入数据
+    
+    导入到本次新建的表格时（relax_checks），关闭当前会话的唯一性检查和外键检查：
+    新建的表格此时只有主键，全文搜索索引在导入完成后再建立。
+    追加到已有表格时保留检查，已有的唯一索引不会被写入重复值。
+    
+    Returns:
+        (导入的行数, 警告数)
+    """
+    temp_path, row_count = _write_load_data_file(rows, chunks, progress, start)
+    try:
+        column_list = ', '.join([f'`{col}`' for col in columns])
+        load_sql = (
+            f"LOAD DATA LOCAL INFILE :path INTO TABLE `{table_name}` "
+            f"CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            f"LINES TERMINATED BY '\\n' "
+            f"({column_list})"
+        )
+        print(f"执行SQL: {load_sql}")
+        
+        if relax_checks:
+            connection.execute(text("SET SESSION unique_checks = 0, foreign_key_checks = 0"))
+        try:
+            result = connection.execute(text(load_sql), {'path': temp_path})
+            rows_imported = result.rowcount
+            warning_count = connection.execute(text("SELECT @@warning_count")).scalar() or 0
+        finally:
+            if relax_checks:
+                connection.execute(text("SET SESSION unique_checks = 1, foreign_key_checks = 1"))
+        
+        _report_progress(progress, 'load', rows_imported, start)
+        if warning_count:
+            print(f"LOAD DATA导入表格 {table_name} 产生 {warning_count} 条警告（数据被截断或转换）")
+        return rows_imported, warning_count
+    finally:
+        os.remove(temp_path)
+
+
+# 服务端或客户端不允许LOAD DATA LOCAL INFILE时的错误码
+LOCAL_INFILE_DISABLED_ERRORS = (1148, 2068, 3948)
+
+# 本进程中LOAD DATA LOCAL INFILE是否已确认不可用，避免每次导入都先失败一次
+_local_infile_unavailable = False
+
+
+# 表格已存在的错误码
+TABLE_EXISTS_ERROR = 1050
+
+
+def _is_table_exists_error(error):
+    """判断异常是否由于表格已存在"""
+    args = getattr(getattr(error, 'orig', None), 'args', None)
+    return bool(args) and args[0] == TABLE_EXISTS_ERROR
+
+
+def _is_local_infile_disabled(error):
+    """判断异常是否由于不允许LOAD DATA LOCAL INFILE"""
+    orig = getattr(error, 'orig', None)
+    args = getattr(orig, 'args', None)
+    return bool(args) and args[0] in LOCAL_INFILE_DISABLED_ERRORS
+
+
+def import_table_from_file(file_path, table_name, database=DATASHARE_DB_NAME, progress=None, engine_name=IMPORT_ENGINE,
+                           column_types=None, infer_types=IMPORT_INFER_TYPES):
     """
     从文件导入数据表
     
+    文件分块读取，内存占用与文件大小无关，所有数据在同一个事务中提交。
+    新建表格时先扫描一遍文件推断列类型（见schema_inference）。
+    导入方式：
+    - load_data：把数据规范化写入临时文件，使用LOAD DATA LOCAL INFILE批量导入
+    - insert：每块数据按IMPORT_BATCH_SIZE分批INSERT
+    - auto：优先使用load_data，服务端不允许LOCAL INFILE时回退到insert
+    导入失败时回滚，并删除本次导入新建的表格（追加到已有表格时不删除）。
+    
     Args:
         file_path: 文件路径
         table_name: 目标表格名称
         database: 数据库名称，默认为DATASHARE_DB_NAME
+        progress: 进度回调，调用方式为progress(stage=阶段, rows_processed=已处理行数, elapsed=耗时, rows_per_second=吞吐量)
+        engine_name: 导入方式，默认为IMPORT_ENGINE配置
+        column_types: 按列指定的类型 {列名: 类型}，覆盖推断结果，只在新建表格时生效
+        infer_types: 是否推断列类型，默认为IMPORT_INFER_TYPES配置，关闭时所有列使用VARCHAR(255)
         
     Returns:
         dict: 导入结果
     """
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
+    global _local_infile_unavailable
+    
+    if engine_name not in ('auto', 'load_data', 'insert'):
+        return {'success': False, 'message': f'不支持的导入方式: {engine_name}'}
+    
+    engine = get_engine(database)
+    
+    # 清理表名，移除可能的数据库名前缀和引号
+    if '.' in table_name:
+        table_name = table_name.split('.')[-1]
+    table_name = table_name.strip("'\"`")
+    
+    start = time.perf_counter()
+    connection = None
+    table_created = False
     
     try:
-        # 根据文件扩展名选择读取方式
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file_path.endswith('.xlsx') or file_path.endswith('.xls'):
-            df = pd.read_excel(file_path)
-        else:
-            return {'success': False, 'message': '不支持的文件格式'}
-        
-        # 清理表名，移除可能的数据库名前缀和引号
-        if '.' in table_name:
-            table_name = table_name.split('.')[-1]
-        table_name = table_name.strip("'\"`")
-        
-        # 处理NaN值，替换为None，MySQL支持NULL
-        import numpy as np
-        df = df.replace({np.nan: None})
-        
-        # 转换空字符串为None
-        df = df.replace({'': None})
-        
-        # 确保所有列名都是字符串类型
-        df.columns = [str(col) for col in df.columns]
-        
-        # 1. 创建表格，添加自增id作为主键
-        connection = engine.connect()
+        chunks = iter_file_chunks(file_path)
+        columns, rows = next(chunks)
         
-        # 构建CREATE TABLE语句，添加自增id列
-        columns_def = []
+        # 使用LOAD DATA时从导入专用引擎获取开启了local_infile的连接（不进入连接池）
+        use_load_data = engine_name == 'load_data' or (engine_name == 'auto' and not _local_infile_unavailable)
+        connection = connect(get_import_engine(engine) if use_load_data else engine)
         
-        # 添加自增id作为主键
-        columns_def.append("`id` INT AUTO_INCREMENT PRIMARY KEY")
+        # 1. 创建表格，添加自增id作为主键；追加到已有表格时沿用原有的列类型
+        # 是否由本次导入新建以CREATE TABLE是否成功为准（表结构目录可能尚未包含其他进程刚创建的表格）
+        schema = None
         
-        # 添加数据列，默认使用VARCHAR类型，后续可以根据数据类型自动调整
-        for col in df.columns:
-            columns_def.append(f"`{col}` VARCHAR(255)")
-        
-        create_table_sql = f"CREATE TABLE IF NOT EXISTS `{table_name}` ({', '.join(columns_def)})"
-        
-        # 执行创建表格语句
-        print(f"执行SQL: {create_table_sql}")
-        connection.execute(text(create_table_sql))
-        connection.commit()
+        if not check_table_exists(table_name, database):
+            # 扫描一遍文件推断列类型，再按请求覆盖指定列的类型
+            if infer_types:
+                schema = infer_schema(columns, iter_file_chunks(file_path))
+            else:
+                schema = default_schema(columns)
+            apply_column_overrides(schema, column_types)
+            
+            # 构建CREATE TABLE语句，添加自增id列
+            columns_def = []
+            
+            # 添加自增id作为主键
+            columns_def.append("`id` INT AUTO_INCREMENT PRIMARY KEY")
+            
+            # 添加数据列
+            for col in schema:
+                columns_def.append(f"`{col['name']}` {col['type']}")
+            
+            create_table_sql = f"CREATE TABLE `{table_name}` ({', '.join(columns_def)})"
+            
+            # 执行创建表格语句
+            print(f"执行SQL: {create_table_sql}")
+            try:
+                connection.execute(text(create_table_sql))
+                connection.commit()
+                table_created = True
+            except DBAPIError as e:
+                if not _is_table_exists_error(e):
+                    raise
+                # 表格已由其他进程创建，追加到已有表格，失败时不删除
+                connection.rollback()
+                schema = None
+                print(f"表格{table_name}已存在，追加到已有表格")
+            invalidate_table_schema(table_name, database)
+        
+        # 2. 导入数据，忽略id列（由数据库自动生成）
+        load_warnings = 0
+        used_engine = 'insert'
+        if use_load_data:
+            try:
+                rows_imported, load_warnings = _load_data_chunks(connection, table_name, columns, rows, chunks, progress, start, table_created)
+                used_engine = 'load_data'
+            except Exception as e:
+                if engine_name != 'auto' or not _is_local_infile_disabled(e):
+                    raise
+                print(f"LOAD DATA LOCAL INFILE不可用，回退到批量INSERT: {str(e)}")
+                _local_infile_unavailable = True
+                connection.rollback()
+                # 数据块迭代器已被读取完，重新读取文件
+                chunks = iter_file_chunks(file_path)
+                columns, rows = next(chunks)
+                use_load_data = False
+        if not use_load_data:
+            rows_imported = _insert_chunks(connection, table_name, columns, rows, chunks, progress, start)
         
-        # 2. 插入数据，忽略id列（由数据库自动生成）
-        # 构建INSERT语句，使用安全的参数名（param_0, param_1, ...）
-        columns = ', '.join([f'`{col}`' for col in df.columns])
-        safe_param_names = [f'param_{i}' for i in range(len(df.columns))]
-        values = ', '.join([f':{param}' for param in safe_param_names])
-        insert_sql = f"INSERT INTO `{table_name}` ({columns}) VALUES ({values})"
-        
-        # 转换数据为安全的字典列表，使用安全的参数名
-        data_list = df.to_dict('records')
-        safe_data_list = []
-        
-        for data in data_list:
-            safe_data = {}
-            for i, (col, value) in enumerate(data.items()):
-                # 清理数据，确保没有nan值
-                if pd.isna(value) or value == '':
-                    safe_data[safe_param_names[i]] = None
-                else:
-                    safe_data[safe_param_names[i]] = value
-            safe_data_list.append(safe_data)
-        
-        # 执行批量插入
-        print(f"执行SQL: {insert_sql}")
-        print(f"安全数据样本: {safe_data_list[:2]}")
-        connection.execute(text(insert_sql), safe_data_list)
         connection.commit()
+        invalidate_table_count(table_name, database)
+        emit_table_change(table_name, 'reload')
         connection.close()
+        connection = None
         
-        # 3. 返回结果，包含新增的id列
-        columns_with_id = ['id'] + list(df.columns)
+        elapsed = time.perf_counter() - start
+        rows_per_second = round(rows_imported / elapsed, 1) if elapsed > 0 else 0.0
+        print(f"导入表格 {table_name}（{used_engine}）: {rows_imported} 行, 耗时 {elapsed:.2f} 秒, {rows_per_second} 行/秒")
+        
+        # 3. 数据写入完成后再建立全文搜索索引，比边写边维护索引更快
+        search_index = None
+        if SEARCH_INDEX_AUTO_CREATE and database == DATASHARE_DB_NAME and get_search_index_columns(table_name) is None:
+            search_index = create_search_index(table_name)
+        
+        # 4. 返回结果，包含新增的id列
+        columns_with_id = ['id'] + list(columns)
         
         return {
             'success': True,
             'message': f'表格{table_name}导入成功，已自动添加自增id主键',
-            'rows_imported': len(df),
-            'columns': columns_with_id
+            'rows_imported': rows_imported,
+            'columns': columns_with_id,
+            'schema': schema,
+            'engine': used_engine,
+            'warnings': load_warnings,
+            'elapsed': round(elapsed, 3),
+            'rows_per_second': rows_per_second,
+            'search_index': search_index
         }
     except Exception as e:
         import traceback
         traceback_str = traceback.format_exc()
         print(f"导入错误: {str(e)}")
         print(f"堆栈信息: {traceback_str}")
+        
+        if connection is not None:
+            connection.rollback()
+            # 删除本次导入新建的表格，避免留下空表
+            if table_created:
+                try:
+                    connection.execute(text(f"DROP TABLE IF EXISTS `{table_name}`"))
+                    connection.commit()
+                except Exception as drop_error:
+                    print(f"删除导入失败的表格出错: {str(drop_error)}")
+                invalidate_table_schema(table_name, database)
+                invalidate_table_count(table_name, database)
+            connection.close()
+        
         return {'success': False, 'message': f'导入失败: {str(e)}', 'traceback': traceback_str}
 
 
@@ -609,14 +1654,9 @@ def create_table_from_sql(sql_statement, database=DATASHARE_DB_NAME):
     Returns:
         dict: 创建结果
     """
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
+    engine = get_engine(database)
     
-    connection = engine.connect()
+    connection = connect(engine)
     
     try:
         # 提取表格名称
@@ -649,6 +1689,9 @@ def create_table_from_sql(sql_statement, database=DATASHARE_DB_NAME):
         # 执行SQL语句
         connection.execute(text(sql_statement))
         connection.commit()
+        # 从SQL语句中解析出的表名不一定可靠，整体失效表结构目录
+        invalidate_table_schema(None, database)
+        invalidate_table_count(table_name, database)
         
         return {
             'success': True,
@@ -679,14 +1722,9 @@ def insert_table_row(table_name, data, database=DATASHARE_DB_NAME):
         table_name = table_name.split('.')[-1]
         table_name = table_name.strip("'\"")
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
+    engine = get_engine(database)
     
-    connection = engine.connect()
+    connection = connect(engine)
     
     try:
         # 构建插入语句
@@ -697,6 +1735,15 @@ def insert_table_row(table_name, data, database=DATASHARE_DB_NAME):
         # 执行插入
         result = connection.execute(text(insert_query), data)
         connection.commit()
+        invalidate_table_count(table_name, database)
+        
+        # 推送变更事件：单列主键时带上主键值（自增主键取lastrowid）
+        primary_key = schema_catalog.get_primary_key(table_name) or []
+        primary_key = primary_key[0] if len(primary_key) == 1 else None
+        id_value = data.get(primary_key) if primary_key else None
+        if primary_key and id_value is None:
+            id_value = result.lastrowid
+        emit_table_change(table_name, 'insert', primary_key, id_value, data)
         
         return {
             'success': True,
@@ -729,14 +1776,9 @@ def update_table_row(table_name, id_value, data, primary_key='id', database=DATA
         table_name = table_name.split('.')[-1]
         table_name = table_name.strip("'\"")
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
+    engine = get_engine(database)
     
-    connection = engine.connect()
+    connection = connect(engine)
     
     try:
         # 构建更新语句
@@ -750,6 +1792,8 @@ def update_table_row(table_name, id_value, data, primary_key='id', database=DATA
         # 执行更新
         result = connection.execute(text(update_query), params)
         connection.commit()
+        if result.rowcount:
+            emit_table_change(table_name, 'update', primary_key, id_value, data)
         
         return {
             'success': True,
@@ -781,14 +1825,9 @@ def delete_table_row(table_name, id_value, primary_key='id', database=DATASHARE_
         table_name = table_name.split('.')[-1]
         table_name = table_name.strip("'\"")
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
+    engine = get_engine(database)
     
-    connection = engine.connect()
+    connection = connect(engine)
     
     try:
         # 构建删除语句
@@ -797,6 +1836,9 @@ def delete_table_row(table_name, id_value, primary_key='id', database=DATASHARE_
         # 执行删除
         result = connection.execute(text(delete_query), {'id_value': id_value})
         connection.commit()
+        if result.rowcount:
+            invalidate_table_count(table_name, database)
+            emit_table_change(table_name, 'delete', primary_key, id_value)
         
         return {
             'success': True,
@@ -810,6 +1852,282 @@ def delete_table_row(table_name, id_value, primary_key='id', database=DATASHARE_
         connection.close()
 
 
+# 批量修改中逐行推送变更事件的最大行数，超过时只推送一次reload
+BATCH_EVENT_MAX_ROWS = 100
+
+
+def _validate_batch(columns, primary_key, inserts, updates, deletes):
+    """
+    按表结构校验批量修改的数据：列名、每个值的类型和NOT NULL约束、插入时必填的列
+
+    Returns:
+        list: 错误列表 [{"op": insert/update/delete, "index": 下标, "message": 原因}]
+    """
+    column_map = {column['name']: column for column in columns}
+    required_columns = [column['name'] for column in columns if not is_auto_filled(column)]
+    errors = []
+
+    def check_row(op, index, row):
+        if not isinstance(row, dict) or not row:
+            errors.append({'op': op, 'index': index, 'message': '数据必须是非空的{列名: 值}'})
+            return
+        unknown = [col for col in row if col not in column_map]
+        if unknown:
+            errors.append({'op': op, 'index': index, 'message': f"列不存在: {', '.join(unknown)}"})
+            return
+        if op == 'insert':
+            missing = [col for col in required_columns if col not in row]
+            if missing:
+                errors.append({'op': op, 'index': index, 'message': f"缺少必填列: {', '.join(missing)}"})
+                return
+        messages = [check_column_value(column_map[col], value) for col, value in row.items()]
+        messages = [message for message in messages if message]
+        if messages:
+            errors.append({'op': op, 'index': index, 'message': '；'.join(messages)})
+
+    def check_key(op, index, value, seen):
+        if value is None or isinstance(value, (dict, list)):
+            errors.append({'op': op, 'index': index, 'message': f'缺少有效的主键值{primary_key}'})
+            return
+        # 主键值的类型不对时（如整数主键传入"abc"），MySQL比较时会转换为0，可能匹配到其他行
+        message = check_column_value(column_map[primary_key], value)
+        if message:
+            errors.append({'op': op, 'index': index, 'message': message})
+            return
+        key = comparable_value(column_map[primary_key], value)
+        if key in seen:
+            errors.append({'op': op, 'index': index, 'message': f'主键值重复: {value}'})
+        seen.add(key)
+
+    for index, row in enumerate(inserts):
+        check_row('insert', index, row)
+
+    seen = set()
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict):
+            errors.append({'op': 'update', 'index': index, 'message': '格式必须是{"id": 主键值, "data": {列名: 值}}'})
+            continue
+        check_key('update', index, item.get('id'), seen)
+        check_row('update', index, item.get('data'))
+        if isinstance(item.get('data'), dict) and primary_key in item['data']:
+            errors.append({'op': 'update', 'index': index, 'message': f'不能修改主键列{primary_key}'})
+
+    seen = set()
+    for index, value in enumerate(deletes):
+        check_key('delete', index, value, seen)
+    return errors
+
+
+def _existing_keys(connection, table_name, primary_key, values):
+    """
+    逐个检查主键值是否存在，并锁定存在的行（SELECT ... FOR UPDATE）
+
+    在同一事务中、修改前执行：锁定的行在提交前不会被其他事务删除或修改，
+    查到的结果就是随后UPDATE/DELETE实际作用的行；本事务中先插入的行也能查到。
+    每个值都在数据库中用`主键 = 值`比较，与UPDATE/DELETE的WHERE条件一致，
+    排序规则（如不区分大小写）和数值转换（如DECIMAL主键的1和"1.0"）都按数据库的规则处理，
+    不在Python中比较主键值的字符串形式。
+
+    Returns:
+        list: 与values一一对应的布尔值
+    """
+    found = []
+    for start in range(0, len(values), IMPORT_BATCH_SIZE):
+        batch = values[start:start + IMPORT_BATCH_SIZE]
+        params = {f'k{i}': value for i, value in enumerate(batch)}
+        # 每个找到的行返回它与各个值是否相等，一个值可能与多行相等（如不区分大小写的排序规则）
+        matches = ', '.join(f"`{primary_key}` = :k{i}" for i in range(len(batch)))
+        placeholders = ', '.join(f':k{i}' for i in range(len(batch)))
+        rows = connection.execute(
+            text(f"SELECT {matches} FROM `{table_name}` WHERE `{primary_key}` IN ({placeholders}) FOR UPDATE"), params
+        ).fetchall()
+        found.extend(any(row[i] for row in rows) for i in range(len(batch)))
+    return found
+
+
+def _batch_insert(connection, table_name, primary_key, auto_increment, inserts):
+    """
+    按列组合分组，每组使用多行INSERT插入
+
+    Returns:
+        list: 每行的主键值，无法确定时为None
+    """
+    ids = [None] * len(inserts)
+    increment = None
+    groups = {}
+    for index, row in enumerate(inserts):
+        groups.setdefault(tuple(row.keys()), []).append(index)
+
+    for group_columns, indexes in groups.items():
+        column_list = ', '.join(f'`{col}`' for col in group_columns)
+        for start in range(0, len(indexes), IMPORT_BATCH_SIZE):
+            batch = indexes[start:start + IMPORT_BATCH_SIZE]
+            params = {}
+            values = []
+            for n, index in enumerate(batch):
+                placeholders = []
+                for i, col in enumerate(group_columns):
+                    params[f'r{n}_{i}'] = inserts[index][col]
+                    placeholders.append(f':r{n}_{i}')
+                values.append('(' + ', '.join(placeholders) + ')')
+            result = connection.execute(
+                text(f"INSERT INTO `{table_name}` ({column_list}) VALUES {', '.join(values)}"), params
+            )
+            if primary_key in group_columns:
+                for index in batch:
+                    ids[index] = inserts[index][primary_key]
+            elif auto_increment and result.lastrowid:
+                # 多行INSERT按auto_increment_increment的步长分配自增值，lastrowid为第一行的值
+                if increment is None:
+                    increment = connection.execute(text("SELECT @@SESSION.auto_increment_increment")).scalar() or 1
+                for n, index in enumerate(batch):
+                    ids[index] = result.lastrowid + n * increment
+    return ids
+
+
+def _batch_update(connection, table_name, primary_key, updates):
+    """按修改的列组合分组，每组使用一条UPDATE ... SET col = CASE pk WHEN ... END更新多行"""
+    groups = {}
+    for item in updates:
+        groups.setdefault(tuple(item['data'].keys()), []).append(item)
+
+    for group_columns, items in groups.items():
+        for start in range(0, len(items), IMPORT_BATCH_SIZE):
+            batch = items[start:start + IMPORT_BATCH_SIZE]
+            params = {}
+            for n, item in enumerate(batch):
+                params[f'k{n}'] = item['id']
+                for i, col in enumerate(group_columns):
+                    params[f'v{n}_{i}'] = item['data'][col]
+            set_clause = ', '.join(
+                f"`{col}` = CASE `{primary_key}` "
+                + ' '.join(f'WHEN :k{n} THEN :v{n}_{i}' for n in range(len(batch)))
+                + f" ELSE `{col}` END"
+                for i, col in enumerate(group_columns)
+            )
+            placeholders = ', '.join(f':k{n}' for n in range(len(batch)))
+            connection.execute(
+                text(f"UPDATE `{table_name}` SET {set_clause} WHERE `{primary_key}` IN ({placeholders})"), params
+            )
+
+
+def _batch_delete(connection, table_name, primary_key, deletes):
+    """使用DELETE ... WHERE pk IN (...)删除多行"""
+    for start in range(0, len(deletes), IMPORT_BATCH_SIZE):
+        batch = deletes[start:start + IMPORT_BATCH_SIZE]
+        params = {f'k{n}': value for n, value in enumerate(batch)}
+        placeholders = ', '.join(f':k{n}' for n in range(len(batch)))
+        connection.execute(text(f"DELETE FROM `{table_name}` WHERE `{primary_key}` IN ({placeholders})"), params)
+
+
+def batch_mutate_rows(table_name, inserts=None, updates=None, deletes=None, primary_key=None, database=DATASHARE_DB_NAME):
+    """
+    在一个事务中批量插入、更新和删除表格数据行
+
+    按插入、更新、删除的顺序执行，使用多行语句；任何一条语句失败时整体回滚。
+    执行前按表结构逐行校验列名、值的类型和NOT NULL约束，有错误时不执行并返回每行的错误；
+    插入之后、更新和删除之前在同一事务中用SELECT ... FOR UPDATE查询并锁定主键存在的行，
+    结果与实际修改的行一致（包括本批插入后又更新或删除的行），不存在的行在结果中标记为not_found。
+
+    Args:
+        table_name: 表格名称
+        inserts: 要插入的行 [{列名: 值}]
+        updates: 要更新的行 [{"id": 主键值, "data": {列名: 值}}]
+        deletes: 要删除的行的主键值列表
+        primary_key: 主键列名，默认为表格的单列主键
+        database: 数据库名称，默认为DATASHARE_DB_NAME
+
+    Returns:
+        dict: 修改结果，包含每行的结果 inserted/updated/deleted；校验失败时包含errors
+    """
+    # 清理表名，移除可能的数据库名前缀
+    if '.' in table_name:
+        table_name = table_name.split('.')[-1]
+        table_name = table_name.strip("'\"")
+
+    inserts, updates, deletes = inserts or [], updates or [], deletes or []
+    if not isinstance(inserts, list) or not isinstance(updates, list) or not isinstance(deletes, list):
+        return {'success': False, 'message': 'insert、update、delete必须是列表'}
+    total = len(inserts) + len(updates) + len(deletes)
+    if total == 0:
+        return {'success': False, 'message': '没有要修改的数据行'}
+    if total > ROW_BATCH_MAX_ROWS:
+        return {'success': False, 'message': f'单次批量修改不能超过{ROW_BATCH_MAX_ROWS}行'}
+
+    engine = get_engine(database)
+    connection = connect(engine)
+
+    try:
+        columns = _get_columns(connection, table_name, database)
+        if not columns:
+            return {'success': False, 'message': '表格不存在'}
+
+        key_columns = [column for column in columns if column['key'] == 'PRI']
+        if primary_key is None:
+            if (updates or deletes) and len(key_columns) != 1:
+                return {'success': False, 'message': '表格没有单列主键，请指定primary_key'}
+            primary_key = key_columns[0]['name'] if len(key_columns) == 1 else None
+        elif primary_key not in {column['name'] for column in columns}:
+            return {'success': False, 'message': f'主键列不存在: {primary_key}'}
+        auto_increment = any(
+            column['name'] == primary_key and 'auto_increment' in (column['extra'] or '')
+            for column in key_columns
+        )
+
+        errors = _validate_batch(columns, primary_key, inserts, updates, deletes)
+        if errors:
+            return {'success': False, 'message': f'{len(errors)}行数据校验失败', 'errors': errors}
+
+        inserted_ids = _batch_insert(connection, table_name, primary_key, auto_increment, inserts) if inserts else []
+
+        # 插入之后再锁定要更新、删除的行，本批插入的行也能被更新和删除
+        update_keys = [item['id'] for item in updates]
+        existing_updates = _existing_keys(connection, table_name, primary_key, update_keys) if updates else []
+        found_updates = [item for item, found in zip(updates, existing_updates) if found]
+        if found_updates:
+            _batch_update(connection, table_name, primary_key, found_updates)
+        existing_deletes = _existing_keys(connection, table_name, primary_key, deletes) if deletes else []
+        found_deletes = [value for value, found in zip(deletes, existing_deletes) if found]
+        if found_deletes:
+            _batch_delete(connection, table_name, primary_key, found_deletes)
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        return {'success': False, 'message': f'批量修改失败: {str(e)}'}
+    finally:
+        connection.close()
+
+    if inserts or found_deletes:
+        invalidate_table_count(table_name, database)
+
+    # 推送变更事件，行数较多时只推送一次reload
+    if len(inserts) + len(found_updates) + len(found_deletes) > BATCH_EVENT_MAX_ROWS:
+        emit_table_change(table_name, 'reload')
+    else:
+        rooms = table_viewer_rooms(table_name)
+        for row, id_value in zip(inserts, inserted_ids):
+            emit_table_change(table_name, 'insert', primary_key, id_value, row, rooms)
+        for item in found_updates:
+            emit_table_change(table_name, 'update', primary_key, item['id'], item['data'], rooms)
+        for value in found_deletes:
+            emit_table_change(table_name, 'delete', primary_key, value, rooms=rooms)
+
+    return {
+        'success': True,
+        'message': '批量修改成功',
+        'primary_key': primary_key,
+        'inserted': [{'index': index, 'id': id_value} for index, id_value in enumerate(inserted_ids)],
+        'updated': [
+            {'index': index, 'id': item['id'], 'status': 'updated' if found else 'not_found'}
+            for index, (item, found) in enumerate(zip(updates, existing_updates))
+        ],
+        'deleted': [
+            {'index': index, 'id': value, 'status': 'deleted' if found else 'not_found'}
+            for index, (value, found) in enumerate(zip(deletes, existing_deletes))
+        ]
+    }
+
+
 def delete_table(table_name, database=DATASHARE_DB_NAME):
     """
     删除整个表格
@@ -826,14 +2144,9 @@ def delete_table(table_name, database=DATASHARE_DB_NAME):
         table_name = table_name.split('.')[-1]
         table_name = table_name.strip("'\"")
     
-    if database == DATASHARE_DB_NAME:
-        # 使用datashare数据库连接
-        engine = db.get_engine(bind=DATASHARE_DB_BIND)
-    else:
-        # 使用主数据库连接
-        engine = db.engine
+    engine = get_engine(database)
     
-    connection = engine.connect()
+    connection = connect(engine)
     
     try:
         # 构建删除语句
@@ -842,6 +2155,10 @@ def delete_table(table_name, database=DATASHARE_DB_NAME):
         # 执行删除
         connection.execute(text(delete_query))
         connection.commit()
+        invalidate_table_schema(table_name, database)
+        invalidate_table_count(table_name, database)
+        column_usage.reset(table_name)
+        emit_table_change(table_name, 'reload')
         
         return {
             'success': True,
@@ -0,0 +1,231 @@
+"""
+数据库连接池管理工具函数
+
+连接池由Flask-SQLAlchemy在每个worker进程中创建一次并长期复用，
+这里负责提供连接池参数、统计连接池的取用/等待指标。
+"""
+
+import os
+import time
+import threading
+from sqlalchemy import event, create_engine
+from sqlalchemy.pool import NullPool
+from ..extensions import db
+from ..config import (
+    DATASHARE_POOL_SIZE, DATASHARE_POOL_MAX_OVERFLOW, DATASHARE_POOL_TIMEOUT,
+    DATASHARE_POOL_RECYCLE, DATASHARE_POOL_PRE_PING, DATASHARE_LOCAL_INFILE
+)
+
+
+def get_datashare_engine_options():
+    """
+    获取数据共享数据库连接池参数
+
+    Returns:
+        dict: 传递给create_engine的参数
+    """
+    return {
+        'pool_size': DATASHARE_POOL_SIZE,
+        'max_overflow': DATASHARE_POOL_MAX_OVERFLOW,
+        'pool_timeout': DATASHARE_POOL_TIMEOUT,
+        'pool_recycle': DATASHARE_POOL_RECYCLE,
+        'pool_pre_ping': DATASHARE_POOL_PRE_PING
+    }
+
+
+# 导入专用的引擎 {原引擎的URL: 引擎}
+_local_infile_engines = {}
+_local_infile_lock = threading.Lock()
+
+
+def get_import_engine(engine):
+    """
+    获取导入数据使用的引擎
+
+    DATASHARE_LOCAL_INFILE开启时返回允许LOAD DATA LOCAL INFILE的专用引擎：
+    不使用连接池，每次导入新建连接、用完关闭，连接池中的普通连接不开启local_infile，
+    避免其他查询受到服务端请求读取客户端文件的影响。未开启时返回原引擎。
+
+    Args:
+        engine: 数据库引擎
+
+    Returns:
+        Engine: 导入使用的引擎
+    """
+    if not DATASHARE_LOCAL_INFILE:
+        return engine
+    key = engine.url.render_as_string(hide_password=False)
+    with _local_infile_lock:
+        import_engine = _local_infile_engines.get(key)
+        if import_engine is None:
+            import_engine = create_engine(engine.url, poolclass=NullPool, connect_args={'local_infile': True})
+            _local_infile_engines[key] = import_engine
+        return import_engine
+
+
+class PoolMetrics:
+    """连接池指标统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record(self, field):
+        """累加指定计数器"""
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def record_wait(self, seconds):
+        """记录一次获取连接的等待时间"""
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def to_dict(self, pool=None):
+        """
+        转换为字典格式
+
+        Args:
+            pool: 对应的连接池对象，用于读取当前连接状态
+
+        Returns:
+            dict: 指标数据
+        """
+        with self._lock:
+            stats = {
+                'name': self.name,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'wait_count': self.wait_count,
+                'wait_avg_ms': round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3)
+            }
+
+        if pool is not None:
+            # QueuePool提供以下状态方法，其他类型的连接池可能没有
+            for key in ('size', 'checkedin', 'checkedout', 'overflow'):
+                method = getattr(pool, key, None)
+                if callable(method):
+                    stats[key] = method()
+            stats['status'] = pool.status()
+
+        return stats
+
+
+# 各数据库连接池的指标，键为绑定名称（主数据库为'default'）
+_pool_metrics = {}
+
+# 已安装指标统计的引擎
+_engines = {}
+
+
+def install_pool_metrics(engine, name):
+    """
+    为引擎的连接池注册事件监听，统计连接创建、取出、归还等指标
+
+    Args:
+        engine: SQLAlchemy引擎
+        name: 指标名称
+    """
+    if name in _pool_metrics:
+        return _pool_metrics[name]
+
+    metrics = PoolMetrics(name)
+
+    @event.listens_for(engine.pool, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        metrics.record('connects')
+
+    @event.listens_for(engine.pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record('checkouts')
+
+    @event.listens_for(engine.pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.record('checkins')
+
+    @event.listens_for(engine.pool, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record('invalidations')
+
+    _pool_metrics[name] = metrics
+    _engines[name] = engine
+    return metrics
+
+
+def _dispose_after_fork():
+    """
+    子进程中丢弃从父进程继承的连接（gunicorn --preload场景），
+    close=False表示不关闭父进程仍在使用的socket，子进程会按需重新建立连接
+    """
+    for name, engine in _engines.items():
+        engine.dispose(close=False)
+        _pool_metrics[name].reset()
+
+
+def init_app(app):
+    """
+    初始化连接池指标统计
+
+    Args:
+        app: Flask应用实例
+    """
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for bind_key, engine in engines.items():
+        install_pool_metrics(engine, bind_key or 'default')
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def connect(engine):
+    """
+    从连接池获取连接，并记录等待时间
+
+    Args:
+        engine: SQLAlchemy引擎
+
+    Returns:
+        Connection: 数据库连接，使用完毕后需调用close()归还连接池
+    """
+    start = time.perf_counter()
+    connection = engine.connect()
+    elapsed = time.perf_counter() - start
+
+    for name, installed_engine in _engines.items():
+        if installed_engine is engine:
+            _pool_metrics[name].record_wait(elapsed)
+            break
+
+    return connection
+
+
+def get_pool_stats():
+    """
+    获取所有连接池的指标
+
+    Returns:
+        list: 指标数据列表
+    """
+    return [
+        _pool_metrics[name].to_dict(engine.pool)
+        for name, engine in _engines.items()
+    ]
@@ -0,0 +1,270 @@
+"""
+后台导出任务和导出文件缓存
+
+导出在后台线程中执行，完成后的文件保存在EXPORT_CACHE_DIR中，
+以“表格 + 导出格式 + 数据版本”作为缓存键。表格数据没有变化时，
+再次导出直接返回已生成的文件。缓存目录总大小超过EXPORT_CACHE_MAX_BYTES时，
+按最近使用时间删除最久未使用的文件。
+"""
+
+import os
+import time
+import hashlib
+from datetime import datetime
+from sqlalchemy import text
+from ..config import (
+    DATASHARE_DB_CONFIG, EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES, EXPORT_JOB_WORKERS, JOB_RETENTION
+)
+from .db_pool import connect
+from .jobs import JobManager
+from .data_utils import get_engine, iter_table_csv, export_table_excel
+
+# 导出格式对应的文件扩展名和MIME类型
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+
+# 表格最近一次修改距今不足该秒数时不使用缓存
+# （UPDATE_TIME精度为秒，同一秒内的后续写入不会改变数据版本）
+FINGERPRINT_SETTLE_SECONDS = 2
+
+export_jobs = JobManager('export', EXPORT_JOB_WORKERS)
+
+
+def get_table_fingerprint(table_name):
+    """
+    获取表格的数据版本
+
+    使用information_schema.TABLES中的CREATE_TIME和UPDATE_TIME：
+    重建表格会改变CREATE_TIME，写入数据会改变UPDATE_TIME。
+    UPDATE_TIME为空（MySQL重启后InnoDB尚未记录写入时间）或刚刚修改过时，
+    无法确认数据版本，返回None，此时不使用缓存。
+
+    Args:
+        table_name: 表格名称
+
+    Returns:
+        str: 数据版本，无法确认时返回None
+    """
+    connection = connect(get_engine())
+    stats_expiry_changed = False
+    try:
+        # MySQL 8默认缓存表统计信息，这里需要读取实时的UPDATE_TIME
+        try:
+            connection.execute(text("SET SESSION information_schema_stats_expiry = 0"))
+            stats_expiry_changed = True
+        except Exception:
+            # MySQL 5.7没有该变量，统计信息本来就是实时的
+            connection.rollback()
+        row = connection.execute(
+            text("""
+                SELECT CREATE_TIME, UPDATE_TIME, TIMESTAMPDIFF(SECOND, UPDATE_TIME, NOW())
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name
+            """),
+            {'schema': DATASHARE_DB_CONFIG['database'], 'table_name': table_name}
+        ).fetchone()
+    finally:
+        # 连接会归还到连接池，恢复会话变量，避免影响之后使用该连接的查询
+        if stats_expiry_changed:
+            try:
+                connection.execute(text("SET SESSION information_schema_stats_expiry = DEFAULT"))
+            except Exception as e:
+                print(f"恢复information_schema_stats_expiry失败，丢弃该连接: {str(e)}")
+                connection.invalidate()
+        connection.close()
+
+    if row is None or row[0] is None or row[1] is None:
+        return None
+    if row[2] is None or row[2] < FINGERPRINT_SETTLE_SECONDS:
+        return None
+    return f"{row[0].isoformat()}|{row[1].isoformat()}"
+
+
+def _cache_key(table_name, export_format, fingerprint):
+    """生成缓存文件名（不含扩展名）"""
+    raw = f"{DATASHARE_DB_CONFIG['database']}|{table_name}|{export_format}|{fingerprint}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def get_artifact_path(artifact):
+    """
+    获取导出文件的完整路径
+
+    Args:
+        artifact: 导出文件名
+
+    Returns:
+        str: 文件路径，文件已被删除时返回None
+    """
+    path = os.path.join(EXPORT_CACHE_DIR, os.path.basename(artifact))
+    if not os.path.isfile(path):
+        return None
+    return path
+
+
+def touch_artifact(path):
+    """更新导出文件的最近使用时间，用于LRU淘汰"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def find_cached_export(table_name, export_format):
+    """
+    查找表格当前数据版本对应的缓存导出文件
+
+    Args:
+        table_name: 表格名称
+        export_format: 导出格式
+
+    Returns:
+        str: 文件路径，没有可用缓存时返回None
+    """
+    fingerprint = get_table_fingerprint(table_name)
+    if fingerprint is None:
+        return None
+    extension = EXPORT_FORMATS[export_format][0]
+    path = get_artifact_path(f"{_cache_key(table_name, export_format, fingerprint)}.{extension}")
+    if path is not None:
+        touch_artifact(path)
+    return path
+
+
+def evict_export_cache(keep=None):
+    """
+    淘汰导出文件，使缓存目录总大小不超过EXPORT_CACHE_MAX_BYTES
+
+    Args:
+        keep: 不删除的文件路径（刚生成的文件）
+
+    Returns:
+        int: 删除的文件数
+    """
+    if not os.path.isdir(EXPORT_CACHE_DIR):
+        return 0
+
+    now = time.time()
+    files = []
+    total_size = 0
+    for name in os.listdir(EXPORT_CACHE_DIR):
+        path = os.path.join(EXPORT_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if not os.path.isfile(path):
+            continue
+        if name.endswith('.tmp'):
+            # 正在写入的临时文件不参与淘汰，进程异常退出残留的临时文件超过保留时间后删除
+            if now - stat.st_mtime > JOB_RETENTION:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            continue
+        if name.startswith('job-') and now - stat.st_mtime > JOB_RETENTION:
+            # 未放入缓存的导出文件只属于单个任务，任务状态过期后一并删除
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+        total_size += stat.st_size
+
+    removed = 0
+    for _, size, path in sorted(files):
+        if total_size <= EXPORT_CACHE_MAX_BYTES:
+            break
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_size -= size
+        removed += 1
+    return removed
+
+
+def _run_export(job_id, params, report):
+    """执行导出任务，返回导出文件信息"""
+    table_name = params['table_name']
+    export_format = params['format']
+    extension = EXPORT_FORMATS[export_format][0]
+    fingerprint = get_table_fingerprint(table_name)
+
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    temp_path = os.path.join(EXPORT_CACHE_DIR, f"job-{job_id}.{extension}.tmp")
+    rows = None
+    try:
+        if export_format == 'csv':
+            size = 0
+            with open(temp_path, 'wb') as f:
+                for chunk in iter_table_csv(table_name):
+                    f.write(chunk)
+                    size += len(chunk)
+                    report(bytes=size)
+        else:
+            stats = export_table_excel(table_name, temp_path)
+            rows = stats['rows']
+
+        # 导出期间表格被修改时，文件内容无法对应到单一数据版本，不放入缓存
+        if fingerprint is not None and get_table_fingerprint(table_name) == fingerprint:
+            artifact = f"{_cache_key(table_name, export_format, fingerprint)}.{extension}"
+            cached = True
+        else:
+            artifact = f"job-{job_id}.{extension}"
+            cached = False
+        path = os.path.join(EXPORT_CACHE_DIR, artifact)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    evict_export_cache(keep=path)
+    return {
+        'artifact': artifact,
+        'size': os.path.getsize(path),
+        'rows': rows,
+        'cached': cached,
+        'cache_hit': False
+    }
+
+
+def submit_export_job(table_name, export_format, owner_id):
+    """
+    提交导出任务，表格数据未变化且已有缓存文件时直接返回已完成的任务
+
+    Args:
+        table_name: 表格名称
+        export_format: 导出格式，'csv'或'excel'
+        owner_id: 提交任务的用户ID
+
+    Returns:
+        dict: 任务状态
+    """
+    params = {'table_name': table_name, 'format': export_format}
+
+    path = find_cached_export(table_name, export_format)
+    if path is not None:
+        now = datetime.now().isoformat()
+        return export_jobs.create(
+            owner_id, params,
+            status='completed',
+            started_at=now,
+            finished_at=now,
+            result={
+                'artifact': os.path.basename(path),
+                'size': os.path.getsize(path),
+                'rows': None,
+                'cached': True,
+                'cache_hit': True
+            }
+        )
+
+    return export_jobs.submit(owner_id, params, _run_export)
@@ -3,9 +3,17 @@
 """
 
 import os
-import uuid
-from werkzeug.utils import secure_filename
-from ..config import UPLOAD_FOLDER
+import hashlib
+import tempfile
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import or_, and_, update, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import joinedload
+from ..extensions import db
+from ..config import UPLOAD_FOLDER, FILE_LIST_PAGE_SIZE, FILE_LIST_MAX_PAGE_SIZE, FILE_HASH_CHUNK_SIZE
+from ..models.file import File, FileBlob
+from .data_utils import encode_cursor, decode_cursor
 
 def allowed_file(filename):
     """
@@ -20,53 +28,222 @@ def allowed_file(filename):
     # 允许所有文件类型上传
     return True
 
-def save_file(file):
+# 去重存储的文件内容保存在UPLOAD_FOLDER下的该目录中
+BLOB_FOLDER = 'blobs'
+
+
+def _absolute_path(storage_path):
+    """存储路径转换为绝对路径，旧文件可能直接保存了绝对路径"""
+    if os.path.isabs(storage_path):
+        return storage_path
+    return os.path.join(UPLOAD_FOLDER, storage_path)
+
+
+def blob_storage_path(sha256):
     """
-    保存上传的文件
-    
+    内容的存储路径（相对于UPLOAD_FOLDER），按哈希前两位分目录
+
+    Args:
+        sha256: 内容的SHA-256
+
+    Returns:
+        str: 如blobs/3f/3fa8...
+    """
+    return f"{BLOB_FOLDER}/{sha256[:2]}/{sha256}"
+
+
+def _write_temp_file(stream):
+    """
+    把上传的文件流写入临时文件，同时计算SHA-256
+
+    Returns:
+        tuple: (临时文件路径, SHA-256, 字节数)
+    """
+    temp_dir = os.path.join(UPLOAD_FOLDER, BLOB_FOLDER, 'tmp')
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(FILE_HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def _hash_file(absolute_path):
+    """计算已保存文件的SHA-256和字节数"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(absolute_path, 'rb') as f:
+        while True:
+            chunk = f.read(FILE_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _reference_blob(sha256, storage_path, size):
+    """
+    登记对内容的一次引用，内容不存在时新建记录
+
+    引用计数的更新会锁住该内容的记录直到事务提交，与release_blobs互斥。
+
+    Returns:
+        FileBlob: 内容记录，已有记录时storage_path为原来的存储路径
+    """
+    stmt = mysql_insert(FileBlob.__table__).values(
+        sha256=sha256,
+        storage_path=storage_path,
+        size=size,
+        ref_count=1,
+        created_at=datetime.now()
+    )
+    stmt = stmt.on_duplicate_key_update(ref_count=FileBlob.__table__.c.ref_count + 1)
+    db.session.execute(stmt)
+    return FileBlob.query.filter_by(sha256=sha256).populate_existing().one()
+
+
+def store_upload(file):
+    """
+    保存上传的文件内容，相同内容只保存一份
+
+    边写入临时文件边计算SHA-256，内容已存在时删除临时文件，只增加引用计数。
+    需要在创建文件记录的同一事务中调用。
+
     Args:
         file: 上传的文件对象
-    
+
     Returns:
-        tuple: (原始文件名, 相对文件路径)
+        FileBlob: 内容记录，文件记录的filepath使用其storage_path
     """
-    # 确保上传目录存在
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    
-    # 保留原始文件名，用于显示和下载
-    original_filename = file.filename
-    
-    # 生成唯一的文件存储名，使用secure_filename处理以避免存储问题
-    file_ext = os.path.splitext(original_filename)[1]
-    unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-    
-    # 保存文件
-    absolute_filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-    file.save(absolute_filepath)
-    
-    # 只返回相对路径（相对于UPLOAD_FOLDER）
-    relative_filepath = unique_filename
-    
-    return original_filename, relative_filepath
+    temp_path, sha256, size = _write_temp_file(file.stream)
+    try:
+        blob = _reference_blob(sha256, blob_storage_path(sha256), size)
+        # 事务回滚时内容文件会留在磁盘上，之后相同内容的上传会直接复用
+        absolute_path = _absolute_path(blob.storage_path)
+        if os.path.exists(absolute_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+            os.replace(temp_path, absolute_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return blob
+
+
+def register_legacy_file(file):
+    """
+    为去重存储之前上传的文件登记内容（文件记录的blob_id为空）
+
+    内容还没有记录时直接使用原文件作为内容；已有相同内容时文件记录改为引用已有内容，
+    原文件成为多余的副本，由调用方在事务提交后删除。
+
+    Args:
+        file: 文件记录
+
+    Returns:
+        tuple: (FileBlob, 多余副本的绝对路径或None)
+    """
+    absolute_path = _absolute_path(file.filepath)
+    sha256, size = _hash_file(absolute_path)
+    blob = _reference_blob(sha256, file.filepath, size)
+    redundant_path = None
+    if blob.storage_path != file.filepath:
+        redundant_path = absolute_path
+        file.filepath = blob.storage_path
+    file.blob_id = blob.id
+    return blob, redundant_path
+
+
+def acquire_blob(blob_id):
+    """增加内容的引用计数，复制文件时新文件记录直接引用原文件的内容"""
+    db.session.execute(
+        update(FileBlob).where(FileBlob.id == blob_id).values(ref_count=FileBlob.ref_count + 1)
+    )
+
+
+def release_blobs(blob_ids):
+    """
+    释放文件记录对内容的引用，引用数为0的内容删除记录
+
+    需要在删除文件记录的同一事务中、提交之前调用。磁盘文件不在这里删除（事务可能回滚），
+    调用方在提交成功后把返回值传给remove_released_blobs()。
+
+    Args:
+        blob_ids: 被删除的文件记录的blob_id（可重复，None忽略）
+
+    Returns:
+        list: 被删除的内容 [(sha256, 存储路径)]
+    """
+    counts = Counter(blob_id for blob_id in blob_ids if blob_id is not None)
+    if not counts:
+        return []
+    blobs = FileBlob.query.filter(FileBlob.id.in_(counts)).with_for_update().populate_existing().all()
+    released = []
+    for blob in blobs:
+        blob.ref_count -= counts[blob.id]
+        if blob.ref_count <= 0:
+            released.append((blob.sha256, blob.storage_path))
+            db.session.delete(blob)
+    return released
+
+
+def remove_released_blobs(released):
+    """
+    事务提交后删除release_blobs()释放的内容文件
+
+    在新事务中按sha256加锁读取内容记录：并发上传相同内容且已登记的，等其提交后记录重新存在，保留文件；
+    尚未登记的上传会等本事务删除文件后再写入新文件。删除失败只打印日志。
+
+    Args:
+        released: release_blobs()的返回值
+    """
+    if not released:
+        return
+    try:
+        recreated = set(db.session.scalars(
+            select(FileBlob.sha256).where(FileBlob.sha256.in_([sha256 for sha256, _ in released])).with_for_update()
+        ))
+        for sha256, storage_path in released:
+            if sha256 not in recreated:
+                delete_file(storage_path)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"删除文件内容失败: {str(e)}")
+
 
 def delete_file(filepath):
     """
-    删除文件
-    
+    删除磁盘上的文件，删除失败时只打印日志
+
     Args:
-        filepath: 相对文件路径（相对于UPLOAD_FOLDER）
-    
+        filepath: 相对于UPLOAD_FOLDER的路径，或旧文件的绝对路径
+
     Returns:
         bool: 文件是否删除成功
     """
+    absolute_filepath = _absolute_path(filepath)
     try:
-        # 将相对路径转换为绝对路径
-        absolute_filepath = os.path.join(UPLOAD_FOLDER, filepath)
         if os.path.exists(absolute_filepath):
             os.remove(absolute_filepath)
             return True
         return False
-    except Exception as e:
+    except OSError as e:
+        print(f"删除文件{absolute_filepath}失败: {str(e)}")
         return False
 
 def get_file_size(filepath):
@@ -82,3 +259,124 @@ def get_file_size(filepath):
     # 将相对路径转换为绝对路径
     absolute_filepath = os.path.join(UPLOAD_FOLDER, filepath)
     return os.path.getsize(absolute_filepath)
+
+def serialize_file(file):
+    """
+    文件信息的响应格式
+
+    Args:
+        file: 文件模型实例，列表查询时应已加载user（见list_files）
+
+    Returns:
+        dict: {"id", "filename", "size", "is_shared", "created_at", "uploader"}
+    """
+    return {
+        'id': file.id,
+        'filename': file.filename,
+        'size': file.size,
+        'is_shared': file.is_shared,
+        'created_at': file.created_at.isoformat(),
+        'uploader': file.user.username
+    }
+
+# 文件列表支持的排序字段
+FILE_SORT_FIELDS = ('created_at', 'filename', 'size')
+
+
+def _cursor_sort_value(sort_by, value):
+    """把游标中的排序值还原为列的类型"""
+    if sort_by == 'created_at':
+        return datetime.fromisoformat(value)
+    if sort_by == 'size':
+        return int(value)
+    return str(value)
+
+
+def _filter_files(query, search=None, prefix=None):
+    """按文件名关键词和前缀筛选文件查询"""
+    if search:
+        query = query.filter(File.filename.contains(search, autoescape=True))
+    if prefix:
+        query = query.filter(File.filename.startswith(prefix, autoescape=True))
+    return query
+
+
+def count_files(query, search=None, prefix=None):
+    """
+    统计符合条件的文件总数（与list_files使用相同的筛选条件）
+
+    Args:
+        query: 已按范围筛选的File查询
+        search: 文件名包含的关键词
+        prefix: 文件名前缀
+
+    Returns:
+        int: 文件总数
+    """
+    return _filter_files(query, search, prefix).order_by(None).count()
+
+
+def list_files(query, sort_by='created_at', sort_order='desc', limit=FILE_LIST_PAGE_SIZE, cursor=None,
+               search=None, prefix=None):
+    """
+    按游标分页查询文件列表
+
+    按(排序字段, id)排序并从游标位置往后读取，配合files表上的
+    (user_id, created_at)、(is_shared, created_at)索引，翻到任意位置的代价都相同。
+
+    Args:
+        query: 已按范围（我的文件/共享文件/所有文件）筛选的File查询
+        sort_by: 排序字段，created_at、filename或size
+        sort_order: 排序方向，asc或desc
+        limit: 每页条数
+        cursor: 上一页返回的next_cursor
+        search: 文件名包含的关键词
+        prefix: 文件名前缀
+
+    Returns:
+        tuple: (文件列表（已加载上传者）, 下一页游标)，没有下一页时游标为None
+
+    Raises:
+        ValueError: 参数或游标无效
+    """
+    if sort_by not in FILE_SORT_FIELDS:
+        raise ValueError(f"排序字段无效: {sort_by}，可选值为{', '.join(FILE_SORT_FIELDS)}")
+    if sort_order not in ('asc', 'desc'):
+        raise ValueError('排序方向只能是asc或desc')
+    limit = max(1, min(limit, FILE_LIST_MAX_PAGE_SIZE))
+    # 上传者和文件在同一条查询中加载，避免逐个文件查询用户表
+    query = _filter_files(query, search, prefix).options(joinedload(File.user))
+
+    sort_col = getattr(File, sort_by)
+    ascending = sort_order == 'asc'
+
+    if cursor:
+        payload = decode_cursor(cursor)
+        if payload.get('s') != sort_by or payload.get('o') != sort_order or len(payload['k']) != 2:
+            raise ValueError('分页游标与排序条件不一致')
+        try:
+            sort_value = _cursor_sort_value(sort_by, payload['k'][0])
+            last_id = int(payload['k'][1])
+        except (TypeError, ValueError):
+            raise ValueError('无效的分页游标')
+        if ascending:
+            query = query.filter(or_(sort_col > sort_value, and_(sort_col == sort_value, File.id > last_id)))
+        else:
+            query = query.filter(or_(sort_col < sort_value, and_(sort_col == sort_value, File.id < last_id)))
+
+    if ascending:
+        query = query.order_by(sort_col.asc(), File.id.asc())
+    else:
+        query = query.order_by(sort_col.desc(), File.id.desc())
+
+    # 多取一条判断是否还有下一页
+    files = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(files) > limit:
+        files = files[:limit]
+        last = files[-1]
+        last_value = getattr(last, sort_by)
+        if isinstance(last_value, datetime):
+            last_value = last_value.isoformat()
+        next_cursor = encode_cursor([last_value, last.id], 'next', sort_by, sort_order)
+    return files, next_cursor
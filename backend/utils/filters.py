@@ -0,0 +1,194 @@
+"""
+表格数据的结构化筛选条件
+
+把JSON格式的筛选条件编译为参数化的WHERE子句，列名按表结构校验，值全部作为参数传递。
+每个条件直接作用在列上（不对列套用函数），可以使用该列上的索引。
+
+筛选条件格式：
+- 单个条件：{"column": "age", "op": "gte", "value": 18}
+- 条件组：{"and": [条件, ...]} 或 {"or": [条件, ...]}，可以嵌套
+- 列表：[条件, ...]，等同于{"and": [...]}
+
+支持的操作符：
+eq、ne、gt、gte、lt、lte：比较
+in、not_in：value为列表
+between：value为[下限, 上限]，包含两端
+prefix：前缀匹配（LIKE 'xxx%'）
+is_null、not_null：不需要value
+"""
+
+import json
+
+# 比较操作符对应的SQL
+COMPARISON_OPS = {
+    'eq': '=',
+    'ne': '<>',
+    'gt': '>',
+    'gte': '>=',
+    'lt': '<',
+    'lte': '<='
+}
+
+# 所有支持的操作符
+FILTER_OPS = set(COMPARISON_OPS) | {'in', 'not_in', 'between', 'prefix', 'is_null', 'not_null'}
+
+# 等值类操作符，建联合索引时应作为前导列
+EQUALITY_OPS = {'eq', 'in', 'is_null'}
+
+# 条件嵌套的最大深度
+MAX_FILTER_DEPTH = 5
+# 单次查询最多的条件数
+MAX_FILTER_CONDITIONS = 50
+# in/not_in的最大值个数
+MAX_IN_VALUES = 1000
+
+
+def parse_filters(raw_filters):
+    """
+    解析请求参数中的筛选条件
+
+    Args:
+        raw_filters: JSON字符串
+
+    Returns:
+        筛选条件，为空时返回None
+
+    Raises:
+        ValueError: 不是有效的JSON
+    """
+    if not raw_filters:
+        return None
+    try:
+        return json.loads(raw_filters)
+    except ValueError:
+        raise ValueError('filters不是有效的JSON')
+
+
+def _escape_like(value):
+    """转义LIKE中的通配符"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _check_scalar(value, column):
+    """筛选值只能是字符串、数字或布尔值"""
+    if value is None or isinstance(value, (dict, list)):
+        raise ValueError(f'列{column}的筛选值无效')
+    return value
+
+
+class _FilterCompiler:
+    """筛选条件编译器"""
+
+    def __init__(self, valid_columns, params):
+        self.valid_columns = set(valid_columns)
+        self.params = params
+        self.conditions = 0
+        self.param_count = 0
+        # 顶层AND条件中使用的列（等值列在前），用于建索引建议
+        self.equality_columns = []
+        self.range_columns = []
+
+    def _param(self, value):
+        name = f'filter_{self.param_count}'
+        self.param_count += 1
+        self.params[name] = value
+        return f':{name}'
+
+    def compile(self, node, depth=0, top_level=True):
+        if depth > MAX_FILTER_DEPTH:
+            raise ValueError(f'筛选条件嵌套不能超过{MAX_FILTER_DEPTH}层')
+
+        if isinstance(node, list):
+            node = {'and': node}
+        if not isinstance(node, dict):
+            raise ValueError('筛选条件格式无效')
+
+        for group_op in ('and', 'or'):
+            if group_op in node:
+                children = node[group_op]
+                if not isinstance(children, list):
+                    raise ValueError(f'{group_op}的值必须是列表')
+                # 只有AND连接的条件才能直接利用联合索引
+                child_top_level = top_level and group_op == 'and'
+                clauses = [self.compile(child, depth + 1, child_top_level) for child in children]
+                clauses = [clause for clause in clauses if clause]
+                if not clauses:
+                    return None
+                if len(clauses) == 1:
+                    return clauses[0]
+                return '(' + f' {group_op.upper()} '.join(clauses) + ')'
+
+        return self._compile_condition(node, top_level)
+
+    def _compile_condition(self, node, top_level):
+        self.conditions += 1
+        if self.conditions > MAX_FILTER_CONDITIONS:
+            raise ValueError(f'筛选条件不能超过{MAX_FILTER_CONDITIONS}个')
+
+        column = node.get('column')
+        op = node.get('op')
+        if column not in self.valid_columns:
+            raise ValueError(f'筛选列不存在: {column}')
+        if op not in FILTER_OPS:
+            raise ValueError(f'不支持的筛选操作符: {op}')
+
+        if top_level:
+            target = self.equality_columns if op in EQUALITY_OPS else self.range_columns
+            if column not in target:
+                target.append(column)
+
+        quoted = f'`{column}`'
+        value = node.get('value')
+
+        if op in COMPARISON_OPS:
+            return f'{quoted} {COMPARISON_OPS[op]} {self._param(_check_scalar(value, column))}'
+
+        if op in ('in', 'not_in'):
+            if not isinstance(value, list) or not value:
+                raise ValueError(f'列{column}的{op}筛选值必须是非空列表')
+            if len(value) > MAX_IN_VALUES:
+                raise ValueError(f'{op}筛选值不能超过{MAX_IN_VALUES}个')
+            placeholders = ', '.join(self._param(_check_scalar(item, column)) for item in value)
+            keyword = 'IN' if op == 'in' else 'NOT IN'
+            return f'{quoted} {keyword} ({placeholders})'
+
+        if op == 'between':
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError(f'列{column}的between筛选值必须是[下限, 上限]')
+            low = self._param(_check_scalar(value[0], column))
+            high = self._param(_check_scalar(value[1], column))
+            return f'{quoted} BETWEEN {low} AND {high}'
+
+        if op == 'prefix':
+            if not isinstance(value, str) or not value:
+                raise ValueError(f'列{column}的prefix筛选值必须是非空字符串')
+            return f'{quoted} LIKE {self._param(_escape_like(value) + "%")}'
+
+        if op == 'is_null':
+            return f'{quoted} IS NULL'
+        return f'{quoted} IS NOT NULL'
+
+
+def compile_filters(filters, valid_columns, params):
+    """
+    编译筛选条件为WHERE子句
+
+    Args:
+        filters: 筛选条件（单个条件、条件组或列表）
+        valid_columns: 表格的列名列表
+        params: 查询参数字典，筛选参数（filter_0, filter_1, ...）会写入其中
+
+    Returns:
+        (WHERE子句, 筛选使用的列)，没有筛选条件时WHERE子句为None。
+        筛选使用的列只包含顶层AND条件中的列，等值条件的列在前
+
+    Raises:
+        ValueError: 筛选条件无效
+    """
+    if not filters:
+        return None, []
+    compiler = _FilterCompiler(valid_columns, params)
+    clause = compiler.compile(filters)
+    return clause, compiler.equality_columns + [
+        column for column in compiler.range_columns if column not in compiler.equality_columns
+    ]
@@ -0,0 +1,120 @@
+"""
+后台导入任务
+
+上传的文件保存为唯一的临时文件后提交到后台线程池导入，请求立即返回任务ID，
+任务状态中包含处理行数、吞吐量和错误信息。任务结束后删除临时文件。
+"""
+
+import os
+import time
+from functools import partial
+from ..extensions import db
+from ..config import IMPORT_JOB_WORKERS
+from ..models.data_share import TableMetadata
+from .jobs import JobManager
+from .data_utils import import_table_from_file
+
+# 上报导入进度的最小间隔，避免每批插入都写一次任务状态，单位：秒
+PROGRESS_INTERVAL = 1.0
+
+import_jobs = JobManager('import', IMPORT_JOB_WORKERS)
+
+
+class ImportJobError(Exception):
+    """导入失败"""
+    pass
+
+
+def _throttled(report):
+    """限制进度上报频率"""
+    last_reported = [0.0]
+
+    def progress(**fields):
+        now = time.monotonic()
+        if now - last_reported[0] >= PROGRESS_INTERVAL:
+            last_reported[0] = now
+            report(**fields)
+    return progress
+
+
+def _run_import(file_path, job_id, params, report):
+    """执行导入任务，成功后创建表格元数据"""
+    table_name = params['table_name']
+    result = import_table_from_file(
+        file_path, table_name,
+        progress=_throttled(report),
+        column_types=params.get('column_types'),
+        infer_types=params.get('infer_types', True)
+    )
+    if not result['success']:
+        raise ImportJobError(result['message'])
+
+    report(
+        stage='completed',
+        rows_processed=result['rows_imported'],
+        elapsed=result['elapsed'],
+        rows_per_second=result['rows_per_second']
+    )
+
+    # 创建表格元数据
+    table_metadata = TableMetadata.query.filter_by(table_name=table_name).first()
+    if not table_metadata:
+        table_metadata = TableMetadata(
+            table_name=table_name,
+            display_name=table_name.replace('_', ' ').title(),
+            description=f"从文件导入的表格: {params['filename']}",
+            is_active=True
+        )
+        db.session.add(table_metadata)
+        db.session.commit()
+
+    return {
+        'message': result['message'],
+        'table_name': table_name,
+        'rows_imported': result['rows_imported'],
+        'columns': result['columns'],
+        'schema': result['schema'],
+        'engine': result['engine'],
+        'warnings': result['warnings'],
+        'elapsed': result['elapsed'],
+        'rows_per_second': result['rows_per_second'],
+        'search_index': result.get('search_index')
+    }
+
+
+def _remove_file(file_path, job_id):
+    """任务结束后删除上传的临时文件"""
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def submit_import_job(file_path, filename, table_name, owner_id, column_types=None, infer_types=True):
+    """
+    提交导入任务，任务结束后（无论成功失败）删除file_path
+
+    Args:
+        file_path: 上传文件保存的临时路径
+        filename: 上传的原始文件名
+        table_name: 目标表格名称
+        owner_id: 提交任务的用户ID
+        column_types: 按列指定的类型 {列名: 类型}
+        infer_types: 是否推断列类型
+
+    Returns:
+        dict: 任务状态
+    """
+    params = {
+        'table_name': table_name,
+        'filename': filename,
+        'column_types': column_types,
+        'infer_types': infer_types
+    }
+    try:
+        return import_jobs.submit(
+            owner_id, params,
+            partial(_run_import, file_path),
+            on_finish=partial(_remove_file, file_path)
+        )
+    except Exception:
+        _remove_file(file_path, None)
+        raise
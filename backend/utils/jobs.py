@@ -0,0 +1,260 @@
+"""
+后台任务工具
+
+耗时操作（导出、导入等）提交到本地线程池中执行，请求立即返回任务ID。
+任务状态保存为JSON文件，多个gunicorn worker之间共享，任意worker都可以查询任务状态。
+执行中的任务由所在进程定期写入心跳时间；进程退出后心跳停止，
+查询时超过JOB_STALE_SECONDS没有心跳的未完成任务标记为失败。
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from ..config import JOB_STATE_DIR, JOB_RETENTION, JOB_HEARTBEAT_INTERVAL, JOB_STALE_SECONDS
+from .cache_sync import cache_sync
+
+
+class JobManager:
+    """后台任务管理器"""
+
+    def __init__(self, kind, max_workers):
+        """
+        Args:
+            kind: 任务类型，同时作为任务状态的保存目录名
+            max_workers: 并发执行的任务数（每个worker）
+        """
+        self.kind = kind
+        self.state_dir = os.path.join(JOB_STATE_DIR, kind)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{kind}-job')
+        # update()持有锁时调用get()，get()可能再调用_mark_stale()获取同一把锁，需要可重入
+        self._lock = threading.RLock()
+        # 本进程中排队或执行中的任务，由心跳线程定期写入心跳时间
+        self._active = set()
+        self._heartbeat_thread = None
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _write(self, job):
+        """原子写入任务状态，避免其他worker读到写了一半的文件"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._state_path(job['id'])
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, path)
+
+    def get(self, job_id):
+        """
+        获取任务状态
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            dict: 任务状态，不存在时返回None
+        """
+        # 任务ID由uuid生成，拒绝其他格式，避免路径穿越
+        try:
+            uuid.UUID(job_id, version=4)
+        except (ValueError, TypeError):
+            return None
+
+        try:
+            with open(self._state_path(job_id), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if self._is_stale(job):
+            job = self._mark_stale(job_id) or job
+        return job
+
+    def _is_stale(self, job):
+        """未完成的任务是否已超过JOB_STALE_SECONDS没有心跳（所在进程已退出）"""
+        if job['status'] not in ('pending', 'running') or job['id'] in self._active:
+            return False
+        heartbeat_at = job.get('heartbeat_at') or job.get('updated_at')
+        try:
+            elapsed = (datetime.now() - datetime.fromisoformat(heartbeat_at)).total_seconds()
+        except (TypeError, ValueError):
+            return False
+        return elapsed > JOB_STALE_SECONDS
+
+    def _mark_stale(self, job_id):
+        """把心跳已停止的任务标记为失败"""
+        with self._lock:
+            try:
+                with open(self._state_path(job_id), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except FileNotFoundError:
+                return None
+            if not self._is_stale(job):
+                return job
+            print(f"{self.kind}任务 {job_id} 超过{JOB_STALE_SECONDS}秒没有心跳，标记为失败")
+            now = datetime.now().isoformat()
+            job.update(status='failed', error='执行任务的进程已退出', finished_at=now, updated_at=now)
+            self._write(job)
+            return job
+
+    def _heartbeat(self):
+        """心跳线程：定期为本进程中未完成的任务写入心跳时间"""
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            for job_id in list(self._active):
+                try:
+                    self.update(job_id, heartbeat_at=datetime.now().isoformat())
+                except Exception as e:
+                    print(f"{self.kind}任务 {job_id} 写入心跳失败: {str(e)}")
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(
+                    target=self._heartbeat, name=f'{self.kind}-job-heartbeat', daemon=True
+                )
+                self._heartbeat_thread.start()
+
+    def update(self, job_id, **fields):
+        """
+        更新任务状态
+
+        Args:
+            job_id: 任务ID
+            fields: 要更新的字段
+
+        Returns:
+            dict: 更新后的任务状态
+        """
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            job['updated_at'] = datetime.now().isoformat()
+            self._write(job)
+            return job
+
+    def create(self, owner_id, params, status='pending', **fields):
+        """
+        创建任务记录（不执行）
+
+        Args:
+            owner_id: 提交任务的用户ID
+            params: 任务参数
+            status: 初始状态
+            fields: 其他字段
+
+        Returns:
+            dict: 任务状态
+        """
+        now = datetime.now().isoformat()
+        job = {
+            'id': str(uuid.uuid4()),
+            'kind': self.kind,
+            'status': status,
+            'owner_id': owner_id,
+            'params': params,
+            'progress': {},
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'started_at': None,
+            'finished_at': None,
+            'heartbeat_at': now,
+            'worker_pid': os.getpid()
+        }
+        job.update(fields)
+        with self._lock:
+            self._write(job)
+        self._prune()
+        return job
+
+    def submit(self, owner_id, params, func, on_finish=None):
+        """
+        提交任务到线程池
+
+        Args:
+            owner_id: 提交任务的用户ID
+            params: 任务参数，会保存到任务状态中
+            func: 任务函数，签名为func(job_id, params, report)，
+                  report(**progress)用于上报进度，返回值保存为任务结果
+            on_finish: 任务结束（无论成功失败）后在任务线程中执行的清理函数，签名为on_finish(job_id)
+
+        Returns:
+            dict: 任务状态
+        """
+        job = self.create(owner_id, params)
+        app = current_app._get_current_object()
+        self._active.add(job['id'])
+        self._start_heartbeat()
+        self._executor.submit(self._run, app, job['id'], params, func, on_finish)
+        return job
+
+    def _run(self, app, job_id, params, func, on_finish):
+        """在线程池中执行任务"""
+        with app.app_context():
+            cache_sync.check()
+            self.update(job_id, status='running', started_at=datetime.now().isoformat())
+
+            def report(**progress):
+                self.update(job_id, progress=progress)
+
+            try:
+                result = func(job_id, params, report)
+                self.update(job_id, status='completed', result=result, finished_at=datetime.now().isoformat())
+            except Exception as e:
+                print(f"{self.kind}任务 {job_id} 失败: {str(e)}")
+                print(f"堆栈信息: {traceback.format_exc()}")
+                self.update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+            finally:
+                self._active.discard(job_id)
+                if on_finish is not None:
+                    try:
+                        on_finish(job_id)
+                    except Exception as e:
+                        print(f"{self.kind}任务 {job_id} 清理失败: {str(e)}")
+
+    def _prune(self):
+        """删除超过保留时间的任务状态文件"""
+        if not os.path.isdir(self.state_dir):
+            return
+        expire_before = time.time() - JOB_RETENTION
+        for name in os.listdir(self.state_dir):
+            path = os.path.join(self.state_dir, name)
+            try:
+                if os.path.getmtime(path) < expire_before:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+def serialize_job(job):
+    """
+    转换任务状态为响应格式（不包含内部字段）
+
+    Args:
+        job: 任务状态
+
+    Returns:
+        dict: 响应数据
+    """
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'params': job['params'],
+        'progress': job['progress'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    }
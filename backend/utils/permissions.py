@@ -0,0 +1,233 @@
+"""
+表格权限矩阵
+
+每个用户的表格权限保存为 {表格名称: 权限位掩码}（查看/编辑/导出各占一位），
+首次使用时一次查询加载该用户的全部权限并缓存，之后检查和列出权限都在内存中完成。
+设置、删除权限以及删除表格、用户时显式失效，并通过cache_sync通知其他worker进程清空缓存，
+权限被收回后不会在其他进程中继续生效。
+批量设置权限时按(user_id, table_name)唯一键upsert，不逐条查询。
+"""
+
+import threading
+from datetime import datetime
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import joinedload
+from ..extensions import db
+from ..config import PERMISSION_CACHE_MAX_USERS, PERMISSION_CACHE_TTL
+from ..models.user import User
+from ..models.data_share import TableAccess
+from .cache import LRUTTLCache
+from .schema_catalog import schema_catalog
+from .cache_sync import cache_sync
+
+# cache_sync中的缓存名称
+CACHE_NAME = 'permissions'
+
+# 权限位
+PERM_VIEW = 1
+PERM_EDIT = 2
+PERM_EXPORT = 4
+
+# 权限名称对应的权限位
+PERMISSION_BITS = {
+    'view': PERM_VIEW,
+    'edit': PERM_EDIT,
+    'export': PERM_EXPORT
+}
+
+
+def permission_bit(permission):
+    """
+    获取权限名称对应的权限位
+
+    Raises:
+        ValueError: 权限名称无效
+    """
+    try:
+        return PERMISSION_BITS[permission]
+    except KeyError:
+        raise ValueError(f'无效的权限: {permission}')
+
+
+def access_mask(can_view, can_edit, can_export):
+    """把三项权限合并为位掩码"""
+    return (PERM_VIEW if can_view else 0) | (PERM_EDIT if can_edit else 0) | (PERM_EXPORT if can_export else 0)
+
+
+def mask_to_dict(mask):
+    """位掩码转换为{"can_view": bool, "can_edit": bool, "can_export": bool}"""
+    return {f'can_{name}': bool(mask & bit) for name, bit in PERMISSION_BITS.items()}
+
+
+class PermissionMatrix:
+    """用户 -> {表格名称: 权限位掩码} 的缓存（每个worker进程一份）"""
+
+    def __init__(self, maxsize, ttl):
+        """
+        Args:
+            maxsize: 最多缓存的用户数
+            ttl: 有效期，单位：秒，0表示不缓存
+        """
+        self.ttl = ttl
+        self._cache = LRUTTLCache(maxsize, ttl)
+        # 缓存版本号，每次失效时递增；加载期间被失效时不写入缓存，避免缓存收回前的权限
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _load(self, user_id):
+        """一次查询加载用户的全部表格权限"""
+        rows = db.session.query(
+            TableAccess.table_name, TableAccess.can_view, TableAccess.can_edit, TableAccess.can_export
+        ).filter(TableAccess.user_id == user_id).all()
+        return {table_name: access_mask(can_view, can_edit, can_export) for table_name, can_view, can_edit, can_export in rows}
+
+    def get_user_permissions(self, user_id):
+        """
+        获取用户的表格权限
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            dict: {表格名称: 权限位掩码}，调用方不应修改
+        """
+        if self.ttl <= 0:
+            return self._load(user_id)
+        with self._lock:
+            permissions = self._cache.get(user_id)
+            version = self._version
+        if permissions is None:
+            permissions = self._load(user_id)
+            with self._lock:
+                if self._version == version:
+                    self._cache.set(user_id, permissions)
+        return permissions
+
+    def has_permission(self, user_id, table_name, permission='view'):
+        """检查用户是否拥有表格的某项权限（不含管理员判断）"""
+        return bool(self.get_user_permissions(user_id).get(table_name, 0) & permission_bit(permission))
+
+    def tables_with(self, user_id, permission='view'):
+        """获取用户拥有某项权限的表格名称列表（不含管理员判断）"""
+        bit = permission_bit(permission)
+        return sorted(table_name for table_name, mask in self.get_user_permissions(user_id).items() if mask & bit)
+
+    def invalidate(self, user_id=None, broadcast=True):
+        """
+        失效缓存，权限修改提交后调用
+
+        Args:
+            user_id: 用户ID，为None时失效所有用户（如删除表格后）
+            broadcast: 是否通知其他worker进程（其他进程只能整体清空）
+        """
+        with self._lock:
+            self._version += 1
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.delete(user_id)
+        if broadcast:
+            cache_sync.bump(CACHE_NAME)
+
+    def invalidate_users(self, user_ids):
+        """失效多个用户的缓存，只通知其他worker进程一次"""
+        for user_id in user_ids:
+            self.invalidate(user_id, broadcast=False)
+        cache_sync.bump(CACHE_NAME)
+
+
+# 表格权限矩阵
+permission_matrix = PermissionMatrix(PERMISSION_CACHE_MAX_USERS, PERMISSION_CACHE_TTL)
+cache_sync.register(CACHE_NAME, lambda: permission_matrix.invalidate(broadcast=False))
+
+
+# 每条INSERT ... ON DUPLICATE KEY UPDATE语句写入的权限记录数
+UPSERT_BATCH_SIZE = 1000
+
+
+def bulk_set_table_access(user_ids, table_names, can_view=True, can_edit=False, can_export=True):
+    """
+    批量为多个用户设置多个表格的访问权限
+
+    预先一次查询用户、一次查询information_schema确认表格存在（不使用可能过期的表结构目录），
+    再按(user_id, table_name)唯一键用INSERT ... ON DUPLICATE KEY UPDATE批量写入，
+    不存在的用户、管理员用户和不存在的表格会被跳过，并在结果中列出。
+
+    Args:
+        user_ids: 用户ID列表
+        table_names: 表格名称列表
+        can_view: 是否可查看
+        can_edit: 是否可编辑
+        can_export: 是否可导出
+
+    Returns:
+        dict: {
+            "records": 写入后的权限记录（TableAccess，已加载user），按用户ID、表格名称排序,
+            "skipped_users": [{"user_id": 用户ID, "reason": 原因}],
+            "skipped_tables": [{"table_name": 表格名称, "reason": 原因}]
+        }
+    """
+    skipped_users = []
+    valid_user_ids = []
+    for user_id in dict.fromkeys(user_ids):
+        try:
+            valid_user_ids.append(int(user_id))
+        except (TypeError, ValueError):
+            skipped_users.append({'user_id': user_id, 'reason': '无效的用户ID'})
+    valid_user_ids = list(dict.fromkeys(valid_user_ids))
+    users = {user.id: user for user in User.query.filter(User.id.in_(valid_user_ids)).all()} if valid_user_ids else {}
+    target_user_ids = []
+    for user_id in valid_user_ids:
+        user = users.get(user_id)
+        if user is None:
+            skipped_users.append({'user_id': user_id, 'reason': '用户不存在'})
+        elif user.role == 'admin':
+            skipped_users.append({'user_id': user_id, 'reason': '管理员用户的权限不能被修改'})
+        else:
+            target_user_ids.append(user_id)
+    target_user_ids.sort()
+
+    table_names = list(dict.fromkeys(table_names))
+    existing_tables = schema_catalog.find_existing_tables(table_names)
+    target_tables = [name for name in table_names if name in existing_tables]
+    skipped_tables = [
+        {'table_name': name, 'reason': '表格不存在'} for name in table_names if name not in existing_tables
+    ]
+
+    result = {'records': [], 'skipped_users': skipped_users, 'skipped_tables': skipped_tables}
+    if not target_user_ids or not target_tables:
+        return result
+
+    now = datetime.now()
+    rows = [
+        {
+            'user_id': user_id,
+            'table_name': table_name,
+            'can_view': bool(can_view),
+            'can_edit': bool(can_edit),
+            'can_export': bool(can_export),
+            'created_at': now,
+            'updated_at': now
+        }
+        for user_id in target_user_ids
+        for table_name in target_tables
+    ]
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = mysql_insert(TableAccess.__table__).values(rows[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_duplicate_key_update(
+            can_view=stmt.inserted.can_view,
+            can_edit=stmt.inserted.can_edit,
+            can_export=stmt.inserted.can_export,
+            updated_at=stmt.inserted.updated_at
+        )
+        db.session.execute(stmt)
+    db.session.commit()
+
+    permission_matrix.invalidate_users(target_user_ids)
+
+    # 读取写入后的记录（用户和表格的组合正好是本次写入的全部记录）
+    result['records'] = TableAccess.query.options(joinedload(TableAccess.user)).filter(
+        TableAccess.user_id.in_(target_user_ids),
+        TableAccess.table_name.in_(target_tables)
+    ).order_by(TableAccess.user_id, TableAccess.table_name).all()
+    return result
@@ -0,0 +1,72 @@
+"""
+SQL查询计数
+
+统计一段代码（或一个接口）执行的SQL语句数，用于发现循环中逐条查询（N+1）的问题。
+只统计当前线程执行的语句，后台任务线程和其他请求的查询不计入。
+
+用于测试（见tests/test_file_listing.py）：
+    with assert_max_queries(1):
+        files, next_cursor = list_files(query)
+"""
+
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryCounter:
+    """记录执行的SQL语句"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def report(self):
+        """格式化执行的语句，用于错误信息"""
+        return '\n'.join(f'{n}. {statement}' for n, statement in enumerate(self.statements, 1))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, 'counters', ()):
+        counter.statements.append(' '.join(statement.split()))
+
+
+@contextmanager
+def count_queries():
+    """
+    统计with块中当前线程执行的SQL语句
+
+    Yields:
+        QueryCounter: 计数器，with块结束后count为语句数
+    """
+    counter = QueryCounter()
+    counters = getattr(_local, 'counters', None)
+    if counters is None:
+        counters = _local.counters = []
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+@contextmanager
+def assert_max_queries(max_queries):
+    """
+    断言with块中执行的SQL语句不超过max_queries条
+
+    Raises:
+        AssertionError: 语句数超出，错误信息中列出所有语句
+    """
+    with count_queries() as counter:
+        yield counter
+    if counter.count > max_queries:
+        raise AssertionError(f'执行了{counter.count}条SQL语句，超过上限{max_queries}条:\n{counter.report()}')
+
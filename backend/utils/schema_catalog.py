@@ -0,0 +1,256 @@
+"""
+数据共享数据库的表结构目录缓存
+
+一次性从information_schema加载所有表的列信息和索引信息，之后的表格存在性检查、
+列信息查询都直接查字典。目录中没有的表格单独重新查询一次（其他进程可能刚创建），
+确认不存在的结果只保留SCHEMA_CATALOG_MISS_TTL秒。
+建表、导入、删表时显式失效对应表格，并通过cache_sync通知其他worker进程整体重新加载；
+库外执行的DDL依靠TTL过期后整体重新加载。
+"""
+
+import time
+import threading
+from sqlalchemy import text, bindparam
+from ..extensions import db
+from ..config import DATASHARE_DB_CONFIG, DATASHARE_DB_BIND, SCHEMA_CATALOG_TTL, SCHEMA_CATALOG_MISS_TTL
+from .db_pool import connect
+from .cache_sync import cache_sync
+
+# cache_sync中的缓存名称
+CACHE_NAME = 'schema_catalog'
+
+
+class SchemaCatalog:
+    """表结构目录"""
+
+    def __init__(self, bind_key, schema_name, ttl, miss_ttl):
+        """
+        Args:
+            bind_key: Flask-SQLAlchemy绑定名称
+            schema_name: 数据库名称
+            ttl: 缓存有效期，单位：秒
+            miss_ttl: 确认表格不存在的结果保留的时间，单位：秒
+        """
+        self.bind_key = bind_key
+        self.schema_name = schema_name
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._dirty = set()
+        self._missing = {}
+        self._loaded_at = None
+
+    def _fetch(self, table_name=None):
+        """
+        从information_schema读取列信息和索引信息
+
+        Args:
+            table_name: 表格名称，默认为None（读取所有表格）
+
+        Returns:
+            dict: {表格名称: 表结构}
+        """
+        query = """
+            SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE,
+                   c.COLUMN_KEY, c.COLUMN_DEFAULT, c.EXTRA
+            FROM information_schema.COLUMNS c
+            JOIN information_schema.TABLES t
+              ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+            WHERE c.TABLE_SCHEMA = :schema AND t.TABLE_TYPE = 'BASE TABLE'
+        """
+        params = {'schema': self.schema_name}
+        if table_name is not None:
+            query += " AND c.TABLE_NAME = :table_name"
+            params['table_name'] = table_name
+        query += " ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION"
+
+        index_query = """
+            SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME, INDEX_TYPE, SUB_PART
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = :schema
+        """
+        if table_name is not None:
+            index_query += " AND TABLE_NAME = :table_name"
+        index_query += " ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+
+        engine = db.engines[self.bind_key]
+        connection = connect(engine)
+        try:
+            rows = connection.execute(text(query), params).fetchall()
+            index_rows = connection.execute(text(index_query), params).fetchall()
+        finally:
+            connection.close()
+
+        tables = {}
+        for row in rows:
+            table = tables.setdefault(row[0], {'columns': [], 'column_map': {}, 'primary_key': [], 'indexes': {}})
+            column = {
+                'name': row[1],
+                'type': row[2],
+                'null': row[3],
+                'key': row[4],
+                'default': row[5],
+                'extra': row[6]
+            }
+            table['columns'].append(column)
+            table['column_map'][row[1]] = column
+            if row[4] == 'PRI':
+                table['primary_key'].append(row[1])
+
+        for row in index_rows:
+            table = tables.get(row[0])
+            if table is None:
+                continue
+            index = table['indexes'].setdefault(row[1], {
+                'name': row[1],
+                'columns': [],
+                'unique': not row[2],
+                'type': row[4]
+            })
+            index['columns'].append({'name': row[3], 'length': row[5]})
+        return tables
+
+    def _ensure_fresh(self):
+        """确保缓存已加载且未过期，并刷新被失效的表格"""
+        with self._lock:
+            expired = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+            if expired:
+                self._tables = self._fetch()
+                self._dirty.clear()
+                self._missing.clear()
+                self._loaded_at = time.monotonic()
+            elif self._dirty:
+                for table_name in list(self._dirty):
+                    fetched = self._fetch(table_name)
+                    if table_name in fetched:
+                        self._tables[table_name] = fetched[table_name]
+                    else:
+                        self._tables.pop(table_name, None)
+                    self._dirty.discard(table_name)
+
+    def _get(self, table_name):
+        self._ensure_fresh()
+        with self._lock:
+            table = self._tables.get(table_name)
+            if table is not None:
+                return table
+            # 目录中没有的表格可能刚由其他进程创建，单独查询一次，不存在的结果短时间内不再查询
+            missed_at = self._missing.get(table_name)
+            if missed_at is not None and time.monotonic() - missed_at < self.miss_ttl:
+                return None
+            table = self._fetch(table_name).get(table_name)
+            if table is None:
+                self._missing[table_name] = time.monotonic()
+            else:
+                self._tables[table_name] = table
+                self._missing.pop(table_name, None)
+            return table
+
+    def invalidate(self, table_name=None, broadcast=True):
+        """
+        失效缓存
+
+        Args:
+            table_name: 表格名称，默认为None（整体失效，下次访问时重新加载）
+            broadcast: 是否通知其他worker进程（其他进程整体重新加载）
+        """
+        with self._lock:
+            if table_name is None:
+                self._loaded_at = None
+                self._dirty.clear()
+            else:
+                self._tables.pop(table_name, None)
+                self._missing.pop(table_name, None)
+                self._dirty.add(table_name)
+        if broadcast:
+            cache_sync.bump(CACHE_NAME)
+
+    def table_exists(self, table_name):
+        """检查表格是否存在"""
+        return self._get(table_name) is not None
+
+    def find_existing_tables(self, table_names):
+        """
+        直接查询information_schema（不使用缓存），返回其中实际存在的表格
+
+        用于写入引用表格名称的记录前校验，避免使用过期的目录
+
+        Args:
+            table_names: 表格名称列表
+
+        Returns:
+            set: 存在的表格名称
+        """
+        table_names = list(dict.fromkeys(table_names))
+        if not table_names:
+            return set()
+        query = text("""
+            SELECT TABLE_NAME FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = :schema AND TABLE_TYPE = 'BASE TABLE' AND TABLE_NAME IN :table_names
+        """).bindparams(bindparam('table_names', expanding=True))
+        connection = connect(db.engines[self.bind_key])
+        try:
+            rows = connection.execute(query, {'schema': self.schema_name, 'table_names': table_names}).fetchall()
+        finally:
+            connection.close()
+        return {row[0] for row in rows}
+
+    def get_table_names(self):
+        """获取所有表格名称"""
+        self._ensure_fresh()
+        with self._lock:
+            return sorted(self._tables.keys())
+
+    def get_columns(self, table_name):
+        """
+        获取表格列信息
+
+        Returns:
+            list: 列信息列表（格式与DESCRIBE一致），表格不存在时返回None
+        """
+        table = self._get(table_name)
+        if table is None:
+            return None
+        return [dict(column) for column in table['columns']]
+
+    def get_column_names(self, table_name):
+        """获取表格列名列表，表格不存在时返回None"""
+        table = self._get(table_name)
+        if table is None:
+            return None
+        return [column['name'] for column in table['columns']]
+
+    def get_column(self, table_name, column_name):
+        """获取单个列的信息，不存在时返回None"""
+        table = self._get(table_name)
+        if table is None:
+            return None
+        return table['column_map'].get(column_name)
+
+    def get_indexes(self, table_name):
+        """
+        获取表格索引信息
+
+        Returns:
+            list: 索引信息列表，表格不存在时返回None
+        """
+        table = self._get(table_name)
+        if table is None:
+            return None
+        return [
+            {**index, 'columns': [dict(column) for column in index['columns']]}
+            for index in table['indexes'].values()
+        ]
+
+    def get_primary_key(self, table_name):
+        """获取表格主键列名列表，表格不存在时返回None"""
+        table = self._get(table_name)
+        if table is None:
+            return None
+        return list(table['primary_key'])
+
+
+# 数据共享数据库的表结构目录（每个worker进程一份）
+schema_catalog = SchemaCatalog(DATASHARE_DB_BIND, DATASHARE_DB_CONFIG['database'], SCHEMA_CATALOG_TTL, SCHEMA_CATALOG_MISS_TTL)
+cache_sync.register(CACHE_NAME, lambda: schema_catalog.invalidate(broadcast=False))
@@ -0,0 +1,344 @@
+"""
+导入数据的列类型推断
+
+导入前对文件做一次流式扫描，按每一列实际出现的值选择紧凑的MySQL类型
+（INT/BIGINT、DECIMAL、DATE/DATETIME、按长度确定的VARCHAR、长文本使用TEXT），
+代替所有列都使用VARCHAR(255)。导入请求可以按列覆盖推断结果。
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, date
+from ..config import IMPORT_VARCHAR_MAX_LENGTH
+
+# 整数：不允许前导零（如编号"007"需按字符串保存）
+INT_PATTERN = re.compile(r'^[+-]?(0|[1-9]\d*)$')
+# 小数：整数部分不允许前导零
+DECIMAL_PATTERN = re.compile(r'^[+-]?(0|[1-9]\d*)\.(\d+)$')
+# 日期：年-月-日或年/月/日
+DATE_PATTERN = re.compile(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$')
+# 日期时间：日期后跟空格或T分隔的时分秒，秒和小数秒可选
+DATETIME_PATTERN = re.compile(
+    r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})[ T](\d{1,2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?$'
+)
+
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+BIGINT_MIN, BIGINT_MAX = -2 ** 63, 2 ** 63 - 1
+# DECIMAL的最大精度和最大小数位数
+DECIMAL_MAX_PRECISION = 65
+DECIMAL_MAX_SCALE = 30
+
+# VARCHAR长度按以下档位向上取整，给之后的编辑留出余量
+VARCHAR_LENGTH_STEPS = (16, 32, 64, 128, 255, 512, 1024, 2048, 4096, 8192, 16383)
+# 没有任何值的列使用的类型
+DEFAULT_COLUMN_TYPE = 'VARCHAR(255)'
+
+# InnoDB单行最大字节数（所有VARCHAR列合计，TEXT列只占用少量行内空间），留出余量
+MAX_ROW_BYTES = 65000
+# utf8mb4每个字符最多4字节
+BYTES_PER_CHAR = 4
+
+# 允许在导入请求中指定的列类型
+COLUMN_TYPE_PATTERN = re.compile(
+    r'^(?:'
+    r'(?:TINYINT|SMALLINT|MEDIUMINT|INT|BIGINT)(?: UNSIGNED)?'
+    r'|DECIMAL\(\d{1,2}(?:,\d{1,2})?\)'
+    r'|FLOAT|DOUBLE|DATE|TIME|YEAR|JSON'
+    r'|DATETIME(?:\([0-6]\))?'
+    r'|(?:VARCHAR|CHAR)\(\d{1,5}\)'
+    r'|TINYTEXT|TEXT|MEDIUMTEXT|LONGTEXT'
+    r')$'
+)
+
+
+class ColumnProfile:
+    """单列的值特征统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self.non_null = 0
+        self.max_length = 0
+        self.is_int = True
+        self.int_min = None
+        self.int_max = None
+        self.is_decimal = True
+        self.int_digits = 1
+        self.scale = 0
+        self.is_date = True
+        self.is_datetime = True
+        self.has_fraction_seconds = False
+
+    def _observe_int(self, number):
+        self.int_min = number if self.int_min is None else min(self.int_min, number)
+        self.int_max = number if self.int_max is None else max(self.int_max, number)
+        self.int_digits = max(self.int_digits, len(str(abs(number))))
+
+    def _observe_decimal(self, int_part, fraction):
+        self.int_digits = max(self.int_digits, len(int_part.lstrip('+-')))
+        self.scale = max(self.scale, len(fraction))
+
+    def _observe_date_parts(self, year, month, day):
+        """校验日期是否有效（MySQL DATE的范围为1000-9999年）"""
+        try:
+            date(int(year), int(month), int(day))
+        except ValueError:
+            return False
+        return 1000 <= int(year) <= 9999
+
+    def _observe_string(self, value):
+        if self.is_int or self.is_decimal:
+            if INT_PATTERN.match(value):
+                self.is_date = self.is_datetime = False
+                if self.is_int:
+                    self._observe_int(int(value))
+                else:
+                    self._observe_decimal(value, '')
+                return
+            self.is_int = False
+            match = DECIMAL_PATTERN.match(value) if self.is_decimal else None
+            if match:
+                self.is_date = self.is_datetime = False
+                self._observe_decimal(match.group(1), match.group(2))
+                return
+            self.is_decimal = False
+
+        if self.is_date or self.is_datetime:
+            match = DATE_PATTERN.match(value)
+            if match:
+                if not self._observe_date_parts(*match.groups()):
+                    self.is_date = self.is_datetime = False
+                return
+            self.is_date = False
+            match = DATETIME_PATTERN.match(value) if self.is_datetime else None
+            if match:
+                year, month, day, hour, minute, second, fraction = match.groups()
+                valid = (
+                    self._observe_date_parts(year, month, day)
+                    and int(hour) < 24 and int(minute) < 60 and int(second or 0) < 60
+                )
+                if not valid:
+                    self.is_datetime = False
+                elif fraction:
+                    self.has_fraction_seconds = True
+                return
+            self.is_datetime = False
+
+    def observe(self, value):
+        """
+        统计一个值
+
+        Args:
+            value: 单元格的值（CSV中为字符串，xlsx中可能为数字、日期等）
+        """
+        if value is None:
+            return
+        self.non_null += 1
+
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+
+        if isinstance(value, int):
+            self.max_length = max(self.max_length, len(str(value)))
+            self.is_date = self.is_datetime = False
+            if self.is_int:
+                self._observe_int(value)
+            elif self.is_decimal:
+                self._observe_decimal(str(value), '')
+            return
+
+        if isinstance(value, float):
+            text_value = str(value)
+            self.max_length = max(self.max_length, len(text_value))
+            self.is_int = self.is_date = self.is_datetime = False
+            if self.is_decimal:
+                try:
+                    sign, digits, exponent = Decimal(text_value).as_tuple()
+                except InvalidOperation:
+                    self.is_decimal = False
+                    return
+                if not isinstance(exponent, int):
+                    # NaN或无穷大
+                    self.is_decimal = False
+                    return
+                scale = max(-exponent, 0)
+                self.int_digits = max(self.int_digits, len(digits) - scale, 1)
+                self.scale = max(self.scale, scale)
+            return
+
+        if isinstance(value, datetime):
+            self.max_length = max(self.max_length, 19)
+            self.is_int = self.is_decimal = False
+            if value.microsecond:
+                self.has_fraction_seconds = True
+            # Excel中的日期读出来是0点的datetime
+            if value.hour or value.minute or value.second or value.microsecond:
+                self.is_date = False
+            return
+
+        if isinstance(value, date):
+            self.max_length = max(self.max_length, 10)
+            self.is_int = self.is_decimal = False
+            return
+
+        value = str(value)
+        self.max_length = max(self.max_length, len(value))
+        self._observe_string(value)
+
+    def column_type(self):
+        """
+        根据统计结果选择列类型
+
+        Returns:
+            str: MySQL列类型
+        """
+        if self.non_null == 0:
+            return DEFAULT_COLUMN_TYPE
+
+        if self.is_int:
+            if self.int_min >= INT_MIN and self.int_max <= INT_MAX:
+                return 'INT'
+            if self.int_min >= BIGINT_MIN and self.int_max <= BIGINT_MAX:
+                return 'BIGINT'
+            if self.int_digits <= DECIMAL_MAX_PRECISION:
+                return f'DECIMAL({self.int_digits},0)'
+        elif self.is_decimal:
+            precision = self.int_digits + self.scale
+            if precision <= DECIMAL_MAX_PRECISION and self.scale <= DECIMAL_MAX_SCALE:
+                return f'DECIMAL({precision},{self.scale})'
+        elif self.is_date:
+            return 'DATE'
+        elif self.is_datetime:
+            return 'DATETIME(6)' if self.has_fraction_seconds else 'DATETIME'
+
+        return text_column_type(self.max_length)
+
+
+def text_column_type(max_length):
+    """
+    按最大字符数选择文本类型
+
+    Args:
+        max_length: 最大字符数
+
+    Returns:
+        str: VARCHAR(n)、TEXT、MEDIUMTEXT或LONGTEXT
+    """
+    if max_length <= IMPORT_VARCHAR_MAX_LENGTH:
+        for step in VARCHAR_LENGTH_STEPS:
+            if max_length <= step:
+                return f'VARCHAR({min(step, IMPORT_VARCHAR_MAX_LENGTH)})'
+    if max_length * BYTES_PER_CHAR <= 65535:
+        return 'TEXT'
+    if max_length * BYTES_PER_CHAR <= 16777215:
+        return 'MEDIUMTEXT'
+    return 'LONGTEXT'
+
+
+def _varchar_length(column_type):
+    match = re.match(r'^(?:VARCHAR|CHAR)\((\d+)\)$', column_type)
+    return int(match.group(1)) if match else 0
+
+
+def fit_row_size(schema):
+    """
+    保证所有VARCHAR列合计不超过InnoDB的单行大小限制，超出时把最长的VARCHAR列改为TEXT
+
+    Args:
+        schema: 列定义列表 [{"name": 列名, "type": 类型, "source": 来源}]，就地修改
+
+    Returns:
+        list: 列定义列表
+    """
+    def row_bytes():
+        return sum(_varchar_length(col['type']) * BYTES_PER_CHAR + 2 for col in schema)
+
+    while row_bytes() > MAX_ROW_BYTES:
+        candidates = [col for col in schema if col['source'] != 'override' and _varchar_length(col['type'])]
+        if not candidates:
+            break
+        widest = max(candidates, key=lambda col: _varchar_length(col['type']))
+        widest['type'] = 'TEXT'
+        widest['source'] = 'row_size'
+    return schema
+
+
+def infer_schema(columns, chunks):
+    """
+    扫描数据推断每一列的类型
+
+    Args:
+        columns: 列名列表
+        chunks: 数据块迭代器，每块为(列名列表, 行元组列表)
+
+    Returns:
+        list: 列定义列表 [{"name": 列名, "type": 类型, "source": "inferred"}]
+    """
+    profiles = [ColumnProfile(name) for name in columns]
+    rows_scanned = 0
+    for _, rows in chunks:
+        for row in rows:
+            for profile, value in zip(profiles, row):
+                profile.observe(value)
+        rows_scanned += len(rows)
+
+    schema = [{'name': profile.name, 'type': profile.column_type(), 'source': 'inferred'} for profile in profiles]
+    print(f"类型推断扫描 {rows_scanned} 行: {', '.join(col['name'] + ' ' + col['type'] for col in schema)}")
+    return fit_row_size(schema)
+
+
+def default_schema(columns):
+    """不推断类型时的列定义，所有列使用VARCHAR(255)"""
+    return [{'name': name, 'type': DEFAULT_COLUMN_TYPE, 'source': 'default'} for name in columns]
+
+
+def normalize_column_type(column_type):
+    """
+    校验并规范化导入请求中指定的列类型
+
+    Args:
+        column_type: 列类型，如"decimal(10, 2)"
+
+    Returns:
+        str: 规范化后的列类型，如"DECIMAL(10,2)"
+
+    Raises:
+        ValueError: 不支持的列类型
+    """
+    if not isinstance(column_type, str):
+        raise ValueError(f'不支持的列类型: {column_type}')
+    normalized = re.sub(r'\s*([(),])\s*', r'\1', ' '.join(column_type.upper().split()))
+    if not COLUMN_TYPE_PATTERN.match(normalized):
+        raise ValueError(f'不支持的列类型: {column_type}')
+    return normalized
+
+
+def apply_column_overrides(schema, column_types):
+    """
+    使用导入请求中指定的列类型覆盖推断结果
+
+    Args:
+        schema: 列定义列表，就地修改
+        column_types: {列名: 列类型}
+
+    Returns:
+        list: 列定义列表
+
+    Raises:
+        ValueError: 列不存在或列类型不支持
+    """
+    if not column_types:
+        return schema
+    if not isinstance(column_types, dict):
+        raise ValueError('column_types必须是{列名: 列类型}格式')
+
+    by_name = {col['name']: col for col in schema}
+    unknown = [name for name in column_types if name not in by_name]
+    if unknown:
+        raise ValueError(f"指定类型的列不存在: {', '.join(unknown)}")
+
+    for name, column_type in column_types.items():
+        by_name[name]['type'] = normalize_column_type(column_type)
+        by_name[name]['source'] = 'override'
+    return schema
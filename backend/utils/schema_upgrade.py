@@ -0,0 +1,100 @@
+"""
+系统库表结构升级
+
+系统不使用迁移工具，db.create_all()只创建不存在的表，不会修改已有的表。
+模型中新增的索引和列在启动时按名称检查，不存在时补建。
+"""
+
+from sqlalchemy import text
+from ..extensions import db
+from ..models.data_share import TABLE_ACCESS_UNIQUE_KEY
+from ..models.file import FILE_LIST_INDEXES, FILE_BLOB_FOREIGN_KEY
+
+
+def index_exists(table_name, index_name):
+    """检查系统库中的表格是否已有该索引"""
+    return bool(db.session.execute(text("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND INDEX_NAME = :index_name
+    """), {'table_name': table_name, 'index_name': index_name}).scalar())
+
+
+def column_exists(table_name, column_name):
+    """检查系统库中的表格是否已有该列"""
+    return bool(db.session.execute(text("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND COLUMN_NAME = :column_name
+    """), {'table_name': table_name, 'column_name': column_name}).scalar())
+
+
+def ensure_index(table_name, index_name, columns, unique=False):
+    """
+    索引不存在时创建
+
+    Args:
+        table_name: 表格名称
+        index_name: 索引名称
+        columns: 索引列列表
+        unique: 是否为唯一索引
+
+    Returns:
+        bool: 是否新建了索引
+    """
+    if index_exists(table_name, index_name):
+        return False
+    column_list = ', '.join(f'`{column}`' for column in columns)
+    kind = 'UNIQUE KEY' if unique else 'INDEX'
+    db.session.execute(text(f"ALTER TABLE `{table_name}` ADD {kind} `{index_name}` ({column_list})"))
+    db.session.commit()
+    print(f"{table_name}表已添加索引{index_name}({', '.join(columns)})")
+    return True
+
+
+def ensure_table_access_unique_key():
+    """
+    确保table_access表有(user_id, table_name)唯一键
+
+    补建前删除重复的权限记录，每个用户和表格只保留最新的一条。
+    """
+    if index_exists('table_access', TABLE_ACCESS_UNIQUE_KEY):
+        return
+
+    removed = db.session.execute(text("""
+        DELETE older FROM table_access AS older
+        JOIN table_access AS newer
+          ON newer.user_id = older.user_id AND newer.table_name = older.table_name AND newer.id > older.id
+    """)).rowcount
+    db.session.commit()
+    if removed:
+        print(f"删除重复的权限记录 {removed} 条")
+    ensure_index('table_access', TABLE_ACCESS_UNIQUE_KEY, ['user_id', 'table_name'], unique=True)
+
+
+def ensure_file_indexes():
+    """确保files表有文件列表分页查询使用的索引"""
+    for index_name, columns in FILE_LIST_INDEXES.items():
+        ensure_index('files', index_name, columns)
+
+
+def ensure_file_blob_column():
+    """
+    确保files表有引用文件内容的blob_id列
+
+    已有的文件记录blob_id为空，复制时再登记内容（见utils/file.py的register_legacy_file）。
+    """
+    if column_exists('files', 'blob_id'):
+        return
+    db.session.execute(text(f"""
+        ALTER TABLE `files`
+        ADD COLUMN `blob_id` INT NULL,
+        ADD CONSTRAINT `{FILE_BLOB_FOREIGN_KEY}` FOREIGN KEY (`blob_id`) REFERENCES `file_blobs` (`id`)
+    """))
+    db.session.commit()
+    print("files表已添加列blob_id")
+
+
+def upgrade_system_schema():
+    """为旧版本创建的系统库表格补建索引和列，在db.create_all()之后调用"""
+    ensure_table_access_unique_key()
+    ensure_file_indexes()
+    ensure_file_blob_column()
@@ -0,0 +1,207 @@
+"""
+数据共享表格全文搜索索引
+
+为共享表格的文本列建立MySQL FULLTEXT索引（ngram分词，支持中文），
+搜索时使用MATCH ... AGAINST走索引，代替对每一列的LIKE '%q%'全表扫描。
+索引由InnoDB在行数据写入时自动维护。索引只包含文本列，数字、日期等列仍由调用方用LIKE匹配。
+
+InnoDB默认的停用词表（a、about、is、i等）在ngram分词下会丢弃所有包含停用词的分词，
+如ngram_token_size=2时含有字母a或i的英文单词搜索不到，因此建立索引时关闭停用词。
+"""
+
+import re
+from sqlalchemy import text
+from ..extensions import db
+from ..config import DATASHARE_DB_BIND, SEARCH_NGRAM_TOKEN_SIZE
+from .db_pool import connect
+from .schema_catalog import schema_catalog
+
+# 全文搜索索引名称
+SEARCH_INDEX_NAME = 'ft_search'
+
+# FULLTEXT索引只支持文本类型的列
+TEXT_COLUMN_TYPES = ('char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext')
+
+# 单个索引最多包含的列数
+MAX_INDEX_COLUMNS = 16
+
+# 数字和日期时间类型，显示为字符串时只包含NUMERIC_TEMPORAL_CHARS中的字符
+NUMERIC_TEMPORAL_TYPES = (
+    'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'decimal', 'numeric',
+    'float', 'double', 'real', 'bit', 'date', 'datetime', 'timestamp', 'time', 'year'
+)
+NUMERIC_TEMPORAL_CHARS = re.compile(r'^[0-9+\-.:/ eET]+$')
+
+# MySQL错误：找不到与列匹配的FULLTEXT索引（索引已被删除）
+FULLTEXT_INDEX_MISSING_ERROR = 1191
+
+
+def _base_type(column):
+    """获取列的基础类型，如varchar(255) -> varchar"""
+    column_type = column['type']
+    if isinstance(column_type, bytes):
+        column_type = column_type.decode('utf-8')
+    match = re.match(r'^\s*([a-z]+)', column_type.lower())
+    return match.group(1) if match else ''
+
+
+def _is_text_column(column):
+    """判断列是否为文本类型"""
+    return _base_type(column) in TEXT_COLUMN_TYPES
+
+
+def may_match_column(column, search_query):
+    """
+    关键词是否可能出现在该列的值中
+
+    数字、日期时间列的值只包含数字和少量符号，关键词含有其他字符时不可能匹配，
+    这样的列不必加入LIKE条件（避免仅为这些列扫描全表）。
+    """
+    if _base_type(column) in NUMERIC_TEMPORAL_TYPES:
+        return bool(NUMERIC_TEMPORAL_CHARS.match(search_query))
+    return True
+
+
+def is_missing_fulltext_error(error):
+    """判断数据库错误是否为全文索引不存在（其他进程已删除索引，本进程的表结构目录尚未更新）"""
+    args = getattr(getattr(error, 'orig', None), 'args', None)
+    return bool(args) and args[0] == FULLTEXT_INDEX_MISSING_ERROR
+
+
+def get_searchable_columns(table_name):
+    """
+    获取可以建立全文索引的列（非主键的文本列）
+
+    Args:
+        table_name: 表格名称
+
+    Returns:
+        list: 列名列表
+    """
+    columns = schema_catalog.get_columns(table_name) or []
+    return [col['name'] for col in columns if col['key'] != 'PRI' and _is_text_column(col)]
+
+
+def get_search_index_columns(table_name):
+    """
+    获取表格全文搜索索引包含的列
+
+    Args:
+        table_name: 表格名称
+
+    Returns:
+        list: 列名列表，没有全文搜索索引时返回None
+    """
+    for index in schema_catalog.get_indexes(table_name) or []:
+        if index['name'] == SEARCH_INDEX_NAME and index['type'] == 'FULLTEXT':
+            return [column['name'] for column in index['columns']]
+    return None
+
+
+def build_fulltext_condition(table_name, search_query, params):
+    """
+    构建全文搜索条件
+
+    关键词短于ngram分词长度时无法使用全文索引，此时返回None，由调用方回退到LIKE搜索。
+    条件只覆盖索引中的文本列，其余列由调用方用LIKE补充。
+
+    Args:
+        table_name: 表格名称
+        search_query: 搜索关键词
+        params: 查询参数字典，搜索参数会写入其中
+
+    Returns:
+        str: WHERE子句，无法使用全文索引时返回None
+    """
+    index_columns = get_search_index_columns(table_name)
+    if not index_columns:
+        return None
+
+    # BOOLEAN MODE下双引号用于短语搜索，关键词中的双引号无法转义，替换为空格
+    phrase = ' '.join(search_query.replace('"', ' ').split())
+    if len(phrase) < SEARCH_NGRAM_TOKEN_SIZE:
+        return None
+
+    # 作为短语搜索，ngram分词后要求各分词相邻，效果接近子串匹配
+    params['search_phrase'] = f'"{phrase}"'
+    columns = ', '.join([f'`{col}`' for col in index_columns])
+    return f"MATCH({columns}) AGAINST(:search_phrase IN BOOLEAN MODE)"
+
+
+def create_search_index(table_name):
+    """
+    为表格创建全文搜索索引，已存在时按当前的文本列重建
+
+    Args:
+        table_name: 表格名称
+
+    Returns:
+        dict: 创建结果
+    """
+    columns = get_searchable_columns(table_name)
+    if not columns:
+        return {'success': False, 'message': '表格没有可建立全文索引的文本列'}
+    if len(columns) > MAX_INDEX_COLUMNS:
+        return {'success': False, 'message': f'文本列超过{MAX_INDEX_COLUMNS}列，无法建立全文索引'}
+
+    statements = []
+    if get_search_index_columns(table_name) is not None:
+        statements.append(f"ALTER TABLE `{table_name}` DROP INDEX `{SEARCH_INDEX_NAME}`")
+    column_list = ', '.join([f'`{col}`' for col in columns])
+    statements.append(f"ALTER TABLE `{table_name}` ADD FULLTEXT INDEX `{SEARCH_INDEX_NAME}` ({column_list}) WITH PARSER ngram")
+
+    engine = db.engines[DATASHARE_DB_BIND]
+    connection = connect(engine)
+    stopword_disabled = False
+    try:
+        # 停用词设置在建立索引时读取并保存在索引中，之后写入的数据也按该设置分词
+        connection.execute(text("SET SESSION innodb_ft_enable_stopword = 0"))
+        stopword_disabled = True
+        for statement in statements:
+            connection.execute(text(statement))
+        connection.commit()
+        return {
+            'success': True,
+            'message': f'表格{table_name}全文搜索索引创建成功',
+            'columns': columns
+        }
+    except Exception as e:
+        connection.rollback()
+        return {'success': False, 'message': f'创建全文搜索索引失败: {str(e)}'}
+    finally:
+        # 连接会归还到连接池，恢复会话变量，避免影响之后使用该连接建立的索引
+        if stopword_disabled:
+            try:
+                connection.execute(text("SET SESSION innodb_ft_enable_stopword = DEFAULT"))
+            except Exception as e:
+                print(f"恢复innodb_ft_enable_stopword失败，丢弃该连接: {str(e)}")
+                connection.invalidate()
+        connection.close()
+        schema_catalog.invalidate(table_name)
+
+
+def drop_search_index(table_name):
+    """
+    删除表格的全文搜索索引
+
+    Args:
+        table_name: 表格名称
+
+    Returns:
+        dict: 删除结果
+    """
+    if get_search_index_columns(table_name) is None:
+        return {'success': False, 'message': '表格没有全文搜索索引'}
+
+    engine = db.engines[DATASHARE_DB_BIND]
+    connection = connect(engine)
+    try:
+        connection.execute(text(f"ALTER TABLE `{table_name}` DROP INDEX `{SEARCH_INDEX_NAME}`"))
+        connection.commit()
+        return {'success': True, 'message': f'表格{table_name}全文搜索索引删除成功'}
+    except Exception as e:
+        connection.rollback()
+        return {'success': False, 'message': f'删除全文搜索索引失败: {str(e)}'}
+    finally:
+        connection.close()
+        schema_catalog.invalidate(table_name)
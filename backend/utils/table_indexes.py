@@ -0,0 +1,358 @@
+"""
+数据共享表格二级索引管理
+
+提供二级索引（含联合索引）的查看、创建和删除，MySQL支持时使用在线DDL
+（ALGORITHM=INPLACE, LOCK=NONE），建索引期间表格仍可读写。
+同时统计表格数据接口实际使用的排序列和筛选列，据此给出建索引建议。
+"""
+
+import re
+import threading
+from collections import Counter
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from ..extensions import db
+from ..config import DATASHARE_DB_BIND, INDEX_PREFIX_LENGTH, INDEX_ADVISOR_MIN_REQUESTS
+from .db_pool import connect
+from .schema_catalog import schema_catalog
+from .search_index import SEARCH_INDEX_NAME
+
+# 索引名称只允许字母、数字和下划线
+INDEX_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_]{1,64}$')
+
+# 单个索引最多包含的列数
+MAX_INDEX_COLUMNS = 16
+
+# 建索引时必须指定前缀长度的列类型
+PREFIX_REQUIRED_TYPES = ('tinytext', 'text', 'mediumtext', 'longtext', 'tinyblob', 'blob', 'mediumblob', 'longblob')
+
+# 不能建立普通索引的列类型
+UNINDEXABLE_TYPES = ('json', 'geometry', 'point', 'linestring', 'polygon')
+
+# 不支持在线DDL时的错误码（ALGORITHM/LOCK不支持）
+ONLINE_DDL_UNSUPPORTED_ERRORS = (1845, 1846)
+
+
+def _base_type(column):
+    """获取列的基础类型，如varchar(255) -> varchar"""
+    column_type = column['type']
+    if isinstance(column_type, bytes):
+        column_type = column_type.decode('utf-8')
+    match = re.match(r'^\s*([a-z]+)', column_type.lower())
+    return match.group(1) if match else ''
+
+
+def list_indexes(table_name):
+    """
+    获取表格的索引列表
+
+    Args:
+        table_name: 表格名称
+
+    Returns:
+        list: 索引信息列表，表格不存在时返回None
+    """
+    indexes = schema_catalog.get_indexes(table_name)
+    if indexes is None:
+        return None
+    for index in indexes:
+        index['primary'] = index['name'] == 'PRIMARY'
+        index['search_index'] = index['name'] == SEARCH_INDEX_NAME and index['type'] == 'FULLTEXT'
+    return sorted(indexes, key=lambda index: (not index['primary'], index['name']))
+
+
+def _normalize_index_columns(table_name, columns):
+    """
+    校验索引列，TEXT/BLOB列补充默认前缀长度
+
+    Args:
+        table_name: 表格名称
+        columns: 列名，或{"name": 列名, "length": 前缀长度}
+
+    Returns:
+        list: [{"name": 列名, "length": 前缀长度或None}]
+
+    Raises:
+        ValueError: 列不存在或不能建立索引
+    """
+    if not isinstance(columns, list) or not columns:
+        raise ValueError('缺少索引列')
+    if len(columns) > MAX_INDEX_COLUMNS:
+        raise ValueError(f'索引最多包含{MAX_INDEX_COLUMNS}列')
+
+    normalized = []
+    for item in columns:
+        if isinstance(item, str):
+            name, length = item, None
+        elif isinstance(item, dict):
+            name, length = item.get('name'), item.get('length')
+        else:
+            raise ValueError('索引列格式无效')
+
+        column = schema_catalog.get_column(table_name, name)
+        if column is None:
+            raise ValueError(f'列不存在: {name}')
+        if any(col['name'] == name for col in normalized):
+            raise ValueError(f'索引列重复: {name}')
+
+        base_type = _base_type(column)
+        if base_type in UNINDEXABLE_TYPES:
+            raise ValueError(f'{base_type.upper()}类型的列不能建立索引: {name}')
+        if length is not None:
+            if not isinstance(length, int) or isinstance(length, bool) or length <= 0:
+                raise ValueError(f'前缀长度无效: {name}')
+        elif base_type in PREFIX_REQUIRED_TYPES:
+            length = INDEX_PREFIX_LENGTH
+        normalized.append({'name': name, 'length': length})
+    return normalized
+
+
+def _default_index_name(columns):
+    """按列名生成索引名称，超长时截断"""
+    name = 'idx_' + '_'.join(re.sub(r'[^A-Za-z0-9_]', '', col['name']) or 'col' for col in columns)
+    return name[:64]
+
+
+def _execute_online_ddl(table_name, clause):
+    """
+    执行ALTER TABLE，优先使用在线DDL，MySQL不支持时去掉ALGORITHM/LOCK重试
+
+    Args:
+        table_name: 表格名称
+        clause: ALTER TABLE子句
+
+    Returns:
+        bool: 是否以在线DDL方式执行
+    """
+    engine = db.engines[DATASHARE_DB_BIND]
+    connection = connect(engine)
+    try:
+        try:
+            connection.execute(text(f"ALTER TABLE `{table_name}` {clause}, ALGORITHM=INPLACE, LOCK=NONE"))
+            connection.commit()
+            return True
+        except DBAPIError as e:
+            connection.rollback()
+            args = getattr(e.orig, 'args', None)
+            if not args or args[0] not in ONLINE_DDL_UNSUPPORTED_ERRORS:
+                raise
+            print(f"表格{table_name}不支持在线DDL，改为普通方式执行: {str(e.orig)}")
+
+        connection.execute(text(f"ALTER TABLE `{table_name}` {clause}"))
+        connection.commit()
+        return False
+    finally:
+        connection.close()
+        schema_catalog.invalidate(table_name)
+
+
+def create_index(table_name, columns, index_name=None, unique=False):
+    """
+    为表格创建二级索引（多列时为联合索引）
+
+    Args:
+        table_name: 表格名称
+        columns: 索引列列表，元素为列名或{"name": 列名, "length": 前缀长度}
+        index_name: 索引名称，默认为None（按列名生成）
+        unique: 是否为唯一索引
+
+    Returns:
+        dict: 创建结果
+    """
+    try:
+        index_columns = _normalize_index_columns(table_name, columns)
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+
+    index_name = index_name or _default_index_name(index_columns)
+    if not INDEX_NAME_PATTERN.match(index_name):
+        return {'success': False, 'message': '索引名称只能包含字母、数字和下划线，且不超过64个字符'}
+    if index_name.upper() == 'PRIMARY' or index_name == SEARCH_INDEX_NAME:
+        return {'success': False, 'message': f'索引名称{index_name}为保留名称'}
+    if any(index['name'] == index_name for index in schema_catalog.get_indexes(table_name) or []):
+        return {'success': False, 'message': f'索引{index_name}已存在'}
+
+    column_list = ', '.join(
+        f"`{col['name']}`({col['length']})" if col['length'] else f"`{col['name']}`"
+        for col in index_columns
+    )
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+
+    try:
+        online = _execute_online_ddl(table_name, f"ADD {kind} `{index_name}` ({column_list})")
+    except Exception as e:
+        return {'success': False, 'message': f'创建索引失败: {str(e)}'}
+
+    return {
+        'success': True,
+        'message': f'表格{table_name}索引{index_name}创建成功',
+        'index': {'name': index_name, 'columns': index_columns, 'unique': bool(unique)},
+        'online': online
+    }
+
+
+def drop_index(table_name, index_name):
+    """
+    删除表格的二级索引（主键和全文搜索索引不在此删除）
+
+    Args:
+        table_name: 表格名称
+        index_name: 索引名称
+
+    Returns:
+        dict: 删除结果
+    """
+    if index_name == 'PRIMARY':
+        return {'success': False, 'message': '不能删除主键'}
+    if index_name == SEARCH_INDEX_NAME:
+        return {'success': False, 'message': '全文搜索索引请通过search-index接口删除'}
+    if not any(index['name'] == index_name for index in schema_catalog.get_indexes(table_name) or []):
+        return {'success': False, 'message': f'索引{index_name}不存在'}
+
+    try:
+        online = _execute_online_ddl(table_name, f"DROP INDEX `{index_name}`")
+    except Exception as e:
+        return {'success': False, 'message': f'删除索引失败: {str(e)}'}
+
+    return {
+        'success': True,
+        'message': f'表格{table_name}索引{index_name}删除成功',
+        'online': online
+    }
+
+
+class ColumnUsageStats:
+    """
+    表格数据接口的排序列、筛选列使用次数统计（每个worker进程一份）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def record(self, table_name, sort_by=None, filter_columns=()):
+        """
+        记录一次数据查询使用的排序列和筛选列
+
+        Args:
+            table_name: 表格名称
+            sort_by: 排序列
+            filter_columns: 等值/范围筛选使用的列
+        """
+        filter_columns = tuple(dict.fromkeys(filter_columns))
+        if not sort_by and not filter_columns:
+            return
+        with self._lock:
+            stats = self._tables.setdefault(table_name, {
+                'sort': Counter(), 'filter': Counter(), 'combined': Counter()
+            })
+            if sort_by:
+                stats['sort'][sort_by] += 1
+            for column in filter_columns:
+                stats['filter'][column] += 1
+            if filter_columns:
+                stats['combined'][(filter_columns, sort_by)] += 1
+
+    def get(self, table_name):
+        """获取表格的使用次数统计"""
+        with self._lock:
+            stats = self._tables.get(table_name)
+            if stats is None:
+                return {'sort': {}, 'filter': {}, 'combined': []}
+            return {
+                'sort': dict(stats['sort']),
+                'filter': dict(stats['filter']),
+                'combined': [
+                    {'filter_columns': list(filters), 'sort_by': sort_by, 'requests': count}
+                    for (filters, sort_by), count in stats['combined'].most_common()
+                ]
+            }
+
+    def reset(self, table_name=None):
+        """清空统计"""
+        with self._lock:
+            if table_name is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(table_name, None)
+
+
+column_usage = ColumnUsageStats()
+
+
+def record_column_usage(table_name, sort_by=None, filter_columns=()):
+    """记录一次数据查询使用的排序列和筛选列"""
+    column_usage.record(table_name, sort_by, filter_columns)
+
+
+def suggest_indexes(table_name, min_requests=INDEX_ADVISOR_MIN_REQUESTS):
+    """
+    根据排序列、筛选列的使用次数给出建索引建议
+
+    已有索引的最左前缀能覆盖的列组合不再建议；
+    同时带筛选和排序的查询建议(筛选列..., 排序列)的联合索引。
+    TEXT/BLOB列只能建立前缀索引，前缀索引不能用于ORDER BY，这样的排序列不作为索引列建议。
+
+    Args:
+        table_name: 表格名称
+        min_requests: 使用次数达到该值才给出建议
+
+    Returns:
+        list: 建议列表 [{"columns": [...], "reason": 原因, "requests": 使用次数}]，按使用次数降序
+    """
+    columns = schema_catalog.get_columns(table_name)
+    if columns is None:
+        return []
+    column_map = {column['name']: column for column in columns}
+    primary_key = schema_catalog.get_primary_key(table_name) or []
+
+    # 已有BTREE索引的列顺序
+    existing = [
+        [col['name'] for col in index['columns']]
+        for index in schema_catalog.get_indexes(table_name) or []
+        if index['type'] == 'BTREE'
+    ]
+
+    def covered(candidate):
+        return any(index[:len(candidate)] == candidate for index in existing)
+
+    def sortable(name):
+        # 只有能完整建立索引的列，索引才能用于排序
+        return name in column_map and _base_type(column_map[name]) not in PREFIX_REQUIRED_TYPES
+
+    stats = column_usage.get(table_name)
+    candidates = []
+    for item in stats['combined']:
+        sort_by = item['sort_by'] if item['sort_by'] and sortable(item['sort_by']) else None
+        candidate = item['filter_columns'] + ([sort_by] if sort_by and sort_by not in item['filter_columns'] else [])
+        if len(candidate) > 1:
+            candidates.append((candidate, 'filter_and_sort' if sort_by else 'filter', item['requests']))
+    for column, count in stats['filter'].items():
+        candidates.append(([column], 'filter', count))
+    for column, count in stats['sort'].items():
+        if sortable(column):
+            candidates.append(([column], 'sort', count))
+
+    suggestions = []
+    seen = set()
+    for candidate, reason, count in sorted(candidates, key=lambda item: -item[2]):
+        key = tuple(candidate)
+        if count < min_requests or key in seen:
+            continue
+        seen.add(key)
+        if candidate == primary_key[:len(candidate)] or covered(candidate):
+            continue
+        if any(name not in column_map or _base_type(column_map[name]) in UNINDEXABLE_TYPES for name in candidate):
+            continue
+        suggestions.append({
+            'columns': [
+                {
+                    'name': name,
+                    'length': INDEX_PREFIX_LENGTH if _base_type(column_map[name]) in PREFIX_REQUIRED_TYPES else None
+                }
+                for name in candidate
+            ],
+            'reason': reason,
+            'requests': count
+        })
+    return suggestions
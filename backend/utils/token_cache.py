@@ -0,0 +1,140 @@
+"""
+JWT令牌标识符缓存
+
+每个已认证的请求都要校验令牌中的token_identifier与用户表中的是否一致，
+这里缓存 用户ID -> 当前令牌标识符，命中且一致时不必查询数据库。
+
+只把缓存用于确认令牌有效：缓存的标识符与令牌不一致（或未命中）时总是查询数据库，
+其他worker刚登录签发的新令牌不会因为本进程缓存的旧标识符被拒绝。
+
+默认使用进程内LRU + TTL缓存，登录、登出、修改和删除用户时只失效本进程中该用户的缓存，
+其他worker进程中缓存的旧标识符最多在TOKEN_CACHE_TTL秒后过期，即已登出的令牌在其他进程中
+最多继续有效TOKEN_CACHE_TTL秒；需要登出后在所有worker中立即失效时配置TOKEN_CACHE_REDIS_URL，
+改用Redis共享缓存（需安装redis包）。
+
+查询数据库期间用户可能重新登录，为避免把查询到的旧标识符写回缓存，
+每个用户有一个版本号：失效时递增，写入时版本号已变化则放弃写入（Redis中使用WATCH/MULTI）。
+"""
+
+import threading
+from ..config import TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL, TOKEN_CACHE_REDIS_URL
+from .cache import LRUTTLCache
+
+# Redis中的键前缀
+REDIS_KEY_PREFIX = 'ds:token_identifier:'
+# Redis中用户缓存版本号的键前缀
+REDIS_VERSION_PREFIX = 'ds:token_version:'
+
+
+class TokenIdentifierCache:
+    """用户ID -> 当前令牌标识符的缓存"""
+
+    def __init__(self, maxsize, ttl, redis_url=''):
+        """
+        Args:
+            maxsize: 进程内缓存的最大条目数
+            ttl: 有效期，单位：秒
+            redis_url: Redis地址，为空时使用进程内缓存
+        """
+        self.ttl = ttl
+        self._local = LRUTTLCache(maxsize, ttl)
+        # 进程内缓存各用户的版本号 {用户ID: 版本号}，失效时递增，只记录失效过的用户
+        self._local_versions = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+            except ImportError:
+                print("未安装redis包，令牌标识符缓存改用进程内缓存")
+
+    @property
+    def backend(self):
+        return 'redis' if self._redis is not None else 'local'
+
+    def get(self, user_id):
+        """
+        获取缓存的令牌标识符和当前版本号
+
+        Returns:
+            tuple: (令牌标识符, 版本号)，未命中时令牌标识符为None；版本号在写入缓存时传给set()
+        """
+        if self.ttl <= 0:
+            return None, None
+        if self._redis is None:
+            with self._lock:
+                return self._local.get(user_id), self._local_versions.get(user_id, 0)
+        try:
+            identifier, version = self._redis.mget(
+                f'{REDIS_KEY_PREFIX}{user_id}', f'{REDIS_VERSION_PREFIX}{user_id}'
+            )
+            return identifier, version
+        except Exception as e:
+            print(f"读取令牌标识符缓存失败: {str(e)}")
+            return None, None
+
+    def set(self, user_id, token_identifier, version):
+        """
+        写入令牌标识符，版本号与get()时不同（期间被失效过）时不写入
+
+        Args:
+            user_id: 用户ID
+            token_identifier: 从数据库查询到的令牌标识符，为空时（已登出）不缓存
+            version: get()返回的版本号
+        """
+        if self.ttl <= 0 or not token_identifier:
+            return
+        if self._redis is None:
+            with self._lock:
+                if self._local_versions.get(user_id, 0) == version:
+                    self._local.set(user_id, token_identifier)
+            return
+
+        import redis
+        version_key = f'{REDIS_VERSION_PREFIX}{user_id}'
+        try:
+            with self._redis.pipeline() as pipe:
+                pipe.watch(version_key)
+                if pipe.get(version_key) != version:
+                    return
+                pipe.multi()
+                pipe.set(f'{REDIS_KEY_PREFIX}{user_id}', token_identifier, ex=self.ttl)
+                pipe.execute()
+        except redis.WatchError:
+            # 写入前用户的缓存被失效，放弃写入
+            pass
+        except Exception as e:
+            print(f"写入令牌标识符缓存失败: {str(e)}")
+
+    def invalidate(self, user_id):
+        """
+        失效用户的缓存，登录、登出、修改和删除用户的修改提交后调用
+
+        使用进程内缓存时只失效本进程，其他进程的缓存按TOKEN_CACHE_TTL过期
+        """
+        if self._redis is None:
+            self.clear_local(user_id)
+            return
+        try:
+            with self._redis.pipeline() as pipe:
+                pipe.incr(f'{REDIS_VERSION_PREFIX}{user_id}')
+                pipe.delete(f'{REDIS_KEY_PREFIX}{user_id}')
+                pipe.execute()
+        except Exception as e:
+            print(f"删除令牌标识符缓存失败: {str(e)}")
+
+    def clear_local(self, user_id):
+        """
+        删除进程内缓存中一个用户的令牌标识符，其他用户的缓存不受影响
+
+        Args:
+            user_id: 用户ID
+        """
+        with self._lock:
+            self._local_versions[user_id] = self._local_versions.get(user_id, 0) + 1
+            self._local.delete(user_id)
+
+
+# 令牌标识符缓存（使用Redis时各worker共享）
+token_cache = TokenIdentifierCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL, TOKEN_CACHE_REDIS_URL)
@@ -0,0 +1,92 @@
+"""
+导入性能测试：比较LOAD DATA LOCAL INFILE和批量INSERT两种导入方式的吞吐量
+
+生成指定行数的CSV文件，分别用两种方式导入到数据共享库的临时表格中，输出行/秒，测试结束后删除临时表格。
+需要能连接到backend/config.py中配置的MySQL。
+
+用法（在项目根目录下）：
+    python benchmarks/bench_import.py --rows 200000 --columns 10
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import string
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from backend.utils.data_utils import import_table_from_file, delete_table
+
+
+def generate_csv(path, rows, columns):
+    """生成测试用CSV文件，包含文本、整数、小数、日期和空值"""
+    rng = random.Random(42)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([f'col_{i}' for i in range(columns)])
+        for n in range(rows):
+            row = []
+            for i in range(columns):
+                kind = i % 5
+                if kind == 0:
+                    row.append(''.join(rng.choices(string.ascii_letters + '数据共享', k=rng.randint(5, 30))))
+                elif kind == 1:
+                    row.append(str(rng.randint(0, 10 ** 9)))
+                elif kind == 2:
+                    row.append(f'{rng.uniform(0, 10000):.2f}')
+                elif kind == 3:
+                    row.append(f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}')
+                else:
+                    row.append('' if n % 7 == 0 else f'备注\t{n}')
+            writer.writerow(row)
+
+
+def run(engine_name, csv_path, table_name):
+    """使用指定的导入方式导入一次，返回导入结果"""
+    start = time.perf_counter()
+    result = import_table_from_file(csv_path, table_name, engine_name=engine_name)
+    elapsed = time.perf_counter() - start
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    delete_table(table_name)
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较LOAD DATA和批量INSERT的导入吞吐量')
+    parser.add_argument('--rows', type=int, default=200000, help='测试数据行数')
+    parser.add_argument('--columns', type=int, default=10, help='测试数据列数')
+    parser.add_argument('--repeat', type=int, default=1, help='每种方式重复次数')
+    args = parser.parse_args()
+
+    fd, csv_path = tempfile.mkstemp(suffix='.csv', prefix='bench_import_')
+    os.close(fd)
+    try:
+        print(f"生成测试数据: {args.rows} 行 x {args.columns} 列")
+        generate_csv(csv_path, args.rows, args.columns)
+        print(f"文件大小: {os.path.getsize(csv_path) / 1024 / 1024:.1f} MB")
+
+        with app.app_context():
+            for engine_name in ('insert', 'load_data'):
+                for n in range(args.repeat):
+                    table_name = f'bench_import_{engine_name}_{n}'
+                    try:
+                        result, elapsed = run(engine_name, csv_path, table_name)
+                    except Exception as e:
+                        print(f"{engine_name:>9}: 失败 - {e}")
+                        break
+                    print(
+                        f"{engine_name:>9}: {result['rows_imported']} 行, 耗时 {elapsed:.2f} 秒, "
+                        f"{result['rows_imported'] / elapsed:.0f} 行/秒（含建立全文索引）, 警告 {result['warnings']}"
+                    )
+    finally:
+        os.remove(csv_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import { defineStore } from 'pinia'
 import axios from 'axios'
+import { useSocketStore } from './socket'
 
 export const useAuthStore = defineStore('auth', {
   state: () => ({
@@ -69,7 +70,8 @@ export const useAuthStore = defineStore('auth', {
       } catch (error) {
         console.error('登出失败:', error)
       } finally {
-        // 清除localStorage和state
+        // 关闭变更通知连接，清除localStorage和state
+        useSocketStore().disconnect()
         localStorage.removeItem('token')
         localStorage.removeItem('user')
         this.token = null
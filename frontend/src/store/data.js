@@ -67,7 +67,7 @@ export const useDataStore = defineStore('data', {
       }
     },
     
-    async fetchTableData(tableName, page = 1, perPage = 10, sortBy = null, sortOrder = 'asc', search = null) {
+    async fetchTableData(tableName, page = 1, perPage = 10, sortBy = null, sortOrder = 'asc', search = null, filters = null) {
       /*
       获取表格数据
       
@@ -78,6 +78,7 @@ export const useDataStore = defineStore('data', {
         sortBy: 排序字段
         sortOrder: 排序方向
         search: 搜索关键词
+        filters: 结构化筛选条件，如[{ column: 'age', op: 'gte', value: 18 }]、单个条件或{ or: [...] }条件组，由服务端筛选
       */
       this.isLoading = true
       this.error = null
@@ -97,6 +98,12 @@ export const useDataStore = defineStore('data', {
           params.search = search
         }
         
+        // 筛选条件可以是条件列表，也可以是单个条件或{ and/or: [...] }条件组
+        const hasFilters = Array.isArray(filters) ? filters.length > 0 : Boolean(filters && Object.keys(filters).length)
+        if (hasFilters) {
+          params.filters = JSON.stringify(filters)
+        }
+        
         const response = await axios.get(`/data/tables/${tableName}/data`, { params })
         this.tableData = response.data.data
         this.pagination = response.data.pagination
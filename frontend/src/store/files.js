@@ -5,24 +5,40 @@ export const useFileStore = defineStore('files', {
   state: () => ({
     files: [],
     sharedFiles: [],
+    // 分页游标和查询条件（排序、搜索），加载更多时沿用
+    filesQuery: {},
+    filesCursor: null,
+    sharedQuery: {},
+    sharedCursor: null,
+    // 符合查询条件的文件总数（后端在第一页返回），不受已加载条数限制
+    filesTotal: 0,
+    sharedTotal: 0,
     isLoading: false,
     error: null,
     uploadProgress: 0
   }),
 
   getters: {
-    totalFiles: (state) => state.files.length,
-    totalSharedFiles: (state) => state.sharedFiles.length
+    totalFiles: (state) => state.filesTotal,
+    totalSharedFiles: (state) => state.sharedTotal,
+    hasMoreFiles: (state) => !!state.filesCursor,
+    hasMoreSharedFiles: (state) => !!state.sharedCursor
   },
 
   actions: {
-    async fetchFiles() {
+    // query: { sort_by, sort_order, search }，不传时沿用上次的查询条件
+    async fetchFiles(query = null) {
       this.isLoading = true
       this.error = null
       
       try {
-        const response = await axios.get('/files')
+        if (query) {
+          this.filesQuery = query
+        }
+        const response = await axios.get('/files', { params: this.filesQuery })
         this.files = response.data.files
+        this.filesCursor = response.data.next_cursor
+        this.filesTotal = response.data.total ?? response.data.files.length
         return response.data.files
       } catch (error) {
         this.error = error.response?.data?.error || '获取文件列表失败'
@@ -32,13 +48,58 @@ export const useFileStore = defineStore('files', {
       }
     },
 
-    async fetchSharedFiles() {
+    async loadMoreFiles() {
+      if (!this.filesCursor) {
+        return []
+      }
+      this.isLoading = true
+      this.error = null
+      
+      try {
+        const response = await axios.get('/files', { params: { ...this.filesQuery, cursor: this.filesCursor } })
+        this.files = [...this.files, ...response.data.files]
+        this.filesCursor = response.data.next_cursor
+        return response.data.files
+      } catch (error) {
+        this.error = error.response?.data?.error || '获取文件列表失败'
+        throw error
+      } finally {
+        this.isLoading = false
+      }
+    },
+
+    async fetchSharedFiles(query = null) {
       this.isLoading = true
       this.error = null
       
       try {
-        const response = await axios.get('/files?shared=true')
+        if (query) {
+          this.sharedQuery = query
+        }
+        const response = await axios.get('/files', { params: { ...this.sharedQuery, shared: true } })
         this.sharedFiles = response.data.files
+        this.sharedCursor = response.data.next_cursor
+        this.sharedTotal = response.data.total ?? response.data.files.length
+        return response.data.files
+      } catch (error) {
+        this.error = error.response?.data?.error || '获取共享文件列表失败'
+        throw error
+      } finally {
+        this.isLoading = false
+      }
+    },
+
+    async loadMoreSharedFiles() {
+      if (!this.sharedCursor) {
+        return []
+      }
+      this.isLoading = true
+      this.error = null
+      
+      try {
+        const response = await axios.get('/files', { params: { ...this.sharedQuery, shared: true, cursor: this.sharedCursor } })
+        this.sharedFiles = [...this.sharedFiles, ...response.data.files]
+        this.sharedCursor = response.data.next_cursor
         return response.data.files
       } catch (error) {
         this.error = error.response?.data?.error || '获取共享文件列表失败'
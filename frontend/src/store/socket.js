@@ -0,0 +1,94 @@
+import { defineStore } from 'pinia'
+import { markRaw } from 'vue'
+import { io } from 'socket.io-client'
+
+// 变更通知（Socket.IO）连接，所有页面共用一个连接
+export const useSocketStore = defineStore('socket', {
+  state: () => ({
+    socket: null,
+    token: null
+  }),
+
+  actions: {
+    // 使用当前的登录令牌建立连接，令牌变化（重新登录）时重新连接
+    connect() {
+      const token = localStorage.getItem('token')
+      if (!token) {
+        this.disconnect()
+        return null
+      }
+      if (this.socket && this.token === token) {
+        return this.socket
+      }
+      this.disconnect()
+      this.token = token
+      this.socket = markRaw(io({ auth: { token } }))
+      return this.socket
+    },
+
+    disconnect() {
+      if (this.socket) {
+        this.socket.disconnect()
+      }
+      this.socket = null
+      this.token = null
+    },
+
+    /*
+    订阅表格的变更事件
+
+    Args:
+      tableName: 表格名称
+      handler: 收到该表格的table_change事件时调用
+
+    Returns:
+      取消订阅的函数
+    */
+    subscribeTable(tableName, handler) {
+      const socket = this.connect()
+      if (!socket) {
+        return () => {}
+      }
+      const onTableChange = (event) => {
+        if (event.table_name === tableName) {
+          handler(event)
+        }
+      }
+      // 重新连接后服务端的订阅已失效，需要重新订阅
+      const subscribe = () => {
+        socket.emit('subscribe_table', { table_name: tableName }, (result) => {
+          if (result && !result.success) {
+            console.error('订阅表格变更失败:', result.message)
+          }
+        })
+      }
+      socket.on('table_change', onTableChange)
+      socket.on('connect', subscribe)
+      if (socket.connected) {
+        subscribe()
+      }
+      return () => {
+        socket.off('table_change', onTableChange)
+        socket.off('connect', subscribe)
+        if (socket.connected) {
+          socket.emit('unsubscribe_table', { table_name: tableName })
+        }
+      }
+    },
+
+    /*
+    监听文件变更事件（自己的文件和共享文件）
+
+    Returns:
+      取消监听的函数
+    */
+    onFileChange(handler) {
+      const socket = this.connect()
+      if (!socket) {
+        return () => {}
+      }
+      socket.on('file_change', handler)
+      return () => socket.off('file_change', handler)
+    }
+  }
+})
@@ -18,6 +18,12 @@ export default defineConfig({
         target: 'http://localhost:5001',
         changeOrigin: true,
         secure: false
+      },
+      // 变更通知（Socket.IO），保留原始Host以通过后端的同源校验
+      '/socket.io': {
+        target: 'http://localhost:5001',
+        ws: true,
+        changeOrigin: false
       }
     }
   }
@@ -0,0 +1,76 @@
+"""
+文件列表的SQL查询数
+
+使用SQLite内存数据库，确认list_files在一条查询中加载文件及其上传者，
+序列化文件（读取上传者用户名）时不会逐个文件再查询用户表（N+1）。
+
+运行：python -m pytest tests
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from flask import Flask
+from backend.extensions import db
+from backend.models import User, File
+from backend.utils.file import list_files, count_files, serialize_file
+from backend.utils.query_counter import assert_max_queries
+
+USER_COUNT = 3
+FILES_PER_USER = 10
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        start = datetime(2024, 1, 1)
+        for n in range(USER_COUNT):
+            user = User(username=f'user{n}', password_hash='x')
+            db.session.add(user)
+            for i in range(FILES_PER_USER):
+                db.session.add(File(
+                    filename=f'report_{n}_{i}.txt',
+                    filepath=f'report_{n}_{i}.txt',
+                    size=100 + i,
+                    user=user,
+                    is_shared=i % 2 == 0,
+                    created_at=start + timedelta(minutes=n * FILES_PER_USER + i)
+                ))
+        db.session.commit()
+        # 清空会话，确保上传者需要从数据库加载
+        db.session.expunge_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_list_files_loads_uploaders_in_one_query(app):
+    with assert_max_queries(1):
+        files, next_cursor = list_files(File.query, limit=USER_COUNT * FILES_PER_USER)
+        serialized = [serialize_file(file) for file in files]
+
+    assert len(serialized) == USER_COUNT * FILES_PER_USER
+    assert next_cursor is None
+    assert {item['uploader'] for item in serialized} == {f'user{n}' for n in range(USER_COUNT)}
+
+
+def test_list_files_next_page_uses_one_query(app):
+    files, next_cursor = list_files(File.query, sort_by='filename', sort_order='asc', limit=7)
+    assert next_cursor is not None
+
+    with assert_max_queries(1):
+        next_files, _ = list_files(File.query, sort_by='filename', sort_order='asc', limit=7, cursor=next_cursor)
+        [serialize_file(file) for file in next_files]
+
+    assert len(next_files) == 7
+    assert {file.id for file in files}.isdisjoint(file.id for file in next_files)
+
+
+def test_count_files_uses_one_query(app):
+    with assert_max_queries(1):
+        total = count_files(File.query.filter(File.is_shared == True), search='report_1_')
+
+    assert total == FILES_PER_USER // 2
@@ -0,0 +1,74 @@
+"""
+全文搜索索引的停用词设置
+
+InnoDB默认停用词表在ngram分词下会丢弃包含a、i等停用词的分词，
+确认建立索引时在同一连接上关闭停用词，并且包含a、i的英文单词仍按全文索引搜索。
+
+运行：python -m pytest tests
+"""
+
+import pytest
+from flask import Flask
+from backend.config import DATASHARE_DB_BIND
+from backend.extensions import db
+from backend.utils import search_index
+
+COLUMNS = ['title', 'remark']
+
+
+class RecordingConnection:
+    """记录执行的SQL语句的连接"""
+
+    def __init__(self):
+        self.statements = []
+        self.closed = False
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def invalidate(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_BINDS'] = {DATASHARE_DB_BIND: 'sqlite://'}
+    db.init_app(app)
+    recording = RecordingConnection()
+    monkeypatch.setattr(search_index, 'connect', lambda engine: recording)
+    monkeypatch.setattr(search_index, 'get_searchable_columns', lambda table_name: COLUMNS)
+    monkeypatch.setattr(search_index, 'get_search_index_columns', lambda table_name: COLUMNS)
+    with app.app_context():
+        yield recording
+
+
+def test_create_search_index_disables_stopwords(connection):
+    result = search_index.create_search_index('articles')
+
+    assert result['success']
+    statements = connection.statements
+    add_index = next(i for i, sql in enumerate(statements) if 'ADD FULLTEXT' in sql)
+    assert statements.index('SET SESSION innodb_ft_enable_stopword = 0') < add_index
+    # 归还连接前恢复会话变量
+    assert statements[-1] == 'SET SESSION innodb_ft_enable_stopword = DEFAULT'
+    assert connection.closed
+
+
+@pytest.mark.parametrize('word', ['data', 'invoice', 'ai'])
+def test_search_word_with_stopword_letters_uses_fulltext(connection, word):
+    params = {}
+    condition = search_index.build_fulltext_condition('articles', word, params)
+
+    assert condition == "MATCH(`title`, `remark`) AGAINST(:search_phrase IN BOOLEAN MODE)"
+    assert params['search_phrase'] == f'"{word}"'